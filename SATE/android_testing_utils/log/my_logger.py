@@ -4,7 +4,13 @@
 # ----------------------
 
 import os
+import sys
+import atexit
+import time as _time
 import datetime
+import threading
+import contextlib
+import multiprocessing
 
 from enum import Enum
 # from multiprocessing import Lock
@@ -28,6 +34,32 @@ class LogLevel(Enum):
 
 CURRENT_LOG_LEVEL = LogLevel.INFO
 
+# The main process writes to the buffer of stdout, shared with plain prints so their order is kept, and flushes it at
+# most every FLUSH_INTERVAL seconds, or at once for warnings and above. A line left in the buffer is flushed by a
+# timer at the end of the interval, so it shows up even if nothing is logged after it. Workers flush each line, as a
+# terminated pool worker never flushes its buffer, unless a queue sink forwards their lines to their parent process.
+FLUSH_INTERVAL = 0.5
+FLUSH_LEVEL = LogLevel.WARNING
+
+_last_flush_time = 0.0
+_flush_timer = None
+_flush_timer_lock = threading.Lock()
+_is_worker = multiprocessing.current_process().name != "MainProcess"
+_sink_queue = None
+_sink_pid = None
+_sink_thread = None
+
+
+def _on_fork_in_child():
+    global _is_worker, _flush_timer, _flush_timer_lock
+    _is_worker = True
+    # the timer thread is not forked, and its lock may have been held
+    _flush_timer = None
+    _flush_timer_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_on_fork_in_child)
+
 
 # lock = Lock()
 # def output(*args, **kwargs):
@@ -39,24 +71,111 @@ def output(*args, **kwargs):
     print(*args, **kwargs)
 
 
+def flush():
+    global _last_flush_time
+    sys.stdout.flush()
+    _last_flush_time = _time.monotonic()
+
+
+atexit.register(flush)
+
+
+def _flush_on_timer():
+    global _flush_timer
+    with _flush_timer_lock:
+        _flush_timer = None
+    flush()
+
+
+def _schedule_flush(delay: float):
+    global _flush_timer
+    with _flush_timer_lock:
+        if _flush_timer is not None:
+            return
+        _flush_timer = threading.Timer(max(delay, 0.0), _flush_on_timer)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def write_line(s: str, force_flush: bool = False):
+    global _last_flush_time
+    if _sink_queue is not None and _sink_pid != os.getpid():
+        _sink_queue.put(s)
+        return
+    sys.stdout.write(s + '\n')
+    now = _time.monotonic()
+    if force_flush or _is_worker or now - _last_flush_time >= FLUSH_INTERVAL:
+        sys.stdout.flush()
+        _last_flush_time = now
+    elif _flush_timer is None:
+        _schedule_flush(FLUSH_INTERVAL - (now - _last_flush_time))
+
+
 def new_line():
-    output(flush=True)
+    write_line("", force_flush=True)
+
+
+def is_enabled_for(log_level: LogLevel) -> bool:
+    return log_level.value >= CURRENT_LOG_LEVEL.value
 
 
-def hint(log_level: LogLevel, tag: str, time: bool, info=""):
-    if log_level < CURRENT_LOG_LEVEL:
+def hint(log_level: LogLevel, tag: str, time: bool, info="", *args):
+    """`info` is formatted only for shown messages: with `%` and `args` if given, or called if it is callable."""
+    if log_level.value < CURRENT_LOG_LEVEL.value:
         return
 
-    s = str(info)
+    if callable(info):
+        info = info()
+    s = str(info) % args if len(args) > 0 else str(info)
     if s.endswith('\n'):
         s = s[:-1]
     if time:
-        output(f"{log_level} | {tag} | {datetime.datetime.now()} | {s}", flush=True)
+        write_line(f"{log_level} | {tag} | {datetime.datetime.now()} | {s}", log_level.value >= FLUSH_LEVEL.value)
     else:
-        output(f"{log_level} | {tag} | {s}", flush=True)
+        write_line(f"{log_level} | {tag} | {s}", log_level.value >= FLUSH_LEVEL.value)
+
+
+def _drain_sink(queue):
+    while True:
+        s = queue.get()
+        if s is None:
+            break
+        write_line(s)
+    flush()
+
+
+def start_queue_sink():
+    """Forward the lines of the processes forked from now on to this one, each line intact and in order.
+
+    The workers must end before the sink stops, e.g. by using their pool inside `queue_sink`.
+    """
+    global _sink_queue, _sink_pid, _sink_thread
+    if _sink_queue is not None:
+        return
+    _sink_queue = multiprocessing.SimpleQueue()
+    _sink_pid = os.getpid()
+    _sink_thread = threading.Thread(target=_drain_sink, args=(_sink_queue,), name="log-sink", daemon=True)
+    _sink_thread.start()
+
+
+def stop_queue_sink():
+    global _sink_queue, _sink_pid, _sink_thread
+    if _sink_queue is None or _sink_pid != os.getpid():
+        return
+    _sink_queue.put(None)
+    _sink_thread.join()
+    _sink_queue, _sink_pid, _sink_thread = None, None, None
+
+
+@contextlib.contextmanager
+def queue_sink():
+    start_queue_sink()
+    try:
+        yield
+    finally:
+        stop_queue_sink()
 
 
 def append_event_extraction_log(location, info=""):
-    info = f"{datetime.datetime.now()}    {info}"
-    cmd = f"echo {info} >> {location}/event_extraction_log.txt"
-    os.system(cmd)
+    with open(os.path.join(location, "event_extraction_log.txt"), 'a') as f:
+        f.write(f"{datetime.datetime.now()}    {info}\n")
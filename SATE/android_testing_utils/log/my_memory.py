@@ -0,0 +1,211 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Memory accounting of the `my_tracer` spans, enabled with `my_tracer.enable(trace_dir, memory=MODE)`.
+
+With the `rss` mode, a thread in each traced process samples its resident set size, which gives each span its peak
+RSS and the trace a memory counter per process. The `tracemalloc` mode also traces the Python allocations, which gives
+each span its peak of allocated memory and lets `allocation_snapshot` find the call sites holding the memory allocated
+during a span. It slows Python down several times, unlike the `rss` mode.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+
+MEMORY_ENV = "SATE_MEMORY_PROFILE"
+RSS_MODE = "rss"
+TRACEMALLOC_MODE = "tracemalloc"
+SAMPLE_INTERVAL = 0.01
+# a counter sample is recorded only when the RSS moved by this many bytes
+SAMPLE_RESOLUTION = 1 << 20
+MB = 1 << 20
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return get_peak_rss()
+
+
+def get_peak_rss() -> int:
+    """The peak RSS of this process over its lifetime (for a forked worker, including its parent before the fork)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemoryState:
+    __slots__ = ("rss_start", "rss_peak", "py_start", "py_peak")
+
+    def __init__(self, rss: int, py_current: int):
+        self.rss_start = rss
+        self.rss_peak = rss
+        self.py_start = py_current
+        self.py_peak = py_current
+
+
+_open_states: List[MemoryState] = []
+_samples: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_sampler_pid: Optional[int] = None
+_last_py_peak = 0
+
+
+def _sample():
+    pid = os.getpid()
+    last_rss = 0
+    while _sampler_pid == pid:
+        time.sleep(SAMPLE_INTERVAL)
+        rss = get_rss()
+        with _lock:
+            for state in _open_states:
+                if rss > state.rss_peak:
+                    state.rss_peak = rss
+            if abs(rss - last_rss) >= SAMPLE_RESOLUTION:
+                _samples.append({"name": "memory", "ph": "C", "ts": time.time_ns() // 1000, "pid": pid, "args": {"rss_mb": round(rss / MB, 1)}})
+                last_rss = rss
+
+
+def _ensure_sampler(mode: str):
+    global _sampler_pid
+    if _sampler_pid == os.getpid():
+        return
+    _sampler_pid = os.getpid()
+    if mode == TRACEMALLOC_MODE and not tracemalloc.is_tracing():
+        tracemalloc.start(int(os.environ.get("PYTHONTRACEMALLOC", "1")))
+    threading.Thread(target=_sample, name="memory-sampler", daemon=True).start()
+
+
+def _reset_in_child():
+    global _open_states, _samples, _lock, _sampler_pid, _last_py_peak
+    _open_states = []
+    _samples = []
+    _lock = threading.Lock()
+    _sampler_pid = None
+    _last_py_peak = 0
+
+
+os.register_at_fork(after_in_child=_reset_in_child)
+
+
+def _update_py_peaks():
+    # the peak is reset at each span boundary, so every open span takes the peak since the last boundary
+    global _last_py_peak
+    current, peak = tracemalloc.get_traced_memory()
+    if not hasattr(tracemalloc, "reset_peak"):
+        # before Python 3.9 the peak can not be reset: a peak above the last one was reached since the last boundary,
+        # otherwise the current size is all that is known of this interval
+        peak, _last_py_peak = (peak if peak > _last_py_peak else current), max(peak, _last_py_peak)
+    for state in _open_states:
+        if peak > state.py_peak:
+            state.py_peak = peak
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    return current
+
+
+def on_span_enter(mode: str) -> MemoryState:
+    _ensure_sampler(mode)
+    with _lock:
+        py_current = _update_py_peaks() if tracemalloc.is_tracing() else 0
+        state = MemoryState(get_rss(), py_current)
+        _open_states.append(state)
+    return state
+
+
+def on_span_exit(state: MemoryState) -> Dict[str, Any]:
+    rss = get_rss()
+    with _lock:
+        state.rss_peak = max(state.rss_peak, rss)
+        py_current = _update_py_peaks() if tracemalloc.is_tracing() else None
+        _open_states.remove(state)
+        is_outermost = len(_open_states) == 0
+    res = {
+        "rss_mb": round(state.rss_start / MB, 1),
+        "rss_peak_mb": round(state.rss_peak / MB, 1),
+        "rss_delta_mb": round((rss - state.rss_start) / MB, 1),
+    }
+    if py_current is not None:
+        res["py_peak_mb"] = round((state.py_peak - state.py_start) / MB, 2)
+        res["py_delta_mb"] = round((py_current - state.py_start) / MB, 2)
+    if is_outermost:
+        res["process_peak_rss_mb"] = round(get_peak_rss() / MB, 1)
+    return res
+
+
+def pop_samples() -> List[Dict[str, Any]]:
+    global _samples
+    with _lock:
+        res, _samples = _samples, []
+    return res
+
+
+@contextlib.contextmanager
+def allocation_snapshot(span, limit: int = 10):
+    """Set the call sites holding the most memory allocated inside the block as the `top_allocations` of a span."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    trace_filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    before = tracemalloc.take_snapshot().filter_traces(trace_filters)
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot().filter_traces(trace_filters)
+        stats = [item for item in after.compare_to(before, "lineno") if item.size_diff > 0][:limit]
+        span.set(top_allocations=[
+            f"{item.traceback[0].filename}:{item.traceback[0].lineno} {item.size_diff / MB:+.2f} MB in {item.count_diff:+d} blocks"
+            for item in stats
+        ])
+
+
+def get_report(events: List[Dict[str, Any]], limit: int = 10) -> str:
+    """Peak memory per span name, the spans (e.g. input files) with the highest peaks, and per process."""
+    spans = [item for item in events if item.get("ph") == "X" and "rss_peak_mb" in item["args"]]
+    if len(spans) == 0:
+        return "No memory data, enable the tracer with a memory mode!"
+
+    lines = [f"{'span':<56} {'count':>7} {'max rss [MB]':>13} {'max rss delta':>14} {'max py peak':>12}"]
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for event in spans:
+        groups.setdefault(event["name"], []).append(event)
+    for name, group in sorted(groups.items(), key=lambda x: -max([item["args"]["rss_peak_mb"] for item in x[1]])):
+        py_peaks = [item["args"]["py_peak_mb"] for item in group if "py_peak_mb" in item["args"]]
+        lines.append(f"{name[:56]:<56} {len(group):>7} {max([item['args']['rss_peak_mb'] for item in group]):>13.1f} "
+                     f"{max([item['args']['rss_delta_mb'] for item in group]):>14.1f} {max(py_peaks) if len(py_peaks) > 0 else float('nan'):>12.2f}")
+
+    lines.append("")
+    lines.append(f"Top {limit} spans by RSS growth up to their peak:")
+    for event in sorted(spans, key=lambda x: x["args"]["rss_mb"] - x["args"]["rss_peak_mb"])[:limit]:
+        attributes = {key: value for key, value in event["args"].items() if not key.endswith("_mb") and key != "top_allocations"}
+        lines.append(f"    {event['args']['rss_peak_mb'] - event['args']['rss_mb']:>+9.1f} MB  {event['name']} (pid {event['pid']}) {attributes}")
+
+    lines.append("")
+    lines.append(f"{'process':>10} {'spans':>7} {'max span rss [MB]':>18} {'peak rss [MB]':>14}")
+    processes: Dict[int, List[Dict[str, Any]]] = {}
+    for event in spans:
+        processes.setdefault(event["pid"], []).append(event)
+    for pid, group in sorted(processes.items()):
+        process_peaks = [item["args"]["process_peak_rss_mb"] for item in group if "process_peak_rss_mb" in item["args"]]
+        lines.append(f"{pid:>10} {len(group):>7} {max([item['args']['rss_peak_mb'] for item in group]):>18.1f} "
+                     f"{max(process_peaks) if len(process_peaks) > 0 else float('nan'):>14.1f}")
+
+    allocations = [item for item in spans if "top_allocations" in item["args"]]
+    for event in allocations:
+        lines.append("")
+        lines.append(f"Top allocations retained by {event['name']}:")
+        lines.extend([f"    {item}" for item in event["args"]["top_allocations"]])
+    return '\n'.join(lines)
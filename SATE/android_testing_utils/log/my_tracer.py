@@ -0,0 +1,243 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Spans timing the analysis stages, exported as a Chrome trace (chrome://tracing, ui.perfetto.dev) and a summary.
+
+    with my_tracer.span("BugAnalyzer.analyze", pattern=pattern) as current_span:
+        ...
+        current_span.set(file_count=len(target_files))
+
+    @my_tracer.traced("BugUtil.bug_file_to_abstract_dict")
+    def ...
+
+Tracing is enabled by `enable(trace_dir)` or the `SATE_TRACE_DIR` environment variable, which pool workers inherit.
+Each process appends its finished spans to `<trace_dir>/<pid>.jsonl` whenever its outermost span ends, so workers
+killed by `Pool.terminate` lose nothing, and `export` merges the files. While disabled, `span` returns a shared no-op
+span and `traced` calls the function directly. With a memory mode (see `my_memory`), spans also record peak memory.
+"""
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from android_testing_utils.log import my_memory
+
+TRACE_DIR_ENV = "SATE_TRACE_DIR"
+FLUSH_EVENT_COUNT = 1000
+
+_trace_dir: Optional[str] = os.environ.get(TRACE_DIR_ENV) or None
+_memory_mode: Optional[str] = (os.environ.get(my_memory.MEMORY_ENV) or None) if _trace_dir is not None else None
+_events: List[Dict[str, Any]] = []
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "__start_us", "__start_counter", "__memory_state")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.__memory_state = None
+
+    def set(self, **attributes):
+        """Attributes known only inside the span, e.g. a row count."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        _get_stack().append(self)
+        if _memory_mode is not None:
+            self.__memory_state = my_memory.on_span_enter(_memory_mode)
+        self.__start_us = time.time_ns() // 1000
+        self.__start_counter = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration_us = (time.perf_counter_ns() - self.__start_counter) / 1000
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        if self.__memory_state is not None:
+            self.attributes.update(my_memory.on_span_exit(self.__memory_state))
+        stack = _get_stack()
+        stack.pop()
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": self.__start_us,
+            "dur": duration_us,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": self.attributes,
+        }
+        with _lock:
+            _events.append(event)
+            if len(stack) == 0 or len(_events) >= FLUSH_EVENT_COUNT:
+                _flush()
+        return False
+
+
+def _get_stack() -> List[Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _flush():
+    if _memory_mode is not None:
+        _events.extend(my_memory.pop_samples())
+    if len(_events) == 0 or _trace_dir is None:
+        return
+    with open(os.path.join(_trace_dir, f"{os.getpid()}.jsonl"), 'a') as f:
+        f.write(''.join([json.dumps(item, default=str) + '\n' for item in _events]))
+    _events.clear()
+
+
+def _reset_in_child():
+    # a forked worker inherits the spans open in the parent, which it never ends
+    global _events, _local, _lock
+    _events = []
+    _local = threading.local()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_in_child)
+
+
+def is_enabled() -> bool:
+    return _trace_dir is not None
+
+
+def enable(trace_dir: str, clear: bool = True, memory: Optional[str] = None):
+    """Trace this process and the processes it starts from now on, into `trace_dir`, with an optional memory mode."""
+    global _trace_dir, _memory_mode
+    assert memory in (None, my_memory.RSS_MODE, my_memory.TRACEMALLOC_MODE), f"Unknown memory mode {memory}!"
+    os.makedirs(trace_dir, exist_ok=True)
+    if clear:
+        for file_path in glob.glob(os.path.join(trace_dir, "*.jsonl")):
+            os.remove(file_path)
+    _trace_dir = os.path.abspath(trace_dir)
+    os.environ[TRACE_DIR_ENV] = _trace_dir
+    _memory_mode = memory
+    if memory is not None:
+        os.environ[my_memory.MEMORY_ENV] = memory
+    else:
+        os.environ.pop(my_memory.MEMORY_ENV, None)
+
+
+def disable():
+    global _trace_dir, _memory_mode
+    with _lock:
+        _flush()
+    _trace_dir = None
+    _memory_mode = None
+    os.environ.pop(TRACE_DIR_ENV, None)
+    os.environ.pop(my_memory.MEMORY_ENV, None)
+
+
+def span(name: str, **attributes):
+    if _trace_dir is None:
+        return _NULL_SPAN
+    return Span(name, attributes)
+
+
+def current_span():
+    """The innermost open span of this thread, e.g. to set attributes in a function decorated by `traced`."""
+    if _trace_dir is None:
+        return _NULL_SPAN
+    stack = _get_stack()
+    return stack[-1] if len(stack) > 0 else _NULL_SPAN
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running the function in a span named after it."""
+    def decorator(func: Callable):
+        span_name = func.__qualname__ if name is None else name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace_dir is None:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def load_events(trace_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    trace_dir = _trace_dir if trace_dir is None else trace_dir
+    with _lock:
+        _flush()
+    events = []
+    for file_path in sorted(glob.glob(os.path.join(trace_dir, "*.jsonl"))):
+        with open(file_path) as f:
+            events.extend([json.loads(line) for line in f if line.strip() != ""])
+    return sorted(events, key=lambda x: (x["ts"], -x.get("dur", 0)))
+
+
+def export(output_path: str, trace_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Write the spans of all the processes as a Chrome trace, and return them."""
+    events = load_events(trace_dir)
+    main_pid = os.getpid()
+    metadata = [
+        {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "main" if pid == main_pid else f"worker {pid}"}}
+        for pid in sorted(set([item["pid"] for item in events]))
+    ]
+    with open(output_path, 'w') as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+    return events
+
+
+def get_summary(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per span name: count, processes, total/mean/max seconds, and the sums of the numeric attributes."""
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        groups.setdefault(event["name"], []).append(event)
+    res = []
+    for name, group in groups.items():
+        durations = [item["dur"] / 1e6 for item in group]
+        row = {
+            "name": name,
+            "count": len(group),
+            "processes": len(set([item["pid"] for item in group])),
+            "total_s": sum(durations),
+            "mean_s": sum(durations) / len(durations),
+            "max_s": max(durations),
+        }
+        for event in group:
+            for key, value in event["args"].items():
+                # memory is reported by `my_memory.get_report`, as its sums are meaningless
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and not key.endswith("_mb"):
+                    row[key] = row.get(key, 0) + value
+        res.append(row)
+    return sorted(res, key=lambda x: -x["total_s"])
+
+
+def format_summary(summary: List[Dict[str, Any]]) -> str:
+    lines = [f"{'span':<56} {'count':>7} {'procs':>5} {'total [s]':>10} {'mean [s]':>10} {'max [s]':>10}  attributes"]
+    for row in summary:
+        attributes = ', '.join([f"{key}={value:.6g}" if isinstance(value, float) else f"{key}={value}" for key, value in row.items()
+                                if key not in ("name", "count", "processes", "total_s", "mean_s", "max_s")])
+        lines.append(f"{row['name'][:56]:<56} {row['count']:>7} {row['processes']:>5} "
+                     f"{row['total_s']:>10.3f} {row['mean_s']:>10.4f} {row['max_s']:>10.4f}  {attributes}")
+    return '\n'.join(lines)
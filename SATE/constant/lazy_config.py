@@ -0,0 +1,110 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+CONFIG_FILE_ENV = "SATE_CONFIG_FILE"
+RESOLVED_CONFIG_ENV = "SATE_RESOLVED_CONFIG"
+DEFAULT_CONFIG_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "config.yaml")
+
+_config_data = None
+
+
+def get_config_file_path() -> str:
+    return os.environ.get(CONFIG_FILE_ENV, DEFAULT_CONFIG_FILE_PATH)
+
+
+def _get_resolved_config() -> Optional[Dict[str, Any]]:
+    """The config resolved by an ancestor process, if it was read from the config file this process uses."""
+    if RESOLVED_CONFIG_ENV not in os.environ:
+        return None
+    resolved = json.loads(os.environ[RESOLVED_CONFIG_ENV])
+    if resolved.get("config_file") != os.path.abspath(get_config_file_path()):
+        return None
+    return resolved
+
+
+def get_config_data() -> Dict[str, Dict[str, Any]]:
+    """The sections of the config file, parsed once per process.
+
+    A process started by one that already resolved the same config file (e.g. a spawned pool worker) reads the
+    resolved values from the environment instead of parsing the file again.
+    """
+    global _config_data
+    if _config_data is None:
+        resolved = _get_resolved_config()
+        if resolved is not None:
+            _config_data = resolved["sections"]
+        else:
+            import yaml
+            from android_testing_utils.log import my_logger
+            my_logger.hint(my_logger.LogLevel.INFO, "Constant", True, f"Loading configs for Constant from {get_config_file_path()}")
+            with open(get_config_file_path()) as f:
+                _config_data = yaml.safe_load(f)
+    return _config_data
+
+
+def _cast(value, target_type):
+    if target_type is int:
+        return int(value)
+    if target_type is float:
+        return float(value)
+    if target_type is bool and isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return target_type(value)
+
+
+class LazyConfigMeta(type):
+    """Metaclass of config classes whose annotated attributes are filled from the config file on first access.
+
+    Each attribute can be overridden with the `SATE_<NAME>` environment variable, and assigning an attribute directly
+    still works. The resolved values are exported to the environment with the path of the config file, so child
+    processes using the same config file inherit them without parsing or logging again.
+    """
+    def __getattr__(cls, item):
+        if item.startswith('_') or item not in cls.__dict__.get('__annotations__', {}):
+            raise AttributeError(item)
+        cls.load()
+        return type.__getattribute__(cls, item)
+
+    def get_config_keys(cls):
+        return list(cls.__dict__.get('__annotations__', {}).keys())
+
+    def load(cls):
+        if cls.__dict__.get('_loaded', False):
+            return
+        is_inherited = _get_resolved_config() is not None
+        section = get_config_data()[cls.__name__]
+        for key, target_type in cls.__dict__['__annotations__'].items():
+            if key in cls.__dict__:
+                continue
+            value = os.environ.get(f"SATE_{key}", section.get(key))
+            assert (value is not None) and (value != ""), f"Please check the config file. {key} is not set."
+            setattr(cls, key, _cast(value, target_type))
+        cls._loaded = True
+        cls.publish()
+
+        if not is_inherited:
+            from android_testing_utils.log import my_logger
+            my_logger.hint(my_logger.LogLevel.INFO, "Constant", False, f"Current {cls.__name__}:")
+            for key, value in cls.export().items():
+                my_logger.hint(my_logger.LogLevel.INFO, "Constant", False, f"    {key}: {value}")
+
+    def export(cls) -> Dict[str, Any]:
+        """The resolved values, e.g. to pass to a worker which calls `restore`."""
+        return {key: getattr(cls, key) for key in cls.get_config_keys()}
+
+    def publish(cls):
+        resolved = _get_resolved_config() or {"config_file": os.path.abspath(get_config_file_path()), "sections": {}}
+        resolved["sections"][cls.__name__] = cls.export()
+        os.environ[RESOLVED_CONFIG_ENV] = json.dumps(resolved)
+
+    def restore(cls, values: Dict[str, Any]):
+        for key, value in values.items():
+            setattr(cls, key, value)
+        cls._loaded = True
+        cls.publish()
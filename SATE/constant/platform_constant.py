@@ -2,24 +2,27 @@
 # @Time  : 2022 Apr
 # @Author: Yuanhong Lan
 # ----------------------
-class PlatformConstant:
-    TIME_LENGTH = None
-    TIME_INTERVAL = None
+from constant.lazy_config import LazyConfigMeta
 
-    STATISTICS_DATA_ROOT_DIR = None
 
-    TOOL_LOG_ROOT_DIR = None
-    LOGCAT_BUG_ROOT_DIR = None
+class PlatformConstant(metaclass=LazyConfigMeta):
+    TIME_LENGTH: int
+    TIME_INTERVAL: int
 
-    APK_DIR = None
+    STATISTICS_DATA_ROOT_DIR: str
 
-    DEVICE_EC_DIR = None
-    LOCAL_EC_DIR = None
-    INSTRUMENTED_CODE_ROOT = None
-    COVERAGE_DATA_ROOT_DIR = None
+    TOOL_LOG_ROOT_DIR: str
+    LOGCAT_BUG_ROOT_DIR: str
 
-    DEVICE_SCREEN_RECORD_ROOT_DIR = None
-    LOCAL_SCREEN_RECORD_ROOT_DIR = None
+    APK_DIR: str
 
-    DEVICE_ANR_DIR = None
-    ANR_BUG_ROOT_DIR = None
+    DEVICE_EC_DIR: str
+    LOCAL_EC_DIR: str
+    INSTRUMENTED_CODE_ROOT: str
+    COVERAGE_DATA_ROOT_DIR: str
+
+    DEVICE_SCREEN_RECORD_ROOT_DIR: str
+    LOCAL_SCREEN_RECORD_ROOT_DIR: str
+
+    DEVICE_ANR_DIR: str
+    ANR_BUG_ROOT_DIR: str
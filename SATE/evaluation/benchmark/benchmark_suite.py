@@ -0,0 +1,460 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Benchmarks of the hot paths of the analysis stack on a generated result tree.
+
+    python -m evaluation.benchmark.benchmark_suite [BENCHMARK ...] [--work-dir DIR] [--repeat 3] [--threshold 0.2]
+        [--save-baseline] [--scale 10] ...
+
+The tree is generated under the work dir by `data_generator` (taking the same options) and reused while its options
+do not change. Each run is appended to `history.json` and compared with `baseline.json`, both in the work dir by
+default: a benchmark regresses when its time per unit is more than `threshold` slower than the baseline, and its
+outputs must have the digest they had in the baseline. The exit code is 1 when anything regressed or changed.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from android_testing_utils.log import my_logger
+from evaluation.data_manager import data_generator
+from evaluation.data_manager.data_generator import GeneratorConfig, ResultTreeGenerator
+
+
+SATE_ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "sate_benchmark")
+
+
+class BenchmarkContext(NamedTuple):
+    generator_config: GeneratorConfig
+    data_dir: str
+    excel_dir: str
+    config_file_path: str
+
+
+class BenchmarkCase(NamedTuple):
+    unit: str
+    unit_count: float
+    run: Callable[[], Any]
+    # the outputs of the last run, of which the digest is taken
+    get_output: Callable[[Any], Any]
+    # called before each run, outside of the timing
+    before_each: Optional[Callable[[], None]] = None
+
+
+class BenchmarkResult(NamedTuple):
+    unit: str
+    unit_count: float
+    times: List[float]
+    digest: str
+
+    @property
+    def seconds(self) -> float:
+        return min(self.times)
+
+    @property
+    def per_unit(self) -> float:
+        return self.seconds / self.unit_count if self.unit_count > 0 else math.nan
+
+
+def normalize(obj):
+    """A structure of builtins equal for equal outputs, with floats to 10 significant digits and dicts sorted."""
+    if isinstance(obj, pd.DataFrame):
+        return ["DataFrame", [str(item) for item in obj.columns], [str(item) for item in obj.index], normalize(obj.to_numpy().tolist())]
+    if isinstance(obj, pd.Series):
+        return ["Series", [str(item) for item in obj.index], normalize(obj.to_numpy().tolist())]
+    if isinstance(obj, np.ndarray):
+        return normalize(obj.tolist())
+    if isinstance(obj, dict):
+        return sorted([[str(key), normalize(value)] for key, value in obj.items()], key=lambda x: x[0])
+    if isinstance(obj, (list, tuple, set)):
+        items = [normalize(item) for item in obj]
+        return sorted(items, key=repr) if isinstance(obj, set) else items
+    if isinstance(obj, (float, np.floating)):
+        return "nan" if math.isnan(obj) else float(f"{obj:.10g}")
+    if isinstance(obj, np.integer):
+        return int(obj)
+    return obj
+
+
+def get_digest(obj) -> str:
+    return hashlib.sha256(repr(normalize(obj)).encode()).hexdigest()[:16]
+
+
+def read_outputs(dir_path: str, excludes: List[str] = ()) -> Dict[str, Any]:
+    """The working-format and npy files under a dir by relative path, npy files by their dir (names hold times)."""
+    res = {}
+    for current_dir, dir_names, file_names in os.walk(dir_path):
+        dir_names[:] = [item for item in dir_names if item not in excludes]
+        for file_name in file_names:
+            file_path = os.path.join(current_dir, file_name)
+            relative_path = os.path.relpath(file_path, dir_path)
+            if file_name.endswith(".pkl"):
+                res[relative_path] = pd.read_pickle(file_path)
+            elif file_name.endswith(".npy"):
+                res[os.path.dirname(relative_path)] = np.load(file_path, allow_pickle=True).item()
+    return res
+
+
+def list_files(dir_path: str, condition: Callable[[str], bool]) -> List[str]:
+    res = []
+    for current_dir, dir_names, file_names in os.walk(dir_path):
+        res.extend([os.path.join(current_dir, item) for item in file_names if condition(item)])
+    return sorted(res)
+
+
+def remove_combined_dirs(coverage_data_root_dir: str):
+    for package in os.listdir(coverage_data_root_dir):
+        for tag in os.listdir(os.path.join(coverage_data_root_dir, package)):
+            if '@' in tag:
+                shutil.rmtree(os.path.join(coverage_data_root_dir, package, tag))
+
+
+class Benchmarks:
+    @staticmethod
+    def logcat_parse(context: BenchmarkContext) -> BenchmarkCase:
+        from constant import PlatformConstant
+        from evaluation.result_analyzer.utils.fault_util import BugUtil
+        file_list = list_files(PlatformConstant.LOGCAT_BUG_ROOT_DIR, lambda x: "bug" in x)
+        return BenchmarkCase(
+            unit="MB",
+            unit_count=sum([os.path.getsize(item) for item in file_list]) / (1 << 20),
+            run=lambda: {item: BugUtil.bug_file_to_abstract_dict(item) for item in file_list},
+            get_output=lambda res: {os.path.basename(key): value for key, value in res.items()},
+        )
+
+    @staticmethod
+    def coverage_load(context: BenchmarkContext) -> BenchmarkCase:
+        from constant import PlatformConstant
+        file_list = list_files(PlatformConstant.COVERAGE_DATA_ROOT_DIR, lambda x: x.endswith(".npy"))
+        file_list = [item for item in file_list if '@' not in item]
+        return BenchmarkCase(
+            unit="file",
+            unit_count=len(file_list),
+            run=lambda: [np.load(item, allow_pickle=True).item() for item in file_list],
+            get_output=lambda res: res,
+        )
+
+    @staticmethod
+    def coverage_combine(context: BenchmarkContext) -> BenchmarkCase:
+        from constant import PlatformConstant
+        from evaluation.data_manager.data_combine import CoverageCombine
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+
+        def run():
+            for pattern in Experiments.TAG_PATTERN_DICT.keys():
+                CoverageCombine.combine_packages_with_pattern(pattern, need_std=True, target_apps=list(context.generator_config.apps))
+            return read_outputs(PlatformConstant.COVERAGE_DATA_ROOT_DIR, excludes=[])
+
+        config = context.generator_config
+        return BenchmarkCase(
+            unit="run",
+            unit_count=len(config.apps) * len(config.tools) * config.repetitions,
+            run=run,
+            get_output=lambda res: {key: value for key, value in res.items() if '@' in key},
+            before_each=lambda: remove_combined_dirs(PlatformConstant.COVERAGE_DATA_ROOT_DIR),
+        )
+
+    @staticmethod
+    def export(context: BenchmarkContext) -> BenchmarkCase:
+        from evaluation.data_manager.data_exporter import Export
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+        from evaluation.result_analyzer.utils.data_util import DataType
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        config = context.generator_config
+        return BenchmarkCase(
+            unit="run",
+            unit_count=len(config.apps) * len(config.tools) * config.repetitions,
+            run=lambda: Export.export_excel_with_tag_pattern_dict(
+                Experiments.TAG_PATTERN_DICT, target_time=config.duration, total_testing_time=config.duration, output_file_postfix=Experiments.CV_POSTFIX,
+            ),
+            get_output=lambda res: read_outputs(ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage)),
+        )
+
+    @staticmethod
+    def __prepare_coverage_original_data(context: BenchmarkContext):
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+        from evaluation.result_analyzer.utils.data_util import DataType
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        from evaluation.result_analyzer.utils.storage_util import StorageUtil
+        original_data_path = os.path.join(
+            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage), f"coverage_full_data_{Experiments.CV_POSTFIX}.xlsx"
+        )
+        if not StorageUtil.exists(original_data_path):
+            Benchmarks.export(context).run()
+        return original_data_path
+
+    @staticmethod
+    def significance(context: BenchmarkContext) -> BenchmarkCase:
+        import itertools
+        from evaluation.result_analyzer.analysis.significance_analysis import Significance
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+        from evaluation.result_analyzer.utils.data_util import DataType
+        original_data_path = Benchmarks.__prepare_coverage_original_data(context)
+        tools = list(Experiments.TAG_PATTERN_DICT.values())
+        pair_list = ['-'.join(item) for item in itertools.combinations(tools, 2)]
+
+        def run():
+            Significance.original_data_to_raw_significance_data(original_data_path, tools, DataType.Coverage, Experiments.CV_POSTFIX)
+            return [Significance.process_one_tool_pair(f"{pair}_{Experiments.CV_POSTFIX}.xlsx", DataType.Coverage) for pair in pair_list]
+
+        return BenchmarkCase(unit="pair", unit_count=len(pair_list), run=run, get_output=lambda res: res)
+
+    @staticmethod
+    def cv(context: BenchmarkContext) -> BenchmarkCase:
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments, FullProcess
+        from evaluation.result_analyzer.utils.data_util import DataType
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        Benchmarks.__prepare_coverage_original_data(context)
+        slicing_list = [item for item in Experiments.CV_SLICING_LIST if item <= context.generator_config.repetitions]
+        return BenchmarkCase(
+            unit="slicing",
+            unit_count=len(slicing_list),
+            run=lambda: FullProcess.full_process_from_original_data_to_cv_data(
+                DataType.Coverage, list(Experiments.TAG_PATTERN_DICT.values()), slicing_list, Experiments.CV_POSTFIX,
+            ),
+            get_output=lambda res: read_outputs(ExcelDirectoryPathGenerator.get_cv_data_dir()),
+        )
+
+    @staticmethod
+    def convergence(context: BenchmarkContext) -> BenchmarkCase:
+        from evaluation.result_analyzer.study_analyzer import convergence_analysis
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+        from evaluation.result_analyzer.utils.data_util import DataType
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        config = context.generator_config
+
+        def run():
+            convergence_analysis.FaultConvergenceTime.generate_raw_pickle_data(Experiments.TAG_PATTERN_DICT, Experiments.CV_POSTFIX, config.duration)
+            convergence_analysis.present_fault_convergence_result(postfix=Experiments.CV_POSTFIX, target_apps=list(config.apps))
+
+        return BenchmarkCase(
+            unit="app",
+            unit_count=len(config.apps),
+            run=run,
+            get_output=lambda res: read_outputs(ExcelDirectoryPathGenerator.get_time_data_dir(DataType.Bug)),
+        )
+
+    @staticmethod
+    def pipeline(context: BenchmarkContext) -> BenchmarkCase:
+        """`test.sh` end to end, in a subprocess on a separate excel dir holding the exported original data."""
+        from evaluation.data_manager.data_exporter import BugExperiment, CoverageExperiment
+        from evaluation.result_analyzer.study_analyzer import convergence_analysis
+        from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+
+        excel_dir = os.path.join(context.excel_dir, "pipeline")
+        kept_dirs = ["1st_original_data", "pickle"]
+        if not os.path.exists(excel_dir):
+            raw_excel_root_path = ExcelDirectoryPathGenerator.EXCEL_ROOT_PATH
+            ExcelDirectoryPathGenerator.EXCEL_ROOT_PATH = excel_dir
+            try:
+                CoverageExperiment.export_all_coverage_data()
+                BugExperiment.export_all_bug_data()
+                convergence_analysis.FaultConvergenceTime.generate_raw_pickle_data(
+                    Experiments.TAG_PATTERN_DICT, Experiments.CV_POSTFIX, context.generator_config.duration
+                )
+            finally:
+                ExcelDirectoryPathGenerator.EXCEL_ROOT_PATH = raw_excel_root_path
+
+        def before_each():
+            for current_dir, dir_names, file_names in os.walk(excel_dir):
+                dir_names[:] = [item for item in dir_names if item not in kept_dirs]
+                for file_name in file_names:
+                    os.remove(os.path.join(current_dir, file_name))
+
+        def run():
+            env = dict(os.environ, SATE_CONFIG_FILE=context.config_file_path, SATE_EXCEL_ROOT=excel_dir)
+            env["PYTHONPATH"] = os.pathsep.join([item for item in [env.get("PYTHONPATH"), SATE_ROOT_PATH] if item])
+            subprocess.run(
+                [sys.executable, os.path.join(SATE_ROOT_PATH, "sate.py"), "all"],
+                env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+
+        return BenchmarkCase(
+            unit="run",
+            unit_count=1,
+            run=run,
+            get_output=lambda res: read_outputs(excel_dir, excludes=kept_dirs),
+            before_each=before_each,
+        )
+
+
+BENCHMARKS: Dict[str, Callable[[BenchmarkContext], BenchmarkCase]] = {
+    "logcat-parse": Benchmarks.logcat_parse,
+    "coverage-load": Benchmarks.coverage_load,
+    "coverage-combine": Benchmarks.coverage_combine,
+    "export": Benchmarks.export,
+    "significance": Benchmarks.significance,
+    "cv": Benchmarks.cv,
+    "convergence": Benchmarks.convergence,
+    "pipeline": Benchmarks.pipeline,
+}
+
+
+class BenchmarkSuite:
+    @staticmethod
+    def prepare(generator_config: GeneratorConfig, work_dir: str) -> BenchmarkContext:
+        """Generate the result tree unless the one in the work dir has the same options, and use it in this process."""
+        data_dir = os.path.join(work_dir, "data")
+        excel_dir = os.path.join(work_dir, "excel")
+        generator_config_path = os.path.join(data_dir, "generator_config.json")
+        expected = dict(generator_config._asdict(), apps=[app.value for app in generator_config.apps], tools=list(generator_config.tools))
+        existing = None
+        if os.path.exists(generator_config_path):
+            with open(generator_config_path) as f:
+                existing = json.load(f)
+        if existing != expected:
+            for dir_path in [data_dir, excel_dir]:
+                if os.path.exists(dir_path):
+                    shutil.rmtree(dir_path)
+            ResultTreeGenerator.generate(generator_config, data_dir)
+        else:
+            my_logger.hint(my_logger.LogLevel.INFO, "Benchmark", True, f"Reuse the result tree in {data_dir}")
+
+        ResultTreeGenerator.use_result_tree(data_dir)
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        ExcelDirectoryPathGenerator.EXCEL_ROOT_PATH = excel_dir
+        return BenchmarkContext(generator_config, data_dir, excel_dir, os.path.join(data_dir, "config.yaml"))
+
+    @staticmethod
+    def run_benchmark(context: BenchmarkContext, name: str, repeat: int) -> BenchmarkResult:
+        case = BENCHMARKS[name](context)
+        times = []
+        res = None
+        for i in range(repeat):
+            if case.before_each is not None:
+                case.before_each()
+            start_time = time.perf_counter()
+            res = case.run()
+            times.append(time.perf_counter() - start_time)
+        result = BenchmarkResult(case.unit, case.unit_count, times, get_digest(case.get_output(res)))
+        my_logger.hint(my_logger.LogLevel.INFO, "Benchmark", True,
+                       f"[{name}] {result.seconds:.3f}s for {result.unit_count:g} {result.unit}, {result.per_unit:.4g}s per {result.unit}")
+        return result
+
+    @staticmethod
+    def get_git_revision() -> Optional[str]:
+        try:
+            return subprocess.run(["git", "rev-parse", "HEAD"], cwd=SATE_ROOT_PATH, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def get_record(context: BenchmarkContext, repeat: int, results: Dict[str, BenchmarkResult]) -> Dict[str, Any]:
+        generator_config = context.generator_config
+        return {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": BenchmarkSuite.get_git_revision(),
+            "host": platform.node(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "generator": dict(generator_config._asdict(), apps=[app.value for app in generator_config.apps], tools=list(generator_config.tools)),
+            "repeat": repeat,
+            "results": {
+                name: {
+                    "unit": result.unit,
+                    "unit_count": result.unit_count,
+                    "seconds": result.seconds,
+                    "median": float(np.median(result.times)),
+                    "per_unit": result.per_unit,
+                    "digest": result.digest,
+                }
+                for name, result in results.items()
+            },
+        }
+
+    @staticmethod
+    def append_history(history_path: str, record: Dict[str, Any]):
+        history = []
+        if os.path.exists(history_path):
+            with open(history_path) as f:
+                history = json.load(f)
+        history.append(record)
+        with open(history_path, 'w') as f:
+            json.dump(history, f, indent=2)
+
+    @staticmethod
+    def compare(record: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> pd.DataFrame:
+        """Per benchmark time ratio to the baseline, slowdown beyond `threshold` and output equivalence."""
+        if baseline["generator"] != record["generator"]:
+            my_logger.hint(my_logger.LogLevel.WARNING, "Benchmark", False, "The baseline was taken on a result tree with other options, only the times per unit are comparable!")
+        res = pd.DataFrame(columns=["per_unit", "baseline_per_unit", "ratio", "slower", "output"])
+        for name, result in record["results"].items():
+            if name not in baseline["results"]:
+                res.loc[name] = [result["per_unit"], None, None, False, "no baseline"]
+                continue
+            baseline_result = baseline["results"][name]
+            ratio = result["per_unit"] / baseline_result["per_unit"]
+            if baseline["generator"] != record["generator"]:
+                output = "not comparable"
+            else:
+                output = "same" if result["digest"] == baseline_result["digest"] else "DIFFERENT"
+            res.loc[name] = [result["per_unit"], baseline_result["per_unit"], round(ratio, 3), ratio > 1 + threshold, output]
+        return res
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis stack on a generated result tree.")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK", help=f"the benchmarks to run, all by default: {', '.join(BENCHMARKS.keys())}")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where the result tree, the outputs and the history are kept")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark, of which the fastest counts")
+    parser.add_argument("--history", default=None, help="history file, <work-dir>/history.json by default")
+    parser.add_argument("--baseline", default=None, help="baseline file, <work-dir>/baseline.json by default")
+    parser.add_argument("--save-baseline", action="store_true", help="make this run the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown relative to the baseline, e.g. 0.2 for 20%%")
+    data_generator.add_arguments(parser)
+    parser.set_defaults(apps=None, repetitions=5)
+    args = parser.parse_args(argv)
+
+    unknown_names = [item for item in args.benchmarks if item not in BENCHMARKS]
+    if len(unknown_names) > 0:
+        parser.error(f"unknown benchmarks {unknown_names}, choose from {list(BENCHMARKS.keys())}")
+
+    generator_config = data_generator.get_config(args)
+    if args.apps is None:
+        generator_config = generator_config._replace(apps=generator_config.apps[:5])
+    work_dir = os.path.abspath(args.work_dir)
+    history_path = args.history if args.history is not None else os.path.join(work_dir, "history.json")
+    baseline_path = args.baseline if args.baseline is not None else os.path.join(work_dir, "baseline.json")
+
+    context = BenchmarkSuite.prepare(generator_config, work_dir)
+    names = args.benchmarks if len(args.benchmarks) > 0 else list(BENCHMARKS.keys())
+    results = {name: BenchmarkSuite.run_benchmark(context, name, args.repeat) for name in names}
+    record = BenchmarkSuite.get_record(context, args.repeat, results)
+    BenchmarkSuite.append_history(history_path, record)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(record, f, indent=2)
+        my_logger.hint(my_logger.LogLevel.INFO, "Benchmark", False, f"Baseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        my_logger.hint(my_logger.LogLevel.WARNING, "Benchmark", False, f"No baseline at {baseline_path}, run with --save-baseline first!")
+        return 0
+
+    with open(baseline_path) as f:
+        comparison = BenchmarkSuite.compare(record, json.load(f), args.threshold)
+    print(comparison)
+    failed = comparison[(comparison["slower"] == True) | (comparison["output"] == "DIFFERENT")]
+    if len(failed) > 0:
+        my_logger.hint(my_logger.LogLevel.ERROR, "Benchmark", False, f"Regressed or changed: {list(failed.index)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
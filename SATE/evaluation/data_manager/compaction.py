@@ -0,0 +1,69 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Compress the tool logs and logcat dumps of finished tags in place, which the analyzers read transparently.
+
+    python -m evaluation.data_manager.compaction TAG_PATTERN [TAG_PATTERN ...] [--format {.gz,.xz,.zst}] [--level N]
+
+Regenerate the result manifest of the compacted tags afterwards, as their files are replaced.
+"""
+import argparse
+import multiprocessing
+import os
+from typing import List
+
+from android_testing_utils.log import my_logger
+from constant import PlatformConstant
+from evaluation.result_analyzer.utils.compression_util import CompressionUtil
+from evaluation.result_analyzer.utils.pattern_util import TagMatcher
+
+
+PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+
+
+class Compaction:
+    @staticmethod
+    def get_target_files(tag_patterns: List[str]) -> List[str]:
+        """The plain files of the matched tags under the tool log and logcat bug roots."""
+        tag_matcher = TagMatcher(tag_patterns)
+        res = []
+        for root_dir in [PlatformConstant.TOOL_LOG_ROOT_DIR, PlatformConstant.LOGCAT_BUG_ROOT_DIR]:
+            for tag in sorted(os.listdir(root_dir)):
+                if not tag_matcher.is_match(tag):
+                    continue
+                tag_dir = os.path.join(root_dir, tag)
+                res.extend([
+                    os.path.join(tag_dir, item) for item in sorted(os.listdir(tag_dir))
+                    if CompressionUtil.get_suffix(item) is None and not item.endswith(CompressionUtil.TEMP_SUFFIX) and os.path.isfile(os.path.join(tag_dir, item))
+                ])
+        return res
+
+    @staticmethod
+    def compact(tag_patterns: List[str], suffix: str = ".gz", level: int = None) -> List[str]:
+        file_paths = Compaction.get_target_files(tag_patterns)
+        raw_size = sum([os.path.getsize(item) for item in file_paths])
+        my_logger.hint(my_logger.LogLevel.INFO, "Compaction", True, f"Compressing [{len(file_paths)}] files of {raw_size / (1 << 20):.1f} MB to {suffix} ...")
+        param = [(file_path, suffix, level) for file_path in file_paths]
+        if PROCESS_COUNT > 1 and len(param) > 1:
+            with multiprocessing.Pool(min(PROCESS_COUNT, len(param))) as pool:
+                res = pool.starmap(CompressionUtil.compress_file, param)
+        else:
+            res = [CompressionUtil.compress_file(*item) for item in param]
+        compressed_size = sum([os.path.getsize(item) for item in res])
+        my_logger.hint(my_logger.LogLevel.INFO, "Compaction", True,
+                       f"Compressed to {compressed_size / (1 << 20):.1f} MB ({compressed_size / max(raw_size, 1):.1%})")
+        return res
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Compress the tool logs and logcat dumps of finished tags.")
+    parser.add_argument("tag_patterns", nargs="+", help="tag patterns, e.g. empirical-0816-ape~")
+    parser.add_argument("--format", choices=CompressionUtil.SUFFIXES, default=".gz")
+    parser.add_argument("--level", type=int, default=None, help="compression level, the default of the format if not given")
+    args = parser.parse_args(argv)
+    Compaction.compact(args.tag_patterns, args.format, args.level)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,13 +12,15 @@ from typing import List, Dict, Optional, Tuple
 
 from pandas.api.types import CategoricalDtype
 
-from android_testing_utils.log import my_logger
+from android_testing_utils.log import my_logger, my_tracer
 from constant import PlatformConstant
 from evaluation.result_analyzer.study_analyzer.convergence_analysis import PERCENTAGE_TARGETS
 from evaluation.result_analyzer.utils.coverage_util import CoverageTimeUtil, CoverageDataUtil
 from evaluation.result_analyzer.utils.data_util import DataType
-from evaluation.result_analyzer.utils.pattern_util import PatternUtil
+from evaluation.result_analyzer.utils.pattern_util import TagMatcher
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 from runtime_collection import unified_testing_config
 from runtime_collection.collector_util.util_coverage import CoverageItem, CoverageDetail, CoverageDetailWithStd, \
     get_readable_final_coverage_info_string
@@ -137,27 +139,30 @@ class CoverageCombine:
             need_std: bool = False,
             target_apps: Optional[List[unified_testing_config.Apps]] = None,
     ):
-        for package in os.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
+        tag_matcher = TagMatcher([tag_pattern])
+        for package in ResultRoot.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
             if (target_apps is not None) and (unified_testing_config.get_app_by_package_name(package) not in target_apps):
                 continue
             package_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package)
 
             data_to_combine: List[Dict[str, List[CoverageItem]]] = []
             tag_to_combine = []
-            for tag in os.listdir(package_dir):
-                if PatternUtil.is_match(tag_pattern, tag):
-                    tag_to_combine.append(tag)
-                    tag_dir = os.path.join(package_dir, tag)
-
-                    temp = {}
-                    if len(os.listdir(tag_dir)) != 4:
-                        my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Not 4 items, Continue! {tag_dir}")
-                        continue
-                    for file in os.listdir(tag_dir):
-                        if file.endswith(".npy"):
-                            data: Dict[str, List[CoverageItem]] = np.load(os.path.join(tag_dir, file), allow_pickle=True).item()
-                            temp.update(data)
-                    data_to_combine.append(temp)
+            with my_tracer.span("CoverageCombine.load_package", package=package) as load_span:
+                for tag in ResultRoot.listdir(package_dir):
+                    if tag_matcher.is_match(tag):
+                        tag_to_combine.append(tag)
+                        tag_dir = os.path.join(package_dir, tag)
+
+                        temp = {}
+                        if len(ResultRoot.listdir(tag_dir)) != 4:
+                            my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Not 4 items, Continue! {tag_dir}")
+                            continue
+                        for file in ResultRoot.listdir(tag_dir):
+                            if file.endswith(".npy"):
+                                data: Dict[str, List[CoverageItem]] = ResultRoot.load_npy(os.path.join(tag_dir, file)).item()
+                                temp.update(data)
+                        data_to_combine.append(temp)
+                load_span.set(tag_count=len(data_to_combine))
 
             if len(tag_to_combine) == 0:
                 my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Nothing to combine for {package}")
@@ -165,6 +170,7 @@ class CoverageCombine:
 
             combine_tag = tag_pattern.replace('**', '') if '**' in tag_pattern else tag_pattern[:-1]
             save_dir = os.path.join(package_dir, f"{combine_tag}@{len(data_to_combine)}")
+            ResultRoot.check_writable(save_dir)
             if os.path.exists(save_dir):
                 s = input(f"Path {save_dir} exists, remove?(y/n)")
                 if s == 'y':
@@ -179,13 +185,14 @@ class CoverageCombine:
             raw_file_path = os.path.join(save_dir, f"{file_name_prefix}.npy")
             log_file_path = os.path.join(save_dir, f"{file_name_prefix}.txt")
 
-            res = CoverageCombine.__combine_coverage_raw_data_dicts(
-                raw_data_dicts=data_to_combine,
-                need_std=need_std,
-                recalculate_std=True,
-                recalculate_rate=True,
-                same_package=True,
-            )
+            with my_tracer.span("CoverageCombine.combine_package", package=package, tag_count=len(data_to_combine)):
+                res = CoverageCombine.__combine_coverage_raw_data_dicts(
+                    raw_data_dicts=data_to_combine,
+                    need_std=need_std,
+                    recalculate_std=True,
+                    recalculate_rate=True,
+                    same_package=True,
+                )
 
             np.save(raw_file_path, res)
 
@@ -208,19 +215,19 @@ class CoverageCombine:
         data_to_combine: List[Dict[str, List[CoverageItem]]] = []
         target_to_combine: List[Tuple[str, str]] = []
 
-        for package in os.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
+        for package in ResultRoot.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
             package_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package)
 
-            for tag in os.listdir(package_dir):
+            for tag in ResultRoot.listdir(package_dir):
                 if tag in tag_list:
                     tag_dir = os.path.join(package_dir, tag)
                     temp = {}
-                    if len(os.listdir(tag_dir)) != expected_file_num:
+                    if len(ResultRoot.listdir(tag_dir)) != expected_file_num:
                         my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Not {expected_file_num} items, Continue! {tag_dir}")
                         continue
-                    for file in os.listdir(tag_dir):
+                    for file in ResultRoot.listdir(tag_dir):
                         if file.endswith(".npy"):
-                            data: Dict[str, List[CoverageItem]] = np.load(os.path.join(tag_dir, file), allow_pickle=True).item()
+                            data: Dict[str, List[CoverageItem]] = ResultRoot.load_npy(os.path.join(tag_dir, file)).item()
                             temp.update(data)
 
                     target_to_combine.append((package, tag))
@@ -242,6 +249,7 @@ class CoverageCombine:
                 return
 
         save_dir = os.path.join(PlatformConstant.STATISTICS_DATA_ROOT_DIR, f"{combined_tag}@{len(data_to_combine)}")
+        ResultRoot.check_writable(save_dir)
         if os.path.exists(save_dir):
             s = input(f"Path {save_dir} exists, remove?(y/n)")
             if s == 'y':
@@ -291,7 +299,7 @@ def from_full_data_to_average_data(file_to_read: str, file_to_write: str, data_t
     file_path_to_read = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), file_to_read)
     file_path_to_write = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), file_to_write)
 
-    df = pd.read_excel(file_path_to_read, index_col=0)  # Assuming the first column is the index
+    df = StorageUtil.read(file_path_to_read, index_col=0)  # Assuming the first column is the index
 
     df_grouped = df.groupby(df.index).mean()
 
@@ -305,7 +313,7 @@ def from_full_data_to_average_data(file_to_read: str, file_to_write: str, data_t
             res[sub_metric] = pd.DataFrame(index=df_grouped.index)
         res[sub_metric][app_name] = df_grouped[column]
 
-    excel_writer = pd.ExcelWriter(file_path_to_write)
+    sheets: Dict[str, pd.DataFrame] = {}
     for sub_metric, df_sub in res.items():
         df_sub = df_sub.transpose()
 
@@ -317,16 +325,16 @@ def from_full_data_to_average_data(file_to_read: str, file_to_write: str, data_t
         df_sub.columns = df_sub.columns.astype(my_columns_order)
         df_sub.sort_index(axis=1, inplace=True)
 
-        df_sub.to_excel(excel_writer, sheet_name=sub_metric)
+        sheets[sub_metric] = df_sub
 
-    excel_writer.save()
+    StorageUtil.write_sheets(file_path_to_write, sheets, export_excel=True)
 
 
 def from_average_data_to_average_cmp_data(file_to_read: str, file_to_write: str, data_type: DataType):
     file_path_to_read = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), file_to_read)
     file_path_to_write = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), file_to_write)
 
-    dfs = pd.read_excel(file_path_to_read, index_col=0, sheet_name=None)
+    dfs = StorageUtil.read(file_path_to_read, index_col=0, sheet_name=None)
 
     tool_pairs = ['-'.join(item) for item in itertools.combinations(SORTED_TOOL_NAME_LIST, 2)]
     res = {}
@@ -364,18 +372,14 @@ def from_average_data_to_average_cmp_data(file_to_read: str, file_to_write: str,
     print(all_equal.sum(), len(all_equal), all_equal.sum() / len(all_equal))
     df_all["equal_3"] = all_equal
 
-    excel_writer = pd.ExcelWriter(file_path_to_write)
-    for sub_metric, df_sub in res.items():
-        df_sub.to_excel(excel_writer, sheet_name=sub_metric)
-
-    excel_writer.save()
+    StorageUtil.write_sheets(file_path_to_write, res, export_excel=True)
 
 
 def from_significance_data_to_tool_significance_level(file_to_read: str, file_to_write: str, data_type: DataType):
     file_path_to_read = os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), file_to_read)
     file_path_to_write = os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), file_to_write)
 
-    dfs = pd.read_excel(file_path_to_read, index_col=0, sheet_name=None)  # Assuming the first column is the index
+    dfs = StorageUtil.read(file_path_to_read, index_col=0, sheet_name=None)  # Assuming the first column is the index
     res = {}
 
     for sheet_name, sheet_data in dfs.items():
@@ -396,11 +400,7 @@ def from_significance_data_to_tool_significance_level(file_to_read: str, file_to
                     res[column].loc[index, tool2] += 1
                     res[column].loc[index, tool1] -= 1
 
-    excel_writer = pd.ExcelWriter(file_path_to_write)
-    for sub_metric, df_sub in res.items():
-        df_sub.to_excel(excel_writer, sheet_name=sub_metric)
-
-    excel_writer.save()
+    StorageUtil.write_sheets(file_path_to_write, res, export_excel=True)
 
 
 def combine_cv_data_to_one(file_to_write, tasks):
@@ -408,7 +408,7 @@ def combine_cv_data_to_one(file_to_write, tasks):
 
     def add_data(file_name, submetric_targets):
         cv_data_path = os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), file_name)
-        dfs = pd.read_excel(cv_data_path, index_col=0, sheet_name=None)
+        dfs = StorageUtil.read(cv_data_path, index_col=0, sheet_name=None)
         for sheet_name, sheet_data in dfs.items():
             tool = sheet_name.split('|')[1]
             if 'cv' not in sheet_name or tool not in SORTED_TOOL_NAME_LIST:
@@ -423,11 +423,7 @@ def combine_cv_data_to_one(file_to_write, tasks):
     for file_name, targets in tasks.items():
         add_data(file_name, targets)
 
-    excel_writer = pd.ExcelWriter(os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), file_to_write))
-    for sub_metric, df_sub in res.items():
-        df_sub.to_excel(excel_writer, sheet_name=sub_metric)
-
-    excel_writer.save()
+    StorageUtil.write_sheets(os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), file_to_write), res, export_excel=True)
 
 
 tool_mapping = {item.lower(): item for item in SORTED_TOOL_NAME_LIST}
@@ -436,7 +432,7 @@ def combine_convergence_data_to_one(file_to_write, tasks, get_average=False):
 
     def add_data(file_name, data_type, submetric_mapping):
         convergence_data_path = os.path.join(ExcelDirectoryPathGenerator.get_time_data_dir(data_type), file_name)
-        dfs = pd.read_excel(convergence_data_path, index_col=0, sheet_name=None)
+        dfs = StorageUtil.read(convergence_data_path, index_col=0, sheet_name=None)
         for sheet_name, sheet_data in dfs.items():
             raw_tool = sheet_name.split('~')[0].split('-')[-1]
             tool = tool_mapping[raw_tool]
@@ -454,13 +450,13 @@ def combine_convergence_data_to_one(file_to_write, tasks, get_average=False):
 
     # Path to save the temporary Excel file
     temp_file_path = os.path.join(ExcelDirectoryPathGenerator.get_time_data_dir(None), file_to_write)
-    excel_writer = pd.ExcelWriter(temp_file_path, engine='openpyxl')
+    sheets: Dict[str, pd.DataFrame] = {}
     for sub_metric, df_sub in res.items():
         if get_average:
             df_sub["avg-all"] = np.round(df_sub.mean(axis=1), 2)
-        df_sub.to_excel(excel_writer, sheet_name=sub_metric)
+        sheets[sub_metric] = df_sub
 
-    excel_writer.save()
+    StorageUtil.write_sheets(temp_file_path, sheets, export_excel=True)
 
 
 # if __name__ == '__main__':
@@ -6,22 +6,48 @@ import os
 from functools import partial
 from typing import Dict, Optional, List, Set, Callable, Tuple
 
-import numpy as np
 import pandas as pd
 
-from android_testing_utils.log import my_logger
+from android_testing_utils.log import my_logger, my_tracer
 from constant import PlatformConstant
+from evaluation.data_manager.result_manifest import ResultManifest
+from evaluation.result_analyzer.analysis.resampling_analysis import Resampling
 from evaluation.result_analyzer.utils.fault_util import LogcatUtil, FaultDomain, AbstractItem, BugAnalyzer, FaultResUtil
 from evaluation.result_analyzer.study_analyzer.study_util import Experiments
 from evaluation.result_analyzer.utils.coverage_util import CoverageTimeUtil
 from evaluation.result_analyzer.utils.data_util import DataType
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator, PathUtil
-from evaluation.result_analyzer.utils.pattern_util import PatternUtil
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+from evaluation.result_analyzer.utils.pattern_util import PatternUtil, TagMatcher
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 from runtime_collection import unified_testing_config
 from runtime_collection.collector_util.util_coverage import CoverageItem
 
 
+def records_to_dataframe(
+        records: List[Tuple[str, str, object]],
+        index: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Build a frame from (index, column, value) records in one pivot, later records win like `.loc` writes."""
+    if index is None:
+        index = list(dict.fromkeys(record[0] for record in records))
+    if columns is None:
+        columns = list(dict.fromkeys(record[1] for record in records))
+    if len(records) == 0:
+        return pd.DataFrame(index=index, columns=columns)
+
+    data = pd.DataFrame.from_records(records, columns=["index", "column", "value"])
+    data = data.drop_duplicates(subset=["index", "column"], keep="last")
+    data = data.pivot(index="index", columns="column", values="value")
+    data = data.reindex(index=index, columns=columns)
+    return data.rename_axis(index=None, columns=None)
+
+
 class Export:
+    RAW_DATA_COLUMNS = ["INSTRUCTION", "BRANCH", "LINE", "COMPLEXITY", "METHOD", "CLASS", "ACTIVITY"]
+    FULL_DATA_COLUMNS = ["INSTRUCTION", "LINE", "METHOD", "ACTIVITY"]
+
     @classmethod
     def export_excel_with_tag_pattern_dict(
             cls,
@@ -32,64 +58,54 @@ class Export:
             output_file_postfix: Optional[str] = None,
             print_details: bool = False,
     ):
-        tag_pattern_list = list(tag_pattern_dict.keys())
+        tag_matcher = TagMatcher(list(tag_pattern_dict.keys()))
 
-        excel_writer = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage),
-            f"coverage_raw_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
-        ))
-        excel_writer_spss = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage),
-            f"coverage_full_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
-        ))
-        all_data = pd.DataFrame()
+        raw_data_sheets: Dict[str, pd.DataFrame] = {}
+        all_columns: List[str] = []
+        all_records: List[Tuple[str, str, float]] = []
 
-        for package in os.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
+        for package in ResultRoot.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
             if (target_apps is not None) and (unified_testing_config.get_app_by_package_name(package) not in target_apps):
                 continue
             app_name = unified_testing_config.get_app_name_by_package_name(package)
 
-            current_data = pd.DataFrame(columns=[
-                "INSTRUCTION",
-                "BRANCH",
-                "LINE",
-                "COMPLEXITY",
-                "METHOD",
-                "CLASS",
-                "ACTIVITY",
-            ])
-            all_data = pd.concat([all_data, pd.DataFrame(columns=[
-                f"{app_name}-INSTRUCTION",
-                f"{app_name}-LINE",
-                f"{app_name}-METHOD",
-                f"{app_name}-ACTIVITY",
-            ])])
+            current_records: List[Tuple[str, str, float]] = []
+            all_columns.extend([f"{app_name}-{key}" for key in cls.FULL_DATA_COLUMNS])
 
             package_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package)
 
-            for tag in os.listdir(package_dir):
-
-                if '@' in tag or not PatternUtil.is_match_among_list(tag_pattern_list, tag):
-                    continue
-
-                tag_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package, tag)
-                if len(os.listdir(tag_dir)) != 4:
-                    my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Not 4 items, Continue! {tag_dir}")
-                    continue
-                for file in os.listdir(tag_dir):
-                    if file.endswith(".npy"):
-                        temp_data: Dict[str, List[CoverageItem]] = np.load(os.path.join(tag_dir, file), allow_pickle=True).item()
-                        for key, value in temp_data.items():
-                            true_value = CoverageTimeUtil.get_appointed_time_coverage(value, target_time, total_testing_time)
-                            current_data.loc[tag, key] = true_value
-
-                            if tag[-3:-1] == '-p':
-                                all_data_tag = tag[:-3]
-                            else:
-                                all_data_tag = tag
-                            all_data_key = f"{app_name}-{key}"
-                            if all_data_key in all_data.columns:
-                                all_data.loc[all_data_tag, all_data_key] = true_value
+            with my_tracer.span("Export.load_package", package=package) as load_span:
+                npy_files: List[Tuple[str, str]] = []
+                for tag in ResultRoot.listdir(package_dir):
+
+                    if '@' in tag or not tag_matcher.is_match(tag):
+                        continue
+
+                    tag_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package, tag)
+                    if len(ResultRoot.listdir(tag_dir)) != 4:
+                        my_logger.hint(my_logger.LogLevel.WARNING, "DataUtil", False, f"Not 4 items, Continue! {tag_dir}")
+                        continue
+                    npy_files.extend([(tag, os.path.join(tag_dir, file)) for file in ResultRoot.listdir(tag_dir) if file.endswith(".npy")])
+
+                intact_files = set(ResultManifest.filter_intact_files([file_path for _, file_path in npy_files]))
+                for tag, file_path in npy_files:
+                    if file_path not in intact_files:
+                        continue
+                    temp_data: Dict[str, List[CoverageItem]] = ResultRoot.load_npy(file_path).item()
+                    for key, value in temp_data.items():
+                        true_value = CoverageTimeUtil.get_appointed_time_coverage(value, target_time, total_testing_time)
+                        current_records.append((tag, key, true_value))
+
+                        if tag[-3:-1] == '-p':
+                            all_data_tag = tag[:-3]
+                        else:
+                            all_data_tag = tag
+                        if key in cls.FULL_DATA_COLUMNS:
+                            all_records.append((all_data_tag, f"{app_name}-{key}", true_value))
+                load_span.set(record_count=len(current_records))
+
+            current_columns = list(dict.fromkeys(cls.RAW_DATA_COLUMNS + [record[1] for record in current_records]))
+            current_data = records_to_dataframe(current_records, columns=current_columns)
             current_data.sort_index(
                 inplace=True,
                 key=lambda x: x.map(lambda y: ('-'.join(y.split('-')[:-1]), int(y.split('-')[-1])))
@@ -98,10 +114,14 @@ class Export:
             if print_details:
                 my_logger.hint(my_logger.LogLevel.INFO, "Export", False,f"\n#############    {app_name}    ############# \n{current_data}")
 
-            current_data.to_excel(excel_writer, sheet_name=app_name)
+            raw_data_sheets[app_name] = current_data
 
-        excel_writer.save()
+        StorageUtil.write_sheets(os.path.join(
+            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage),
+            f"coverage_raw_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
+        ), raw_data_sheets, export_excel=True)
 
+        all_data = records_to_dataframe(all_records, columns=all_columns)
         all_data = all_data.fillna(-1)
         all_data.sort_index(
             inplace=True,
@@ -109,10 +129,10 @@ class Export:
         )
 
         PatternUtil.rename_dataframe_by_tag_pattern_dict(all_data, tag_pattern_dict)
-        all_data.to_excel(excel_writer_spss)
-
-        excel_writer_spss.save()
-        excel_writer_spss.close()
+        StorageUtil.write(os.path.join(
+            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Coverage),
+            f"coverage_full_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
+        ), all_data, export_excel=True)
 
 
 class CoverageExperiment:
@@ -140,17 +160,10 @@ class BugExperiment:
             target_time: int = None,
             output_file_postfix: Optional[str] = None,
     ):
-        excel_writer = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Bug),
-            f"bug_raw_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
-        ))
-        excel_writer_spss = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Bug),
-            f"bug_full_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
-        ))
-
         all_abstract_data: Dict[str, Dict[str, Set[str]]] = {}
-        all_data = pd.DataFrame()
+        all_index: List[str] = []
+        all_columns: List[str] = []
+        all_records: List[Tuple[str, str, int]] = []
 
         my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start analyzing bug data ...")
         for pattern in pattern_dict.keys():
@@ -166,20 +179,21 @@ class BugExperiment:
                 target_time=target_time,
             )
 
-            tag_name_list = list(set([PathUtil.get_tag_name_from_logcat_file_path(file_key) for file_key in abstract_dict.keys()]))
-            app_name_list = list(set([PathUtil.get_app_name_from_logcat_file_path(file_key) for file_key in abstract_dict.keys()]))
-            all_data = pd.concat([all_data, pd.DataFrame(index=tag_name_list, columns=[f"{app_name}-{bug_domain.value}" for app_name in app_name_list for bug_domain in FaultDomain])])
+            path_info_dict = {file_key: PathUtil.parse_result_file_path(file_key) for file_key in abstract_dict.keys()}
+            tag_name_list = list(set([path_info.tag for path_info in path_info_dict.values()]))
+            app_name_list = list(set([path_info.app_name for path_info in path_info_dict.values()]))
+            all_index.extend(tag_name_list)
+            all_columns.extend([f"{app_name}-{bug_domain.value}" for app_name in app_name_list for bug_domain in FaultDomain])
 
             for file_key, abstract_data in abstract_dict.items():
-                tag_name = PathUtil.get_tag_name_from_logcat_file_path(file_key)
-                app_name = PathUtil.get_app_name_from_logcat_file_path(file_key)
+                tag_name, app_name = path_info_dict[file_key].tag, path_info_dict[file_key].app_name
 
                 if app_name not in all_abstract_data:
                     all_abstract_data[app_name] = {}
                 all_abstract_data[app_name][tag_name] = set(abstract_data.keys())
 
                 for bug_domain, count in LogcatUtil.get_num_of_different_bugs(abstract_data.keys()).items():
-                    all_data.loc[tag_name, f"{app_name}-{bug_domain.value}"] = count
+                    all_records.append((tag_name, f"{app_name}-{bug_domain.value}", count))
 
         my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start counting extra bug data ...")
 
@@ -198,7 +212,7 @@ class BugExperiment:
                     new_app_data[tag_name] = combined_keys
                     if write_back:
                         for bug_domain, count in LogcatUtil.get_num_of_different_bugs(combined_keys).items():
-                            all_data.loc[tag_name, f"{app_name}-{prefix}{bug_domain.value}"] = count
+                            all_records.append((tag_name, f"{app_name}-{prefix}{bug_domain.value}", count))
             return new_app_data
 
         for app_name, app_data in all_abstract_data.items():
@@ -227,6 +241,16 @@ class BugExperiment:
             #     "AU",
             # )
 
+        my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start resampling the union of faults ...")
+        Resampling.fault_sets_to_resampled_union_data(
+            all_abstract_data,
+            TagMatcher(pattern_dict).get_target,
+            k_list=list(range(1, 11)),
+            postfix=output_file_postfix,
+        )
+
+        all_columns = list(dict.fromkeys(all_columns + [record[1] for record in all_records]))
+        all_data = records_to_dataframe(all_records, index=all_index, columns=all_columns)
         all_data = all_data.fillna(-1)
         all_data = all_data.astype(int)
         all_data.sort_index(
@@ -234,24 +258,20 @@ class BugExperiment:
             key=lambda x: x.map(lambda y: ('-'.join(y.split('-')[:-1]), int(y.split('-')[-1])))
         )
 
-        all_app_data = {}
+        all_app_columns: Dict[str, List[str]] = {}
         for column in all_data.columns:
-            app_name = column.split('-')[0]
-            current_line_data = pd.DataFrame(all_data[column], columns=[column])
-            if app_name in all_app_data:
-                all_app_data[app_name] = pd.concat([all_app_data[app_name], current_line_data], axis=1)
-            else:
-                all_app_data[app_name] = current_line_data
+            all_app_columns.setdefault(column.split('-')[0], []).append(column)
 
-        for app_name, app_data in all_app_data.items():
-            app_data.to_excel(excel_writer, sheet_name=app_name)
-
-        excel_writer.save()
+        StorageUtil.write_sheets(os.path.join(
+            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Bug),
+            f"bug_raw_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
+        ), {app_name: all_data[app_columns] for app_name, app_columns in all_app_columns.items()}, export_excel=True)
 
         PatternUtil.rename_dataframe_by_tag_pattern_dict(all_data, pattern_dict)
-        all_data.to_excel(excel_writer_spss)
-
-        excel_writer_spss.save()
+        StorageUtil.write(os.path.join(
+            ExcelDirectoryPathGenerator.get_original_data_dir(DataType.Bug),
+            f"bug_full_data{'_' + output_file_postfix if output_file_postfix is not None else ''}.xlsx"
+        ), all_data, export_excel=True)
 
     @classmethod
     def export_all_bug_data(cls):
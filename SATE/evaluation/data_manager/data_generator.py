@@ -0,0 +1,462 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Synthetic experimental result trees, laid out like the roots in `PlatformConstant`.
+
+    python -m evaluation.data_manager.data_generator OUTPUT_DIR [--scale 10] [--fault-rate 2.0] [--seed 0] ...
+
+For each app, tool and repetition (tag `<tool>-<rep>`) it writes
+    log/<tag>/Apps.<App>_<start>_<tag>_log.txt                    tool log with the lines `app_log_util` looks for
+    logcat_bug/<tag>/Apps.<App>_<start>_<tag>_bug.txt             E-level logcat with FATAL, ANR and E stack traces
+    anr_bug/<tag>/<package>/anr/                                   one trace file per ANR
+    coverage_result/<package>/<tag>/Apps.<App>_<start>_<tag>_*    Jacoco npy and 3 text files
+and a `config.yaml` pointing `PlatformConstant` at them, so any analyzer runs on the tree with `SATE_CONFIG_FILE`.
+Everything is drawn from generators seeded by (seed, app, tool, repetition), so the tree does not depend on the order
+or the number of processes which write it.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import zlib
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import yaml
+
+from android_testing_utils.log import my_logger
+from constant import PlatformConstant
+from constant.lazy_config import get_config_data
+from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+from evaluation.result_analyzer.utils.fault_util import LogcatUtil
+from runtime_collection import unified_testing_config
+from runtime_collection.collector_util.util_coverage import CoverageItem, CoverageDetail, ECfileInfo, \
+    get_readable_final_coverage_info_string
+
+
+PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+
+DEFAULT_TOOLS = [pattern[:-1] for pattern in Experiments.TAG_PATTERN_DICT.keys()]
+
+RESULT_ROOT_DIRS = {
+    "STATISTICS_DATA_ROOT_DIR": "statistics_data",
+    "TOOL_LOG_ROOT_DIR": "log",
+    "LOGCAT_BUG_ROOT_DIR": "logcat_bug",
+    "COVERAGE_DATA_ROOT_DIR": "coverage_result",
+    "ANR_BUG_ROOT_DIR": "anr_bug",
+}
+
+# total of each counter relative to the instructions, and the exponent of its rate relative to the instruction rate
+COVERAGE_KEY_SHAPES = {
+    "INSTRUCTION": (1.0, 1.0),
+    "BRANCH": (0.09, 1.15),
+    "LINE": (0.21, 0.97),
+    "COMPLEXITY": (0.11, 1.05),
+    "METHOD": (0.045, 0.9),
+    "CLASS": (0.008, 0.8),
+}
+
+FRAMEWORK_FRAMES = [
+    "android.os.Handler.handleCallback(Handler.java:938)",
+    "android.os.Handler.dispatchMessage(Handler.java:99)",
+    "android.os.Looper.loop(Looper.java:223)",
+    "android.app.ActivityThread.main(ActivityThread.java:7656)",
+    "java.lang.reflect.Method.invoke(Native Method)",
+    "com.android.internal.os.RuntimeInit$MethodAndArgsCaller.run(RuntimeInit.java:592)",
+    "com.android.internal.os.ZygoteInit.main(ZygoteInit.java:947)",
+]
+FATAL_EXCEPTIONS = [
+    ("java.lang.NullPointerException", "Attempt to invoke virtual method 'int java.lang.String.length()' on a null object reference"),
+    ("java.lang.IllegalStateException", "Fragment {id} not attached to a context."),
+    ("java.lang.IndexOutOfBoundsException", "Index: {n}, Size: {n}"),
+    ("java.lang.IllegalArgumentException", "View=DecorView@{hex}[] not attached to window manager"),
+    ("java.lang.ClassCastException", "java.lang.Integer cannot be cast to java.lang.String"),
+    ("java.lang.NumberFormatException", "For input string: \"{id}\""),
+    ("android.database.sqlite.SQLiteException", "no such column: _id{n} (code 1 SQLITE_ERROR)"),
+    ("java.lang.RuntimeException", "Unable to start activity ComponentInfo{{{id}}}: java.lang.NullPointerException"),
+]
+# AndroidRuntime and CrashAnrDetector only log the FATAL and ANR traces
+E_PLUS_DOMAINS = LogcatUtil.E_PLUS_LIST[2:]
+E_OTHER_DOMAINS = ["System.err", "RecyclerView", "Glide", "BitmapFactory", "JobScheduler"]
+E_EXCEPTIONS = [
+    ("java.io.FileNotFoundException", "/storage/emulated/0/Download/{id}.tmp: open failed: ENOENT (No such file or directory)"),
+    ("java.net.UnknownHostException", "Unable to resolve host \"api{n}.example.org\": No address associated with hostname"),
+    ("android.database.sqlite.SQLiteConstraintException", "UNIQUE constraint failed: items._id (code {n})"),
+    ("java.lang.SecurityException", "Permission Denial: reading uri content://media/external/{n} requires READ_EXTERNAL_STORAGE"),
+    ("org.json.JSONException", "Value <html> of type java.lang.String cannot be converted to JSONObject"),
+    ("android.view.WindowManager$BadTokenException", "Unable to add window -- token android.os.BinderProxy@{hex} is not valid"),
+]
+ANR_REASONS = [
+    "Input dispatching timed out (Waiting to send non-key event because the touched window has not finished processing certain input events that were delivered to it over 500.0ms ago.  Wait queue length: {n}.)",
+    "executing service {package}/.sync.SyncService",
+    "Broadcast of Intent {{ act=android.intent.action.SCREEN_OFF flg=0x50200010 }}",
+    "ContentProvider not responding",
+]
+NOISE_LINES = [
+    ("Adreno-GSL", "<gsl_ldd_control:{n}>: ioctl fd {n} code 0x{hex} (IOCTL_KGSL_GPUOBJ_ALLOC) failed: errno 12 Out of memory"),
+    ("BufferQueueProducer", "[SurfaceView - {package}/.MainActivity#{n}] disconnect: not connected (req={n})"),
+    ("SurfaceFlinger", "Permission Denial: can't access SurfaceFlinger pid={n}, uid={n}"),
+    ("libprocessgroup", "set_timerslack_ns write failed: Operation not permitted"),
+    ("wpa_supplicant", "nl80211: Failed to set interface {n} to mode {n}: -16 (Device or resource busy)"),
+    ("OpenGLRenderer", "Unable to match the desired swap behavior."),
+    ("EGL_emulation", "tid {n}: eglSurfaceAttrib({n}): error 0x3009 (EGL_BAD_MATCH)"),
+    ("TelephonyManager", "getSubscriberId: Permission denied for {package}"),
+    ("GnssHAL_GnssInterface", "gnssSvStatusCb: b: input svInfo.flags is {n}"),
+    ("netd", "Failed to set DNS resolver configuration for netId {n}"),
+    ("cutils-trace", "Error opening trace file: No such file or directory (2)"),
+    ("ActivityManager", "Failed to find provider info for {package}.provider.{id}"),
+]
+TOOL_LOG_KEYWORDS = [
+    "Is not responding! Check by current focus",
+    "Is asking permission! Check by current focus",
+    "Handle redundant view with {n} children",
+    "Too homogeneous, need handle",
+    "Not homogeneous, continue",
+    "Dump time out, need attention",
+    "Something wrong, continue",
+    "Continuous dump error, run monkey",
+    "Continuous extract error, reopen app",
+]
+
+
+class GeneratorConfig(NamedTuple):
+    apps: Tuple[unified_testing_config.Apps, ...]
+    tools: Tuple[str, ...]
+    repetitions: int
+    duration: int
+    interval: int
+    log_lines_per_minute: float
+    fault_rate: float
+    seed: int
+
+
+class FaultTemplate(NamedTuple):
+    # "FATAL", "ANR" or "E:<domain>", as in the keys of `BugUtil.bug_file_to_abstract_dict`
+    domain: str
+    exception: Tuple[str, str]
+    frames: Tuple[str, ...]
+    weight: float
+
+
+class RunInfo(NamedTuple):
+    app: unified_testing_config.Apps
+    tag: str
+    start_time: datetime.datetime
+    pid: int
+
+    @property
+    def file_prefix(self) -> str:
+        return f"{self.app}_{self.start_time.strftime('%Y-%m-%d-%H:%M:%S')}_{self.tag}"
+
+
+def stable_hash(item: str) -> int:
+    # `hash` of str is salted per process, so seeds must not depend on it
+    return zlib.crc32(item.encode())
+
+
+def get_rng(config: GeneratorConfig, *items) -> np.random.Generator:
+    return np.random.default_rng([config.seed] + [stable_hash(str(item)) for item in items])
+
+
+def fill(template: str, rng: np.random.Generator, package: str) -> str:
+    return template.format(
+        n=int(rng.integers(1, 4096)),
+        hex=f"{int(rng.integers(0, 1 << 32)):x}",
+        id=f"{int(rng.integers(0, 1 << 24)):06x}",
+        package=package,
+    )
+
+
+class ResultTreeGenerator:
+    @staticmethod
+    def get_code_package_prefix(package: str) -> str:
+        # frames under this prefix contain the identifier `BugUtil` looks for, e.g. org.totschnig.myexpenses
+        identifier = LogcatUtil.get_real_code_package_identifier(package)
+        return package[:package.index(identifier) + len(identifier)]
+
+    @staticmethod
+    def get_fault_templates(config: GeneratorConfig, app: unified_testing_config.Apps) -> List[FaultTemplate]:
+        """The faults an app may reveal, shared by all tools and runs so that they recur across them."""
+        rng = get_rng(config, "fault", app)
+        package = unified_testing_config.APP_TO_PACKAGE_DICT[app]
+        code_prefix = ResultTreeGenerator.get_code_package_prefix(package)
+        modules = ["ui", "data", "util", "sync", "db", "settings", "widget", "service"]
+        classes = ["MainActivity", "ListFragment", "DetailActivity", "ItemAdapter", "Repository", "Parser", "Helper", "Provider"]
+        methods = ["onCreate", "onResume", "onBindViewHolder", "load", "parse", "query", "update", "onClick", "run"]
+
+        res = []
+        for i in range(int(rng.integers(4, 20))):
+            domain = rng.choice(["FATAL", "ANR", "E+", "E"], p=[0.3, 0.1, 0.3, 0.3])
+            if domain == "E+":
+                domain = f"E:{rng.choice(E_PLUS_DOMAINS)}"
+            elif domain == "E":
+                domain = f"E:{rng.choice(E_OTHER_DOMAINS)}"
+            if domain == "FATAL":
+                exception = FATAL_EXCEPTIONS[int(rng.integers(len(FATAL_EXCEPTIONS)))]
+            elif domain == "ANR":
+                exception = ("ANR", ANR_REASONS[int(rng.integers(len(ANR_REASONS)))])
+            else:
+                exception = E_EXCEPTIONS[int(rng.integers(len(E_EXCEPTIONS)))]
+            frames = []
+            for j in range(int(rng.integers(1, 5))):
+                class_name = str(rng.choice(classes))
+                frames.append(f"{code_prefix}.{rng.choice(modules)}.{class_name}.{rng.choice(methods)}({class_name}.java:{int(rng.integers(20, 900))})")
+            frames.extend(FRAMEWORK_FRAMES[int(rng.integers(0, 3)):])
+            res.append(FaultTemplate(str(domain), exception, tuple(frames), 1 / (i + 1) ** 1.2))
+        return res
+
+    @staticmethod
+    def get_run_info(config: GeneratorConfig, app: unified_testing_config.Apps, tool: str, repetition: int) -> RunInfo:
+        rng = get_rng(config, "start", app, tool, repetition)
+        start_time = datetime.datetime(2023, 8, 16, 8) + datetime.timedelta(seconds=int(rng.integers(0, 60 * 24 * 3600)))
+        return RunInfo(app, f"{tool}-{repetition}", start_time, int(rng.integers(2000, 32000)))
+
+    @staticmethod
+    def get_coverage_data(config: GeneratorConfig, run_info: RunInfo, tool: str, repetition: int) -> Dict[str, List[CoverageItem]]:
+        app_rng = get_rng(config, "coverage", run_info.app)
+        tool_rng = get_rng(config, "coverage", tool)
+        rng = get_rng(config, "coverage", run_info.app, tool, repetition)
+        brief_info = unified_testing_config.APK_BRIEF_INFO_DICT[run_info.app]
+
+        ceiling = app_rng.uniform(0.15, 0.6)
+        strength = tool_rng.uniform(0.75, 1.05) * (1 + get_rng(config, "coverage", run_info.app, tool).normal(0, 0.05))
+        start_rate = min(ceiling * rng.uniform(0.2, 0.45), 0.15)
+        final_rate = float(np.clip(ceiling * strength * (1 + rng.normal(0, 0.03)), start_rate + 0.01, 0.95))
+
+        point_count = config.duration // config.interval + 1
+        times = np.arange(point_count) * config.interval
+        times[1:] += rng.integers(0, 3, point_count - 1)
+        tau = config.duration * rng.uniform(0.1, 0.4)
+        increments = np.diff(1 - np.exp(-times / tau)) * rng.exponential(1, point_count - 1)
+        rates = start_rate + (final_rate - start_rate) * np.concatenate([[0], np.cumsum(increments) / np.sum(increments)])
+
+        res = {}
+        for key, (total_ratio, exponent) in COVERAGE_KEY_SHAPES.items():
+            total = max(int(brief_info.instruction_count * total_ratio), 1)
+            covered = np.maximum.accumulate(np.floor(rates ** exponent * total).astype(int))
+            res[key] = [CoverageItem(int(t), CoverageDetail(int(c), total, int(c) / total)) for t, c in zip(times, covered)]
+        total = brief_info.activity_count
+        covered = np.clip(np.maximum.accumulate(np.round(rates ** 0.7 * total).astype(int)), 1, total)
+        res["ACTIVITY"] = [CoverageItem(int(t), CoverageDetail(int(c), total, int(c) / total)) for t, c in zip(times, covered)]
+        return res
+
+    @staticmethod
+    def get_fault_occurrences(config: GeneratorConfig, run_info: RunInfo, tool: str, repetition: int) -> List[Tuple[float, FaultTemplate]]:
+        templates = ResultTreeGenerator.get_fault_templates(config, run_info.app)
+        affinity = get_rng(config, "fault", run_info.app, tool).gamma(0.8, 1.25, len(templates))
+        rng = get_rng(config, "fault", run_info.app, tool, repetition)
+        weights = np.array([item.weight for item in templates]) * affinity
+        count = rng.poisson(config.fault_rate * config.duration / 3600 * get_rng(config, "fault", tool).uniform(0.5, 1.5))
+        indices = rng.choice(len(templates), size=count, p=weights / np.sum(weights))
+        occur_times = np.sort(rng.uniform(1, config.duration, count))
+        return [(float(t), templates[i]) for t, i in zip(occur_times, indices)]
+
+    @staticmethod
+    def get_fault_lines(template: FaultTemplate, package: str, pid: int, rng: np.random.Generator) -> List[Tuple[int, str, str]]:
+        """The (pid, tag, message) lines of one occurrence, whose content `BugUtil` cuts at the same column."""
+        if template.domain == "ANR":
+            activity = template.frames[0].split('(')[0].split('.')[-2]
+            return [(1000, "ActivityManager", message) for message in [
+                f"ANR in {package} ({package}/.{activity})",
+                f"PID: {pid}",
+                f"Reason: {fill(template.exception[1], rng, package)}",
+                f"Load: {rng.uniform(1, 9):.2f} / {rng.uniform(1, 9):.2f} / {rng.uniform(1, 9):.2f}",
+            ]]
+        exception_line = f"{template.exception[0]}: {fill(template.exception[1], rng, package)}"
+        frame_lines = [f"\tat {frame}" for frame in template.frames]
+        if template.domain == "FATAL":
+            lines = ["FATAL EXCEPTION: main", f"Process: {package}, PID: {pid}", exception_line] + frame_lines
+            if rng.random() < 0.3:
+                lines += [f"Caused by: {exception_line}"] + frame_lines[:2] + [f"\t... {len(frame_lines) - 2} more"]
+            return [(pid, "AndroidRuntime", line) for line in lines]
+        domain = template.domain[2:]
+        return [(1000 if domain == "ActivityManager" else pid, domain, line) for line in [exception_line] + frame_lines]
+
+    @staticmethod
+    def get_logcat_text(config: GeneratorConfig, run_info: RunInfo, occurrences: List[Tuple[float, FaultTemplate]], tool: str, repetition: int) -> str:
+        rng = get_rng(config, "logcat", run_info.app, tool, repetition)
+        package = unified_testing_config.APP_TO_PACKAGE_DICT[run_info.app]
+        noise_count = rng.poisson(config.log_lines_per_minute * config.duration / 60)
+        noise_times = np.sort(rng.uniform(0, config.duration, noise_count))
+        noise_indices = rng.integers(0, len(NOISE_LINES), noise_count)
+
+        events = [
+            (float(t), [(int(rng.integers(200, 32000)), NOISE_LINES[i][0], fill(NOISE_LINES[i][1], rng, package))])
+            for t, i in zip(noise_times, noise_indices)
+        ]
+        for occur_time, template in occurrences:
+            # a different tag after each trace, so that the next trace is not collected into it
+            fault_lines = ResultTreeGenerator.get_fault_lines(template, package, run_info.pid, rng) + [(run_info.pid, "OpenGLRenderer", "Davey! duration=700ms")]
+            events.append((occur_time, fault_lines))
+        events.sort(key=lambda x: x[0])
+
+        lines = ["--------- beginning of main"]
+        has_crash = False
+        for relative_time, event_lines in events:
+            if (not has_crash) and (event_lines[0][1] == "AndroidRuntime"):
+                lines.append("--------- beginning of crash")
+                has_crash = True
+            time_str = (run_info.start_time + datetime.timedelta(seconds=relative_time)).strftime("%m-%d %H:%M:%S.%f")[:-3]
+            for line_pid, tag, message in event_lines:
+                lines.append(f"{time_str} {line_pid:>5} {line_pid:>5} E {tag}: {message}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def get_tool_log_text(config: GeneratorConfig, run_info: RunInfo, coverage_data: Dict[str, List[CoverageItem]], tool: str, repetition: int) -> str:
+        rng = get_rng(config, "log", run_info.app, tool, repetition)
+        tool_name = tool.split('-')[-1]
+        package = unified_testing_config.APP_TO_PACKAGE_DICT[run_info.app]
+
+        def hint(relative_time: float, info: str) -> str:
+            return f"{my_logger.LogLevel.INFO} | {tool_name} | {run_info.start_time + datetime.timedelta(seconds=relative_time)} | {info}"
+
+        step_count = rng.poisson(config.log_lines_per_minute * config.duration / 60)
+        keyword_probability = rng.uniform(0.005, 0.05)
+        lines = [hint(0, f"Start testing {package} with tag {run_info.tag}")]
+        for step, relative_time in enumerate(np.sort(rng.uniform(0, config.duration, step_count))):
+            if rng.random() < keyword_probability:
+                lines.append(hint(relative_time, fill(TOOL_LOG_KEYWORDS[int(rng.integers(len(TOOL_LOG_KEYWORDS)))], rng, package)))
+            else:
+                lines.append(hint(relative_time, f"Executing event: step {step} click on view {int(rng.integers(0, 1 << 16)):x}"))
+        system_count = int(rng.integers(0, step_count // 10 + 1))
+        other_count = int(rng.integers(0, step_count // 20 + 1))
+        lines.append(hint(config.duration, f"Testing finished at {run_info.start_time + datetime.timedelta(seconds=config.duration)}, total step {step_count}"))
+        lines.append(hint(config.duration, f"Total normal event count: {step_count - system_count - other_count}"))
+        lines.append(hint(config.duration, f"Total system event count: {system_count}"))
+        lines.append(hint(config.duration, f"Total other restart step count: {other_count}"))
+        max_time = max([value[-1].time for value in coverage_data.values()])
+        lines.append(hint(config.duration, f"Max relative time is {max_time}"))
+        lines.append(hint(config.duration, "Final coverage:"))
+        lines.append(get_readable_final_coverage_info_string({key: value[-1:] for key, value in coverage_data.items() if key != "ACTIVITY"}))
+        lines.append(hint(config.duration, "Coverage collection done!"))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def write_text(file_path: str, text: str):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(text)
+
+    @staticmethod
+    def generate_run(config: GeneratorConfig, root_dir: str, app: unified_testing_config.Apps, tool: str, repetition: int) -> int:
+        """Write all the results of one run, returning the number of faults in its logcat."""
+        run_info = ResultTreeGenerator.get_run_info(config, app, tool, repetition)
+        package = unified_testing_config.APP_TO_PACKAGE_DICT[app]
+        dirs = ResultTreeGenerator.get_platform_constant_values(root_dir)
+
+        coverage_data = ResultTreeGenerator.get_coverage_data(config, run_info, tool, repetition)
+        coverage_dir = os.path.join(dirs["COVERAGE_DATA_ROOT_DIR"], package, run_info.tag)
+        os.makedirs(coverage_dir, exist_ok=True)
+        np.save(os.path.join(coverage_dir, f"{run_info.file_prefix}_Jacoco.npy"), coverage_data)
+        ResultTreeGenerator.write_text(os.path.join(coverage_dir, f"{run_info.file_prefix}_Jacoco.txt"), get_readable_final_coverage_info_string(coverage_data))
+        activity = coverage_data["ACTIVITY"][-1].detail
+        ResultTreeGenerator.write_text(
+            os.path.join(coverage_dir, f"{run_info.file_prefix}_Activity.txt"),
+            f"Activity Coverage: {activity.covered}/{activity.total}  {activity.rate:.4f}\n"
+        )
+        ec_file_list = []
+        for item in coverage_data["INSTRUCTION"]:
+            raw_time = (run_info.start_time + datetime.timedelta(seconds=item.time)).strftime('%Y-%m-%d-%H:%M:%S')
+            ec_file_list.append(str(ECfileInfo(item.time, raw_time, "device", f"coverage_{raw_time}.ec")))
+        ResultTreeGenerator.write_text(os.path.join(coverage_dir, f"{run_info.file_prefix}_ec_files.txt"), '\n'.join(ec_file_list) + '\n')
+
+        occurrences = ResultTreeGenerator.get_fault_occurrences(config, run_info, tool, repetition)
+        ResultTreeGenerator.write_text(
+            os.path.join(dirs["LOGCAT_BUG_ROOT_DIR"], run_info.tag, f"{run_info.file_prefix}_bug.txt"),
+            ResultTreeGenerator.get_logcat_text(config, run_info, occurrences, tool, repetition)
+        )
+        ResultTreeGenerator.write_text(
+            os.path.join(dirs["TOOL_LOG_ROOT_DIR"], run_info.tag, f"{run_info.file_prefix}_log.txt"),
+            ResultTreeGenerator.get_tool_log_text(config, run_info, coverage_data, tool, repetition)
+        )
+
+        anr_dir = os.path.join(dirs["ANR_BUG_ROOT_DIR"], run_info.tag, package, "anr")
+        os.makedirs(anr_dir, exist_ok=True)
+        for occur_time, template in occurrences:
+            if template.domain != "ANR":
+                continue
+            anr_time = run_info.start_time + datetime.timedelta(seconds=occur_time)
+            ResultTreeGenerator.write_text(
+                os.path.join(anr_dir, f"anr_{anr_time.strftime('%Y-%m-%d-%H-%M-%S-%f')[:-3]}"),
+                '\n'.join([f"----- pid {run_info.pid} at {anr_time} -----", f"Cmd line: {package}", "",
+                           "\"main\" prio=5 tid=1 Blocked"] + [f"  at {frame}" for frame in template.frames] + ["----- end -----", ""])
+            )
+        return len(occurrences)
+
+    @staticmethod
+    def get_platform_constant_values(root_dir: str) -> Dict[str, str]:
+        return {key: os.path.join(os.path.abspath(root_dir), value) for key, value in RESULT_ROOT_DIRS.items()}
+
+    @staticmethod
+    def use_result_tree(root_dir: str):
+        """Point `PlatformConstant`, in this process and the ones it starts, at a generated tree."""
+        PlatformConstant.load()
+        PlatformConstant.restore(ResultTreeGenerator.get_platform_constant_values(root_dir))
+
+    @staticmethod
+    def generate(config: GeneratorConfig, root_dir: str) -> str:
+        """Write the result tree of `config` under `root_dir`, returning the path of its config file."""
+        my_logger.hint(my_logger.LogLevel.INFO, "Generator", True,
+                       f"Generating {len(config.apps)} apps x {len(config.tools)} tools x {config.repetitions} repetitions to {root_dir} ...")
+        dirs = ResultTreeGenerator.get_platform_constant_values(root_dir)
+        for dir_path in dirs.values():
+            os.makedirs(dir_path, exist_ok=True)
+
+        param = [(config, root_dir, app, tool, repetition) for app in config.apps for tool in config.tools for repetition in range(1, config.repetitions + 1)]
+        if PROCESS_COUNT > 1 and len(param) > 1:
+            with multiprocessing.Pool(min(PROCESS_COUNT, len(param))) as pool:
+                fault_counts = pool.starmap(ResultTreeGenerator.generate_run, param)
+        else:
+            fault_counts = [ResultTreeGenerator.generate_run(*item) for item in param]
+
+        config_data = dict(get_config_data())
+        config_data["PlatformConstant"] = dict(config_data["PlatformConstant"], TIME_LENGTH=config.duration, TIME_INTERVAL=config.interval, **dirs)
+        config_file_path = os.path.join(root_dir, "config.yaml")
+        with open(config_file_path, 'w') as f:
+            yaml.safe_dump(config_data, f, sort_keys=False)
+        with open(os.path.join(root_dir, "generator_config.json"), 'w') as f:
+            json.dump(dict(config._asdict(), apps=[app.value for app in config.apps]), f, indent=4)
+
+        my_logger.hint(my_logger.LogLevel.INFO, "Generator", True,
+                       f"Generated {len(param)} runs with {sum(fault_counts)} fault occurrences. Use them with SATE_CONFIG_FILE={config_file_path}")
+        return config_file_path
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--apps", nargs="+", default=None, help="app names, all the empirical apps by default")
+    parser.add_argument("--tools", nargs="+", default=DEFAULT_TOOLS, help="tag prefixes of the tools")
+    parser.add_argument("--repetitions", type=int, default=10)
+    parser.add_argument("--scale", type=int, default=1, help="multiply the repetitions, e.g. 10 or 100 times the study")
+    parser.add_argument("--duration", type=int, default=None, help="testing time in seconds, PlatformConstant.TIME_LENGTH by default")
+    parser.add_argument("--interval", type=int, default=None, help="coverage interval in seconds, PlatformConstant.TIME_INTERVAL by default")
+    parser.add_argument("--log-lines-per-minute", type=float, default=20, help="volume of both the logcat and the tool logs")
+    parser.add_argument("--fault-rate", type=float, default=2.0, help="expected fault occurrences per hour of each run")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def get_config(args: argparse.Namespace) -> GeneratorConfig:
+    return GeneratorConfig(
+        apps=tuple(unified_testing_config.empirical_app_list_all if args.apps is None else
+                   [unified_testing_config.get_app_by_app_name(item) for item in args.apps]),
+        tools=tuple(args.tools),
+        repetitions=args.repetitions * args.scale,
+        duration=PlatformConstant.TIME_LENGTH if args.duration is None else args.duration,
+        interval=PlatformConstant.TIME_INTERVAL if args.interval is None else args.interval,
+        log_lines_per_minute=args.log_lines_per_minute,
+        fault_rate=args.fault_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic experimental result tree.")
+    parser.add_argument("output_dir")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    ResultTreeGenerator.generate(get_config(args), args.output_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,18 +2,23 @@
 # @Time  : 2023 Aug
 # @Author: Yuanhong Lan
 # ----------------------
+import multiprocessing
 import os
 import shutil
 from typing import Dict, List, NamedTuple, Tuple
 from enum import Enum
 
 import numpy as np
+import pandas as pd
 
 from android_testing_utils.log import my_logger
 from constant.platform_constant import PlatformConstant
 from runtime_collection.collector_util.util_coverage import ApkSourceCodeArgs, CoverageItem
 from runtime_collection import unified_testing_config
-from evaluation.result_analyzer.utils.pattern_util import PatternUtil
+from evaluation.result_analyzer.utils.compression_util import CompressionUtil
+from evaluation.result_analyzer.utils.pattern_util import PatternUtil, TagMatcher
+from evaluation.result_analyzer.utils.path_util import PathUtil
+from evaluation.result_analyzer.utils.result_root import ResultRoot
 
 
 class TestResultType(Enum):
@@ -37,9 +42,9 @@ class FileManagerUtil:
     def __add_targets_via_root_tag_file(root_dir_path: str, tag: str, target_apps: List[unified_testing_config.Apps], target_apps_str: List[str]) -> List[str]:
         res = []
         target_dir = os.path.join(root_dir_path, tag)
-        if os.path.exists(target_dir):
+        if ResultRoot.exists(target_dir):
             if target_apps is not None:
-                for file_name in os.listdir(target_dir):
+                for file_name in ResultRoot.listdir(target_dir):
                     if file_name.split('_')[0] in target_apps_str:
                         res.append(os.path.join(target_dir, file_name))
             else:
@@ -52,11 +57,11 @@ class FileManagerUtil:
         if target_apps is not None:
             for package in target_apps_package:
                 target_dir = os.path.join(root_dir_path, tag, package)
-                if os.path.exists(target_dir):
+                if ResultRoot.exists(target_dir):
                     res.append(target_dir)
         else:
             target_dir = os.path.join(root_dir_path, tag)
-            if os.path.exists(target_dir):
+            if ResultRoot.exists(target_dir):
                 res.append(target_dir)
         return res
 
@@ -66,24 +71,24 @@ class FileManagerUtil:
         if target_apps is not None:
             for package in target_apps_package:
                 target_dir = os.path.join(root_dir_path, package, tag)
-                if os.path.exists(target_dir):
+                if ResultRoot.exists(target_dir):
                     res.append(target_dir)
         else:
-            for app in os.listdir(root_dir_path):
+            for app in ResultRoot.listdir(root_dir_path):
                 target_dir = os.path.join(root_dir_path, app, tag)
-                if os.path.exists(target_dir):
+                if ResultRoot.exists(target_dir):
                     res.append(target_dir)
         return res
 
     @staticmethod
     def check_target_dict(target_dict: Dict[TestResultType, List], prompt: str):
         my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False,
-                       f"The following [{FileManagerUtil.count_targets(target_dict)}] dirs(files) will {prompt}!")
-        for test_result_type, targets in target_dict.items():
-            my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"    {test_result_type}:")
-            for i in range(len(targets)):
-                target = targets[i]
-                my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"    {i+1}\t {target}")
+                       "The following [%d] dirs(files) will %s!", FileManagerUtil.count_targets(target_dict), prompt)
+        if my_logger.is_enabled_for(my_logger.LogLevel.INFO):
+            for test_result_type, targets in target_dict.items():
+                my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, "    %s:", test_result_type)
+                for i in range(len(targets)):
+                    my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, "    %d\t %s", i + 1, targets[i])
 
         s = input(f"Confirm? (y/n) ")
         if s != 'y':
@@ -95,6 +100,10 @@ class FileManagerUtil:
         for test_result_type, targets in target_dict.items():
             my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Remove for {test_result_type}")
             for target in targets:
+                target = ResultRoot.resolve(target)
+                if ResultRoot.is_archive_path(target):
+                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Can not remove {target} inside a read-only archive!")
+                    continue
                 if os.path.exists(target):
                     my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"    Remove {target}")
                     if os.path.isfile(target):
@@ -124,7 +133,7 @@ class FileManagerUtil:
         for test_result_type, targets in raw_target_dict.items():
             res[test_result_type] = []
             for target in targets:
-                if not os.path.exists(target):
+                if not ResultRoot.exists(target):
                     my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Target {target} does not exist!")
                     continue
                 if not target.startswith(source_path_key):
@@ -137,26 +146,37 @@ class FileManagerUtil:
         return res
 
     @staticmethod
-    def move_with_move_target_dict(move_target_dict: Dict[TestResultType, List[Tuple[str, str]]], is_copy: bool = False):
+    def move_with_move_target_dict(move_target_dict: Dict[TestResultType, List[Tuple[str, str]]], is_copy: bool = False, verify_copy: bool = True):
+        """Move (or copy) each target; with `verify_copy`, the hashes of each copy are compared with its source.
+
+        Targets inside archives can only be copied, which extracts them. Targets read through a result overlay are
+        moved from the tree providing them, or copied from all its trees.
+        """
+        from evaluation.data_manager.result_manifest import ResultManifest
         for test_result_type, targets in move_target_dict.items():
             my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"{'Move' if not is_copy else 'Copy'} for {test_result_type}")
             for i in range(len(targets)):
                 target = targets[i]
                 source_path, destination_path = target
-                if os.path.exists(source_path):
+                if ResultRoot.exists(source_path):
                     my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"    {i+1}\t {'Moving' if not is_copy else 'Copying'} from {source_path} to {destination_path}")
                     if os.path.exists(destination_path):
                         my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Destination {destination_path} already exists!")
                         continue
+                    ResultRoot.check_writable(destination_path)
                     if not is_copy:
+                        # the tree of the overlay which provides the target
+                        source_path = ResultRoot.resolve(source_path)
+                        if ResultRoot.is_archive_path(source_path):
+                            my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Can not move {source_path} out of a read-only archive, copy it instead!")
+                            continue
                         shutil.move(source_path, destination_path)
                     else:
                         if not os.path.exists(os.path.dirname(destination_path)):
                             os.makedirs(os.path.dirname(destination_path))
-                        if os.path.isfile(source_path):
-                            shutil.copy(source_path, destination_path)
-                        else:
-                            shutil.copytree(source_path, destination_path)
+                        ResultRoot.copy(source_path, destination_path)
+                        if verify_copy and ResultManifest.hash_tree(source_path) != ResultManifest.hash_tree(destination_path):
+                            my_logger.hint(my_logger.LogLevel.ERROR, "FileManager", False, f"Copy {destination_path} differs from {source_path}!")
 
     @staticmethod
     def search_for_all_ec_dirs() -> List[str]:
@@ -176,7 +196,10 @@ class FileManagerUtil:
             need_identifier: NeedIdentifier = NeedIdentifier(True, True, True, True),
             replace_rule: Tuple[str, str] = None,
     ) -> Dict[TestResultType, List[str]]:
+        """The dirs (files) of a tag in each root, or in the roots moved by `replace_rule` (old prefix, new prefix).
 
+        With a result overlay enabled, they are searched in all its trees, see `ResultOverlay`.
+        """
         target_apps_str = None
         target_apps_package = None
         if target_apps is not None:
@@ -211,12 +234,12 @@ class FileManagerUtil:
 
     @staticmethod
     def recursively_search_for_empty_dirs(current_dir_path: str) -> List:
-        if not os.path.isdir(current_dir_path):
+        if not ResultRoot.isdir(current_dir_path):
             return []
-        if len(os.listdir(current_dir_path)) == 0:
+        if len(ResultRoot.listdir(current_dir_path)) == 0:
             return [current_dir_path]
         res = []
-        for file in os.listdir(current_dir_path):
+        for file in ResultRoot.listdir(current_dir_path):
             res.extend(FileManagerUtil.recursively_search_for_empty_dirs(os.path.join(current_dir_path, file)))
         return res
 
@@ -310,9 +333,78 @@ class Rename:
         print()
 
 
+class CoverageCheckRule(Enum):
+    FileCount = "file_count"
+    NoJacocoData = "no_jacoco_data"
+    EmptyData = "empty_data"
+    StartRate = "start_rate"
+    CoverageDecrease = "coverage_decrease"
+    TotalInconsistent = "total_inconsistent"
+    FinalTime = "final_time"
+
+
 class Check:
+    PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+    REPORT_COLUMNS = ["package", "tag", "metric", "rule", "detail"]
+    # bump when the rules change, so that the cached results of `check_all_coverage_data` are dropped
+    COVERAGE_CHECK_VERSION = 1
+
+    @staticmethod
+    def get_tag_dir_fingerprint(tag_dir_path: str) -> Tuple:
+        tag_dir_path = ResultRoot.resolve(tag_dir_path)
+        if ResultRoot.is_archive_path(tag_dir_path):
+            return tuple(sorted([
+                (item, ResultRoot.getsize(os.path.join(tag_dir_path, item)), ResultRoot.get_mtime_ns(os.path.join(tag_dir_path, item)))
+                for item in ResultRoot.listdir(tag_dir_path)
+            ]))
+        return tuple(sorted([(item.name, item.stat().st_size, item.stat().st_mtime_ns) for item in os.scandir(tag_dir_path)]))
+
     @staticmethod
-    def check_all_coverage_data(tag_pattern: str = None, ignore_pattern: str = None, testing_time: int = None):
+    def check_coverage_tag(package: str, tag: str, tag_dir_path: str, testing_time: int = None) -> List[Tuple]:
+        """The violated rules of a coverage tag dir as rows of (package, tag, metric, rule, detail)."""
+        res = []
+        file_list = ResultRoot.listdir(tag_dir_path)
+        if len(file_list) != 4:
+            res.append((package, tag, None, CoverageCheckRule.FileCount.value, f"{len(file_list)} files instead of 4"))
+
+        jacoco_file_list = [item for item in file_list if ('Jacoco' in item) and ('npy' in item)]
+        if len(jacoco_file_list) == 0:
+            res.append((package, tag, None, CoverageCheckRule.NoJacocoData.value, "no jacoco coverage data"))
+            return res
+
+        threshold = 0.3 if package in [
+            unified_testing_config.APK_SOURCE_CODE_ARGS_DICT[unified_testing_config.Apps.APhotoManager].apk_package,
+        ] else 0.2
+        data: Dict[str, List[CoverageItem]] = ResultRoot.load_npy(os.path.join(tag_dir_path, jacoco_file_list[0])).item()
+        for key, value in data.items():
+            if len(value) == 0:
+                res.append((package, tag, key, CoverageCheckRule.EmptyData.value, "empty data"))
+                continue
+            # columns of covered, total and rate
+            details = np.array([item.detail for item in value], dtype=float)
+            if (key == 'INSTRUCTION') and (details[0, 2] > threshold):
+                res.append((package, tag, key, CoverageCheckRule.StartRate.value, f"start coverage rate {details[0, 2]:.4f} > {threshold}"))
+            decrease_positions = np.flatnonzero(np.diff(details[:, 0]) < 0)
+            if len(decrease_positions) > 0:
+                res.append((package, tag, key, CoverageCheckRule.CoverageDecrease.value, f"coverage decrease at item {decrease_positions[0] + 1}"))
+            if not np.all(details[:, 1] == details[0, 1]):
+                res.append((package, tag, key, CoverageCheckRule.TotalInconsistent.value, f"total inconsistent at item {np.flatnonzero(details[:, 1] != details[0, 1])[0]}"))
+            if (testing_time is not None) and (value[-1].time < testing_time):
+                res.append((package, tag, key, CoverageCheckRule.FinalTime.value, f"final time {value[-1].time} < {testing_time}"))
+        return res
+
+    @staticmethod
+    def __get_coverage_check_cache_path() -> str:
+        from evaluation.result_analyzer.utils.data_util import DataType
+        from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+        return os.path.join(ExcelDirectoryPathGenerator.get_temp_dir(DataType.Coverage), "coverage_check_cache.pkl")
+
+    @staticmethod
+    def check_all_coverage_data(tag_pattern: str = None, ignore_pattern: str = None, testing_time: int = None, incremental: bool = True) -> pd.DataFrame:
+        """Check the coverage tag dirs in parallel, returns the violations with the columns of `REPORT_COLUMNS`.
+
+        With `incremental`, only the tag dirs whose files changed since the last check are loaded again.
+        """
         if tag_pattern is not None:
             PatternUtil.is_pattern_valid(tag_pattern)
             my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Check coverage data with tag pattern [{tag_pattern}]")
@@ -321,91 +413,59 @@ class Check:
             PatternUtil.is_pattern_valid(ignore_pattern)
             my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Check coverage data with ignore pattern [{ignore_pattern}]")
 
-        pass_count = 0
-        total_count = 0
+        tag_matcher = TagMatcher([] if tag_pattern is None else [tag_pattern])
+        ignore_matcher = TagMatcher([] if ignore_pattern is None else [ignore_pattern])
 
+        targets = []
         coverage_data_root_dir = PlatformConstant.COVERAGE_DATA_ROOT_DIR
-        for package in os.listdir(coverage_data_root_dir):
+        for package in ResultRoot.listdir(coverage_data_root_dir):
             package_data_dir = os.path.join(coverage_data_root_dir, package)
-            for tag in os.listdir(package_data_dir):
+            for tag in ResultRoot.listdir(package_data_dir):
                 if tag[-2] == '@' or tag[-3] == '@':
                     continue
-
                 if tag_pattern is not None:
-                    if not PatternUtil.is_match(tag_pattern, tag):
+                    if not tag_matcher.is_match(tag):
                         continue
-                    if (ignore_pattern is not None) and PatternUtil.is_match(ignore_pattern, tag):
+                    if ignore_matcher.is_match(tag):
                         continue
+                targets.append((package, tag, os.path.abspath(os.path.join(package_data_dir, tag))))
+
+        cache_path = Check.__get_coverage_check_cache_path()
+        cache = pd.read_pickle(cache_path) if incremental and os.path.exists(cache_path) else {}
+        fingerprints = {}
+        results: Dict[str, List[Tuple]] = {}
+        param = []
+        for package, tag, tag_dir_path in targets:
+            fingerprints[tag_dir_path] = (Check.COVERAGE_CHECK_VERSION, testing_time, Check.get_tag_dir_fingerprint(tag_dir_path))
+            if tag_dir_path in cache and cache[tag_dir_path][0] == fingerprints[tag_dir_path]:
+                results[tag_dir_path] = cache[tag_dir_path][1]
+            else:
+                param.append((package, tag, tag_dir_path, testing_time))
+        my_logger.hint(my_logger.LogLevel.INFO, "FileManager", True, f"Checking [{len(param)}] new or changed of [{len(targets)}] tag dirs ...")
 
-                total_count += 1
-                has_check = False
-                has_warning = False
-
-                tag_data_dir = os.path.join(package_data_dir, tag)
-
-                file_count = len(os.listdir(tag_data_dir))
-                if file_count < 4:
-                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] has LESS than 4 files!")
-                    has_warning = True
-                elif file_count > 4:
-                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] has MORE than 4 files!")
-                    has_warning = True
-
-                for file in os.listdir(tag_data_dir):
-                    if ('Jacoco' in file) and ('npy' in file):
-                        has_check = True
-                        file_path = os.path.join(tag_data_dir, file)
-                        data: Dict[str, List[CoverageItem]] = np.load(file_path, allow_pickle=True).item()
-                        for key, value in data.items():
-                            if len(value) == 0:
-                                my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] type [{key}] has empty data!")
-                                has_warning = True
-                                break
-
-                            if package in [
-                                unified_testing_config.APK_SOURCE_CODE_ARGS_DICT[unified_testing_config.Apps.APhotoManager].apk_package,
-                            ]:
-                                threshold = 0.3
-                            else:
-                                threshold = 0.2
-
-                            if (key == 'INSTRUCTION') and (value[0].detail.rate > threshold):
-                                my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] type [{key}] has its start coverage rate > {threshold}!")
-                                has_warning = True
-
-                            former_covered = value[0].detail.covered
-                            former_total = value[0].detail.total
-                            for i in range(1, len(value)):
-                                item = value[i]
-                                if item.detail.covered < former_covered:
-                                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] type [{key}] has coverage decrease!")
-                                    has_warning = True
-                                    break
-                                if item.detail.total != former_total:
-                                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] type [{key}] has total inconsistent!")
-                                    has_warning = True
-                                    break
-                                former_covered = item.detail.covered
-                                former_total = item.detail.total
-                            if (testing_time is not None) and (value[-1].time < testing_time):
-                                my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] type [{key}] has its final time {value[-1].time} < {testing_time}!")
-                                has_warning = True
-                        break
-
-                if not has_check:
-                    my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, f"Package [{package}] tag [{tag}] has no jacoco coverage data!")
-                    has_warning = True
-
-                if not has_warning:
-                    pass_count += 1
-                    my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Package [{package}] tag [{tag}] passed!")
+        if Check.PROCESS_COUNT > 1 and len(param) > 1:
+            with multiprocessing.Pool(min(Check.PROCESS_COUNT, len(param))) as pool:
+                new_results = pool.starmap(Check.check_coverage_tag, param)
+        else:
+            new_results = [Check.check_coverage_tag(*item) for item in param]
+        for item, rows in zip(param, new_results):
+            results[item[2]] = rows
 
-        my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Total [{total_count}] checked, [{pass_count}] passed, [{total_count - pass_count}] may have problem!")
+        if incremental:
+            cache.update({key: (fingerprints[key], results[key]) for key in results.keys()})
+            pd.to_pickle(cache, cache_path)
+
+        report = pd.DataFrame([row for _, _, tag_dir_path in targets for row in results[tag_dir_path]], columns=Check.REPORT_COLUMNS)
+        if len(report) > 0:
+            my_logger.hint(my_logger.LogLevel.WARNING, "FileManager", False, lambda: f"Problems of coverage data:\n{report.to_string()}")
+        problem_count = len(set(zip(report["package"], report["tag"])))
+        my_logger.hint(my_logger.LogLevel.INFO, "FileManager", False, f"Total [{len(targets)}] checked, [{len(targets) - problem_count}] passed, [{problem_count}] may have problem!")
+        return report
 
     @classmethod
     def check_app_by_log(cls, target_tag: str, full_app_list: List[unified_testing_config.Apps] = None):
         log_dir = os.path.join(PlatformConstant.TOOL_LOG_ROOT_DIR, target_tag)
-        app_list = [unified_testing_config.Apps[item.split('_')[0].split('.')[1]] for item in os.listdir(log_dir)]
+        app_list = [unified_testing_config.get_app_by_app_name(PathUtil.parse_result_file_path(os.path.join(log_dir, item)).app_name) for item in CompressionUtil.list_result_files(log_dir)]
         if full_app_list is None:
             return app_list
         else:
@@ -0,0 +1,281 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Content-hash manifests of the four result roots, to verify a result tree or diff two of them quickly.
+
+    python -m evaluation.data_manager.result_manifest generate [--output PATH] [--tags TAG ...] [--replace-rule OLD NEW]
+    python -m evaluation.data_manager.result_manifest verify [--manifest PATH] [--tags TAG ...] [--replace-rule OLD NEW]
+    python -m evaluation.data_manager.result_manifest diff MANIFEST_A MANIFEST_B
+
+A manifest holds the size and hash of every file by root, tag and path relative to the root, so it stays valid for a
+copy of the tree under another prefix (see `replace_rule` of `FileManagerUtil.search_for_all_experimental_target_dict`).
+Files are hashed in parallel with xxh3 if `xxhash` is installed, else with blake2b. With `SATE_RESULT_MANIFEST` set to
+a manifest, the analyzers skip the input files which do not match it.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from android_testing_utils.log import my_logger
+from constant import PlatformConstant
+from evaluation.data_manager.file_manager import TestResultType
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+HASH_ALGORITHM = "xxh3_128" if xxhash is not None else "blake2b_128"
+BLOCK_SIZE = 1 << 20
+MANIFEST_ENV = "SATE_RESULT_MANIFEST"
+DEFAULT_MANIFEST_FILE_NAME = "result_manifest.json"
+
+# the index of the tag in the paths relative to each root
+TAG_POSITIONS = {
+    TestResultType.Log: 0,
+    TestResultType.LogcatBug: 0,
+    TestResultType.AnrBug: 0,
+    TestResultType.CoverageData: 1,
+}
+REPORT_COLUMNS = ["root", "tag", "path", "problem"]
+
+# {root: {tag: {relative path: [size, hash]}}}
+ManifestEntries = Dict[str, Dict[str, Dict[str, list]]]
+
+
+def hash_file(file_path: str) -> str:
+    hasher = xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    with ResultRoot.open_binary(file_path) as f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def hash_files(file_paths: List[str]) -> List[str]:
+    if PROCESS_COUNT > 1 and len(file_paths) > 1:
+        with multiprocessing.Pool(min(PROCESS_COUNT, len(file_paths))) as pool:
+            return pool.map(hash_file, file_paths, chunksize=max(len(file_paths) // (PROCESS_COUNT * 4), 1))
+    return [hash_file(item) for item in file_paths]
+
+
+class ResultManifest:
+    __active_manifest: Optional[Tuple[str, dict]] = None
+
+    @staticmethod
+    def get_roots(replace_rule: Tuple[str, str] = None) -> Dict[TestResultType, str]:
+        roots = {
+            TestResultType.Log: PlatformConstant.TOOL_LOG_ROOT_DIR,
+            TestResultType.LogcatBug: PlatformConstant.LOGCAT_BUG_ROOT_DIR,
+            TestResultType.AnrBug: PlatformConstant.ANR_BUG_ROOT_DIR,
+            TestResultType.CoverageData: PlatformConstant.COVERAGE_DATA_ROOT_DIR,
+        }
+        if replace_rule is not None:
+            roots = {key: value.replace(replace_rule[0], replace_rule[1]) for key, value in roots.items()}
+        return {key: os.path.abspath(value) for key, value in roots.items()}
+
+    @staticmethod
+    def get_default_manifest_path(replace_rule: Tuple[str, str] = None) -> str:
+        return os.path.join(os.path.commonpath(list(ResultManifest.get_roots(replace_rule).values())), DEFAULT_MANIFEST_FILE_NAME)
+
+    @staticmethod
+    def list_files(roots: Dict[TestResultType, str], tags: Optional[Iterable[str]] = None) -> List[Tuple[str, str, str, str]]:
+        """(root, tag, relative path, absolute path) of the files under the roots, of the given tags only if any."""
+        tags = None if tags is None else set(tags)
+        res = []
+        for root_type, root_dir in roots.items():
+            if not ResultRoot.isdir(root_dir):
+                continue
+            for current_dir, dir_names, file_names in ResultRoot.walk(root_dir):
+                relative_dir = os.path.relpath(current_dir, root_dir)
+                parts = [] if relative_dir == '.' else relative_dir.split(os.sep)
+                if len(parts) > TAG_POSITIONS[root_type] and tags is not None and parts[TAG_POSITIONS[root_type]] not in tags:
+                    dir_names[:] = []
+                    continue
+                dir_names.sort()
+                if len(parts) <= TAG_POSITIONS[root_type]:
+                    # files above the tag level, e.g. a manifest
+                    continue
+                for file_name in sorted(file_names):
+                    res.append((root_type.value, parts[TAG_POSITIONS[root_type]], '/'.join(parts + [file_name]), os.path.join(current_dir, file_name)))
+        return res
+
+    @staticmethod
+    def generate(roots: Dict[TestResultType, str] = None, tags: Optional[Iterable[str]] = None) -> dict:
+        roots = ResultManifest.get_roots() if roots is None else roots
+        files = ResultManifest.list_files(roots, tags)
+        my_logger.hint(my_logger.LogLevel.INFO, "ResultManifest", True, f"Hashing [{len(files)}] files with {HASH_ALGORITHM} ...")
+        hashes = hash_files([item[3] for item in files])
+        entries: ManifestEntries = {}
+        for (root, tag, relative_path, file_path), file_hash in zip(files, hashes):
+            entries.setdefault(root, {}).setdefault(tag, {})[relative_path] = [ResultRoot.getsize(file_path), file_hash]
+        return {
+            "algorithm": HASH_ALGORITHM,
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "roots": {key.value: value for key, value in roots.items()},
+            "entries": entries,
+        }
+
+    @staticmethod
+    def write(manifest: dict, manifest_path: str):
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    @staticmethod
+    def read(manifest_path: str) -> dict:
+        with ResultRoot.open_binary(manifest_path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def merge(manifest: dict, new_manifest: dict) -> dict:
+        """The manifest with the tags of `new_manifest` replaced, e.g. after regenerating the manifest of new tags."""
+        assert manifest["algorithm"] == new_manifest["algorithm"], f"Cannot merge {manifest['algorithm']} and {new_manifest['algorithm']} hashes!"
+        for root, tag_entries in new_manifest["entries"].items():
+            manifest["entries"].setdefault(root, {}).update(tag_entries)
+        manifest["time"] = new_manifest["time"]
+        return manifest
+
+    @staticmethod
+    def diff_entries(expected: ManifestEntries, actual: ManifestEntries, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Files `missing` from or `extra` in `actual`, or with `changed` size or hash, as rows of `REPORT_COLUMNS`."""
+        tags = None if tags is None else set(tags)
+        rows = []
+        for root in sorted(set(expected.keys()) | set(actual.keys())):
+            expected_tags, actual_tags = expected.get(root, {}), actual.get(root, {})
+            for tag in sorted(set(expected_tags.keys()) | set(actual_tags.keys())):
+                if tags is not None and tag not in tags:
+                    continue
+                expected_files, actual_files = expected_tags.get(tag, {}), actual_tags.get(tag, {})
+                for path in sorted(set(expected_files.keys()) | set(actual_files.keys())):
+                    if path not in actual_files:
+                        rows.append((root, tag, path, "missing"))
+                    elif path not in expected_files:
+                        rows.append((root, tag, path, "extra"))
+                    elif expected_files[path] != actual_files[path]:
+                        rows.append((root, tag, path, "changed"))
+        return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+    @staticmethod
+    def verify(manifest: dict, roots: Dict[TestResultType, str] = None, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Hash the tree (the tags of the manifest, or the given ones) and diff it against the manifest."""
+        assert manifest["algorithm"] == HASH_ALGORITHM, f"The manifest uses {manifest['algorithm']} while {HASH_ALGORITHM} is available!"
+        if tags is None:
+            tags = {tag for tag_entries in manifest["entries"].values() for tag in tag_entries.keys()}
+        actual = ResultManifest.generate(roots, tags)
+        res = ResultManifest.diff_entries(manifest["entries"], actual["entries"], tags)
+        if len(res) > 0:
+            my_logger.hint(my_logger.LogLevel.ERROR, "ResultManifest", False, lambda: f"The result tree does not match its manifest:\n{res.to_string()}")
+        else:
+            my_logger.hint(my_logger.LogLevel.INFO, "ResultManifest", False, "The result tree matches its manifest.")
+        return res
+
+    @staticmethod
+    def hash_tree(path: str) -> Dict[str, list]:
+        """Sizes and hashes of a file, or of the files under a dir by relative path."""
+        if ResultRoot.isfile(path):
+            return {os.path.basename(path): [ResultRoot.getsize(path), hash_file(path)]}
+        file_paths = sorted([os.path.join(current_dir, item) for current_dir, _, file_names in ResultRoot.walk(path) for item in file_names])
+        return {
+            os.path.relpath(file_path, path): [ResultRoot.getsize(file_path), file_hash]
+            for file_path, file_hash in zip(file_paths, hash_files(file_paths))
+        }
+
+    @staticmethod
+    def get_active_manifest() -> Optional[dict]:
+        """The manifest at `SATE_RESULT_MANIFEST`, which the analyzers check their inputs against, read once."""
+        manifest_path = os.environ.get(MANIFEST_ENV)
+        if not manifest_path:
+            return None
+        if ResultManifest.__active_manifest is None or ResultManifest.__active_manifest[0] != manifest_path:
+            ResultManifest.__active_manifest = (manifest_path, ResultManifest.read(manifest_path))
+        return ResultManifest.__active_manifest[1]
+
+    @staticmethod
+    def filter_intact_files(file_paths: List[str]) -> List[str]:
+        """The files not contradicting the active manifest, all of them if there is none.
+
+        Files outside the result roots or of tags absent from the manifest are kept with a warning, while missing files
+        of its tags and files with another size or hash are dropped with an error.
+        """
+        manifest = ResultManifest.get_active_manifest()
+        if manifest is None:
+            return file_paths
+        roots = ResultManifest.get_roots()
+        expected = []
+        for file_path in file_paths:
+            absolute_path = os.path.abspath(file_path)
+            for root_type, root_dir in roots.items():
+                if absolute_path.startswith(root_dir + os.sep):
+                    relative_path = os.path.relpath(absolute_path, root_dir).replace(os.sep, '/')
+                    tag = relative_path.split('/')[TAG_POSITIONS[root_type]]
+                    tag_entries = manifest["entries"].get(root_type.value, {}).get(tag)
+                    if tag_entries is None:
+                        my_logger.hint(my_logger.LogLevel.WARNING, "ResultManifest", False, f"Tag [{tag}] of {file_path} is not in the manifest, not verified!")
+                        entry = False
+                    else:
+                        entry = tag_entries.get(relative_path)
+                    break
+            else:
+                my_logger.hint(my_logger.LogLevel.WARNING, "ResultManifest", False, f"{file_path} is under none of the result roots, not verified!")
+                entry = False
+            expected.append(entry)
+
+        to_hash = [file_path for file_path, entry in zip(file_paths, expected) if entry and ResultRoot.isfile(file_path) and ResultRoot.getsize(file_path) == entry[0]]
+        hashes = dict(zip(to_hash, hash_files(to_hash)))
+        res = []
+        for file_path, entry in zip(file_paths, expected):
+            if entry is False or (entry is not None and hashes.get(file_path) == entry[1]):
+                res.append(file_path)
+            else:
+                my_logger.hint(my_logger.LogLevel.ERROR, "ResultManifest", False, f"Skip {file_path}, which does not match the manifest!")
+        return res
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate, verify or diff content-hash manifests of the result roots.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ["generate", "verify"]:
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument("--manifest", "--output", dest="manifest", default=None, help="the manifest file, next to the result roots by default")
+        subparser.add_argument("--tags", nargs="+", default=None, help="only these tags, merged into an existing manifest when generating")
+        subparser.add_argument("--replace-rule", nargs=2, default=None, metavar=("OLD", "NEW"), help="use the roots with the prefix OLD replaced by NEW")
+    diff_parser = subparsers.add_parser("diff")
+    diff_parser.add_argument("manifests", nargs=2)
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        manifest_a, manifest_b = [ResultManifest.read(item) for item in args.manifests]
+        assert manifest_a["algorithm"] == manifest_b["algorithm"], f"Cannot diff {manifest_a['algorithm']} and {manifest_b['algorithm']} hashes!"
+        res = ResultManifest.diff_entries(manifest_a["entries"], manifest_b["entries"])
+        print(res.to_string() if len(res) > 0 else "Same content.")
+        return 1 if len(res) > 0 else 0
+
+    replace_rule = None if args.replace_rule is None else tuple(args.replace_rule)
+    manifest_path = ResultManifest.get_default_manifest_path(replace_rule) if args.manifest is None else args.manifest
+    roots = ResultManifest.get_roots(replace_rule)
+    if args.command == "generate":
+        manifest = ResultManifest.generate(roots, args.tags)
+        ResultRoot.check_writable(manifest_path)
+        if args.tags is not None and os.path.exists(manifest_path):
+            manifest = ResultManifest.merge(ResultManifest.read(manifest_path), manifest)
+        ResultManifest.write(manifest, manifest_path)
+        my_logger.hint(my_logger.LogLevel.INFO, "ResultManifest", True, f"Manifest saved to {manifest_path}")
+        return 0
+    res = ResultManifest.verify(ResultManifest.read(manifest_path), roots, args.tags)
+    return 1 if len(res) > 0 else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -3,7 +3,7 @@
 # @Author: Yuanhong Lan
 # ----------------------
 import os
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -12,9 +12,13 @@ from android_testing_utils.log import my_logger
 from evaluation.result_analyzer.analysis.significance_analysis import Significance
 from evaluation.result_analyzer.utils.data_util import DataType
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 
 
 class Correlation:
+    # float data of the _CORR files, keyed by (resolved path, mtime) so that rewritten files are read again
+    __FLOAT_DATA_CACHE: Dict[Tuple[str, float], pd.DataFrame] = {}
+
     @staticmethod
     def sig_value_to_float(x):
         if pd.isna(x):
@@ -30,82 +34,153 @@ class Correlation:
                 assert False
         return res
 
+    @staticmethod
+    def sig_data_to_float(data: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized `sig_value_to_float`: "=" is 0, "+ p" is 1 - p and "- p" is -(1 - p)."""
+        stacked = data.stack(dropna=False)
+        is_present = stacked.notna()
+        parts = stacked.fillna("=").astype(str).str.split(" ")
+        sign = parts.str[0]
+        assert (sign.eq("=") & parts.str.len().eq(1) | sign.isin(["+", "-"]) & parts.str.len().eq(2)).all(), "Wrong significance value"
+        value = pd.to_numeric(parts.str[1], errors="coerce")
+        res = pd.Series(np.select(
+            [~is_present, sign == "=", sign == "+"],
+            [np.nan, 0.0, 1 - value],
+            default=-(1 - value),
+        ), index=stacked.index)
+        return res.unstack().reindex(index=data.index, columns=data.columns)
+
+    # a variance below this share of the sum of squares is rounding noise of a constant column
+    ZERO_VARIANCE_TOLERANCE = 1e-12
+
+    @staticmethod
+    def __center(values: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Subtract the mean of the valid values of each column, zeroing the others, so that the sums do not cancel out."""
+        values = np.where(valid, values, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = values.sum(axis=0) / valid.sum(axis=0)
+        return np.where(valid, values - np.nan_to_num(mean), 0.0)
+
+    @staticmethod
+    def get_correlation_matrix(data1: pd.DataFrame, data2: Optional[pd.DataFrame] = None, method: str = "pearson") -> pd.DataFrame:
+        """Correlation between each column of `data1` and each column of `data2` over the rows where both are present.
+
+        Pearson correlations of all pairs come from a few masked matrix products of the centered columns; "spearman"
+        and "kendall" use `DataFrame.corr` on the joined columns. Like `Series.corr`, a constant column gives NaN.
+        """
+        if data2 is None:
+            data2 = data1
+        data1, data2 = data1.align(data2, join="inner", axis=0)
+        if method != "pearson":
+            all_data = pd.concat([data1.add_prefix("1|"), data2.add_prefix("2|")], axis=1)
+            res = all_data.corr(method=method).loc[[f"1|{item}" for item in data1.columns], [f"2|{item}" for item in data2.columns]]
+            res.index, res.columns = data1.columns, data2.columns
+            return res
+
+        x, y = data1.to_numpy(dtype=float), data2.to_numpy(dtype=float)
+        x_valid, y_valid = ~np.isnan(x), ~np.isnan(y)
+        x, y = Correlation.__center(x, x_valid), Correlation.__center(y, y_valid)
+        x_valid, y_valid = x_valid.astype(float), y_valid.astype(float)
+        # sums over the rows where both columns of a pair are present, recentered on the mean of those rows
+        count = x_valid.T @ y_valid
+        x_sum, y_sum = x.T @ y_valid, x_valid.T @ y
+        xx_sum, yy_sum = (x * x).T @ y_valid, x_valid.T @ (y * y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xy = x.T @ y - x_sum * y_sum / count
+            xx = xx_sum - x_sum ** 2 / count
+            yy = yy_sum - y_sum ** 2 / count
+            res = xy / np.sqrt(xx * yy)
+        res[(count < 2) | (xx <= Correlation.ZERO_VARIANCE_TOLERANCE * xx_sum) | (yy <= Correlation.ZERO_VARIANCE_TOLERANCE * yy_sum)] = np.nan
+        return pd.DataFrame(res, index=data1.columns, columns=data2.columns)
+
+    @staticmethod
+    def get_column_correlation(data1: pd.DataFrame, data2: pd.DataFrame) -> pd.Series:
+        """Pearson correlation between the same-named columns of two frames, like `data1[column].corr(data2[column])`."""
+        data1, data2 = data1.align(data2[data1.columns], join="inner", axis=0)
+        x, y = data1.to_numpy(dtype=float), data2.to_numpy(dtype=float)
+        valid = ~np.isnan(x) & ~np.isnan(y)
+        x, y = Correlation.__center(x, valid), Correlation.__center(y, valid)
+        xx, yy = (x * x).sum(axis=0), (y * y).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            res = (x * y).sum(axis=0) / np.sqrt(xx * yy)
+        res[(valid.sum(axis=0) < 2) | (xx == 0) | (yy == 0)] = np.nan
+        return pd.Series(res, index=data1.columns)
+
+    @classmethod
+    def __get_float_data(cls, file_path: str) -> pd.DataFrame:
+        target_path = StorageUtil.resolve_path(file_path)
+        key = (target_path, os.path.getmtime(target_path))
+        if key not in cls.__FLOAT_DATA_CACHE:
+            cls.__FLOAT_DATA_CACHE[key] = StorageUtil.read(target_path, index_col=0, sheet_name="float_data").astype(float)
+        return cls.__FLOAT_DATA_CACHE[key]
+
+    @staticmethod
+    def __get_corr_file_path(data_type: DataType, postfix: Optional[str]) -> str:
+        return os.path.join(
+            ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type),
+            f"{data_type.value}_ALL_TOOL_PAIRS{'' if postfix is None else '_' + postfix}_CORR.xlsx"
+        )
+
     @staticmethod
     def get_correlation_between_metrics(file_name_to_read: str, data_type: DataType):
-        data = pd.read_excel(
+        """Correlate the metrics over the signed p-values of all tool pairs and apps.
+
+        The numeric SIGP sheets written by `Significance` are used, and the SIG strings are parsed only for files
+        written before them.
+        """
+        data = StorageUtil.read(
             os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), file_name_to_read),
-            index_col=0, sheet_name=None, dtype=str
+            index_col=0, sheet_name=None,
         )
 
-        excel_writer = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), file_name_to_read.replace(".xlsx", "_CORR.xlsx")
-        ))
-
-        all_data = pd.DataFrame()
+        sig_postfix = f"_{Significance.SIGNIFICANCE_IDENTIFIER}"
+        raw_data_list, float_data_list = [], []
         for sheet_name, sheet_data in data.items():
-            if sheet_name.endswith(f"_{Significance.SIGNIFICANCE_IDENTIFIER}"):
-                all_data = pd.concat([
-                    all_data,
-                    sheet_data.rename(index=lambda x: f"[{sheet_name.split('_')[0]}]{x}")
-                ], axis=0)
+            if not sheet_name.endswith(sig_postfix):
+                continue
+            signed_p_sheet_name = f"{sheet_name[:-len(sig_postfix)]}_{Significance.SIGNED_P_IDENTIFIER}"
+            if signed_p_sheet_name in data:
+                float_data = data[signed_p_sheet_name].astype(float)
+            else:
+                float_data = Correlation.sig_data_to_float(sheet_data)
+            rename_index = lambda x: f"[{sheet_name.split('_')[0]}]{x}"
+            raw_data_list.append(sheet_data.rename(index=rename_index))
+            float_data_list.append(float_data.rename(index=rename_index))
 
-        all_data_float = all_data.applymap(Correlation.sig_value_to_float)
+        all_data = pd.concat(raw_data_list, axis=0)
+        all_data_float = pd.concat(float_data_list, axis=0)
 
         corr_res = all_data_float.corr()
 
-        all_data.to_excel(excel_writer, sheet_name="raw_data")
-        all_data_float.to_excel(excel_writer, sheet_name="float_data")
-        corr_res.to_excel(excel_writer, sheet_name="corr_result")
+        StorageUtil.write_sheets(
+            os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), file_name_to_read.replace(".xlsx", "_CORR.xlsx")),
+            {"raw_data": all_data, "float_data": all_data_float, "corr_result": corr_res},
+            export_excel=True,
+        )
 
         my_logger.hint(my_logger.LogLevel.INFO, "Significance", False, f"Correlation Result:\n{corr_res}")
 
-        excel_writer.save()
-
-    @staticmethod
-    def get_correlation_between_time(postfix_pair_list: List[Tuple[str, str]], file_postfix, data_type: DataType):
+    @classmethod
+    def get_correlation_between_time(cls, postfix_pair_list: List[Tuple[str, str]], file_postfix, data_type: DataType):
         res = pd.DataFrame()
 
         for post_fix_1, post_fix_2 in postfix_pair_list:
-            data1 = pd.read_excel(
-                os.path.join(
-                    ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type),
-                    f"{data_type.value}_ALL_TOOL_PAIRS_{post_fix_1}_CORR.xlsx"
-                ),
-                index_col=0, sheet_name="float_data", dtype=str
-            ).applymap(float)
-            data2 = pd.read_excel(
-                os.path.join(
-                    ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type),
-                    f"{data_type.value}_ALL_TOOL_PAIRS_{post_fix_2}_CORR.xlsx"
-                ),
-                index_col=0, sheet_name="float_data", dtype=str
-            ).applymap(float)
-            for column in data1.columns:
-                res.loc[f"{post_fix_1}_{post_fix_2}", column] = round(data1[column].corr(data2[column]), 3)
-
-        res.to_excel(os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), f"{data_type.value}_time_CORR{file_postfix}.xlsx"))
+            data1 = cls.__get_float_data(cls.__get_corr_file_path(data_type, post_fix_1))
+            data2 = cls.__get_float_data(cls.__get_corr_file_path(data_type, post_fix_2))
+            corr_res = cls.get_column_correlation(data1, data2)
+            res = pd.concat([res, pd.DataFrame(
+                [np.round(corr_res.to_numpy(), 3)],
+                index=[f"{post_fix_1}_{post_fix_2}"],
+                columns=data1.columns,
+            )])
+
+        StorageUtil.write(os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), f"{data_type.value}_time_CORR{file_postfix}.xlsx"), res, export_excel=True)
 
     @classmethod
-    def get_correlation_between_coverage_and_bug(cls, coverage_postfix, bug_postfix):
-        coverage_data = pd.read_excel(
-            os.path.join(
-                ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(DataType.Coverage),
-                f"{DataType.Coverage.value}_ALL_TOOL_PAIRS{'' if coverage_postfix is None else '_' + coverage_postfix}_CORR.xlsx"
-            ),
-            sheet_name="float_data", index_col=0,
-        )
-        bug_data = pd.read_excel(
-            os.path.join(
-                ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(DataType.Bug),
-                f"{DataType.Bug.value}_ALL_TOOL_PAIRS{'' if bug_postfix is None else '_' + bug_postfix}_CORR.xlsx"
-            ),
-            sheet_name="float_data", index_col=0,
-        )
-        all_data = pd.concat([coverage_data, bug_data], axis=1)
-        assert len(coverage_data) == len(bug_data) == len(all_data)
+    def get_correlation_between_coverage_and_bug(cls, coverage_postfix, bug_postfix, method: str = "pearson"):
+        coverage_data = cls.__get_float_data(cls.__get_corr_file_path(DataType.Coverage, coverage_postfix))
+        bug_data = cls.__get_float_data(cls.__get_corr_file_path(DataType.Bug, bug_postfix))
+        assert len(coverage_data) == len(bug_data) == len(pd.concat([coverage_data, bug_data], axis=1))
 
-        res = pd.DataFrame()
-        for coverage_domain in coverage_data.columns:
-            for bug_domain in bug_data.columns:
-                res.loc[coverage_domain, bug_domain] = all_data[coverage_domain].corr(all_data[bug_domain])
-        res.to_excel(os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), f"Coverage_Bug_CORR.xlsx"))
+        res = cls.get_correlation_matrix(coverage_data, bug_data, method)
+        StorageUtil.write(os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), f"Coverage_Bug_CORR.xlsx"), res, export_excel=True)
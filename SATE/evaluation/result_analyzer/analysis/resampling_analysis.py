@@ -0,0 +1,190 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+import multiprocessing
+import os
+import zlib
+from typing import Dict, List, Optional, Set, Tuple, Callable
+
+import numpy as np
+import pandas as pd
+
+from android_testing_utils.log import my_logger
+from evaluation.result_analyzer.utils.data_util import DataType
+from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
+
+
+class Resampling:
+    """Distributions of CV, mean and union of faults over random size-k subsets of the repetitions.
+
+    Unlike the slicing of `Variation`, which only looks at the first k runs, every (tool, app) draws
+    `RESAMPLE_COUNT` subsets without replacement. The generators are seeded by `RANDOM_SEED` and the job key, so the
+    results are reproducible whatever the number of processes.
+    """
+    RESAMPLE_COUNT = 1000
+    CONFIDENCE = 0.95
+    RANDOM_SEED = 0
+    PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+
+    @staticmethod
+    def get_rng(seed: int, key: str) -> np.random.Generator:
+        return np.random.default_rng([seed, zlib.crc32(key.encode())])
+
+    @staticmethod
+    def get_subset_indices(rng: np.random.Generator, run_count: int, k: int, resample_count: int) -> np.ndarray:
+        """A (resample × k) array of run indices, each line is a random subset of size k."""
+        return np.argsort(rng.random((resample_count, run_count)), axis=1)[:, :k]
+
+    @classmethod
+    def summarize(cls, samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mean and confidence interval of the samples along the last axis."""
+        alpha = (1 - cls.CONFIDENCE) / 2
+        return samples.mean(axis=-1), np.quantile(samples, alpha, axis=-1), np.quantile(samples, 1 - alpha, axis=-1)
+
+    @classmethod
+    def __run_jobs(cls, job_func: Callable, param: List[Tuple]) -> List:
+        if cls.PROCESS_COUNT > 1 and len(param) > 1:
+            with multiprocessing.Pool(min(cls.PROCESS_COUNT, len(param))) as pool:
+                my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start resampling {len(param)} apps with multiprocessing...")
+                return pool.starmap(job_func, param)
+        return [job_func(*item) for item in param]
+
+    @classmethod
+    def resample_one_app(
+            cls,
+            app_name: str,
+            tool_arrays: Dict[str, np.ndarray],
+            k_list: List[int],
+            resample_count: int,
+            seed: int,
+    ) -> Dict[Tuple[str, int], Dict[str, np.ndarray]]:
+        """Per (tool, k), the cv and mean (metric × resample) samples of one app, and the metrics with negative data.
+
+        `tool_arrays` maps each tool to a (metric × run) array.
+        """
+        res = {}
+        for tool, array in tool_arrays.items():
+            rng = cls.get_rng(seed, f"{app_name}|{tool}")
+            for k in k_list:
+                if k > array.shape[1]:
+                    continue
+                samples = array[:, cls.get_subset_indices(rng, array.shape[1], k, resample_count)]
+                mean = samples.mean(axis=-1)
+                std = samples.std(axis=-1, ddof=1)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    cv = np.where(std == 0, 0, std / mean * 100)
+                res[(tool, k)] = {
+                    "cv": cv,
+                    "mean": mean,
+                    "negative": np.any(array < 0, axis=-1),
+                }
+        return res
+
+    @classmethod
+    def original_data_to_resampled_cv_data(
+            cls,
+            original_data_path: str,
+            tools: List[str],
+            data_type: DataType,
+            k_list: List[int],
+            postfix: Optional[str] = None,
+    ):
+        original_data = StorageUtil.read(original_data_path, index_col=0, header=0)
+        app_columns: Dict[str, List[str]] = {}
+        for column in original_data.columns:
+            app_columns.setdefault(column.split('-')[0], []).append(column)
+
+        param = [
+            (
+                app_name,
+                {tool: original_data.loc[tool, columns].to_numpy(dtype=float).T for tool in tools},
+                k_list,
+                cls.RESAMPLE_COUNT,
+                cls.RANDOM_SEED,
+            )
+            for app_name, columns in app_columns.items()
+        ]
+        res = cls.__run_jobs(cls.resample_one_app, param)
+
+        raw_records = []
+        type_samples: Dict[Tuple[str, str, int], List[np.ndarray]] = {}
+        for (app_name, columns), app_res in zip(app_columns.items(), res):
+            for (tool, k), statistic_data in app_res.items():
+                cv_avg, cv_low, cv_high = cls.summarize(statistic_data["cv"])
+                mean_avg, mean_low, mean_high = cls.summarize(statistic_data["mean"])
+                for i, column in enumerate(columns):
+                    if statistic_data["negative"][i]:
+                        raw_records.append((tool, column, k) + (-1,) * 6)
+                        continue
+                    raw_records.append((tool, column, k, cv_avg[i], cv_low[i], cv_high[i], mean_avg[i], mean_low[i], mean_high[i]))
+                    type_samples.setdefault((tool, column.split('-')[1], k), []).append(statistic_data["cv"][i])
+
+        # the average cv over apps is taken within each resample before summarizing
+        avg_records = []
+        for (tool, current_type, k), samples in type_samples.items():
+            avg, low, high = cls.summarize(np.mean(samples, axis=0))
+            avg_records.append((tool, current_type, k, avg, low, high))
+
+        statistic_columns = ["cv", "cv_low", "cv_high", "mean", "mean_low", "mean_high"]
+        StorageUtil.write_sheets(os.path.join(
+            ExcelDirectoryPathGenerator.get_cv_data_dir(),
+            f"{data_type.value}{'' if postfix is None else '_' + postfix}-resampled.xlsx"
+        ), {
+            "cv_raw": pd.DataFrame(raw_records, columns=["tool", "column", "k"] + statistic_columns).set_index(["tool", "column", "k"]),
+            "cv_avg": pd.DataFrame(avg_records, columns=["tool", "type", "k"] + statistic_columns[:3]).set_index(["tool", "type", "k"]),
+        }, export_excel=True)
+
+    @classmethod
+    def resample_one_app_faults(
+            cls,
+            app_name: str,
+            tool_fault_sets: Dict[str, List[Set[str]]],
+            k_list: List[int],
+            resample_count: int,
+            seed: int,
+    ) -> Dict[Tuple[str, int], np.ndarray]:
+        """Per (tool, k), the number of distinct faults found by the union of each resampled subset of runs."""
+        res = {}
+        for tool, fault_sets in tool_fault_sets.items():
+            rng = cls.get_rng(seed, f"{app_name}|{tool}")
+            fault_index = {fault: i for i, fault in enumerate(sorted(set().union(*fault_sets)))}
+            incidence = np.zeros((len(fault_sets), len(fault_index)), dtype=bool)
+            for i, fault_set in enumerate(fault_sets):
+                incidence[i, [fault_index[fault] for fault in fault_set]] = True
+            for k in k_list:
+                if k > len(fault_sets):
+                    continue
+                res[(tool, k)] = incidence[cls.get_subset_indices(rng, len(fault_sets), k, resample_count)].any(axis=1).sum(axis=1)
+        return res
+
+    @classmethod
+    def fault_sets_to_resampled_union_data(
+            cls,
+            all_abstract_data: Dict[str, Dict[str, Set[str]]],
+            tool_func: Callable[[str], Optional[str]],
+            k_list: List[int],
+            postfix: Optional[str] = None,
+    ):
+        """`all_abstract_data` maps app name to the fault keys of each tag, `tool_func` maps a tag to its tool."""
+        param = []
+        for app_name, app_data in all_abstract_data.items():
+            tool_fault_sets: Dict[str, List[Set[str]]] = {}
+            for tag_name in sorted(app_data.keys()):
+                tool = tool_func(tag_name)
+                if tool is not None:
+                    tool_fault_sets.setdefault(tool, []).append(app_data[tag_name])
+            param.append((app_name, tool_fault_sets, k_list, cls.RESAMPLE_COUNT, cls.RANDOM_SEED))
+        res = cls.__run_jobs(cls.resample_one_app_faults, param)
+
+        records = []
+        for (app_name, *_), app_res in zip(param, res):
+            for (tool, k), samples in app_res.items():
+                avg, low, high = cls.summarize(samples)
+                records.append((tool, app_name, k, avg, low, high))
+
+        StorageUtil.write(os.path.join(
+            ExcelDirectoryPathGenerator.get_cv_data_dir(),
+            f"{DataType.Bug.value}_union{'' if postfix is None else '_' + postfix}-resampled.xlsx"
+        ), pd.DataFrame(records, columns=["tool", "app", "k", "union", "union_low", "union_high"]).set_index(["tool", "app", "k"]), export_excel=True)
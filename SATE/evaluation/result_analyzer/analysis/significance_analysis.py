@@ -4,9 +4,9 @@
 # ----------------------
 import itertools
 import math
+import multiprocessing
 import os
-import shutil
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -15,95 +15,98 @@ from pandas import CategoricalDtype
 from android_testing_utils.log import my_logger
 from evaluation.result_analyzer.utils.data_util import DataType, StatisticDataUtil
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 from runtime_collection import unified_testing_config
 
 
 class Significance:
     SIGNIFICANCE_IDENTIFIER = "SIG"
+    # the numeric counterpart of the SIG sheet: direction * (1 - p), 0 for equal means
+    SIGNED_P_IDENTIFIER = "SIGP"
     IS_SIGNIFICANT_IDENTIFIER = "isSIG"
     TOTAL_COUNT_IDENTIFIER = "TOTAL"
 
+    SIGNIFICANCE_LEVEL = 0.05
+
+    # the raw statistic data of a tool pair, one row per column of the original data
+    RAW_STATISTIC_COLUMNS = ["mean1", "std1", "mean2", "std2", "t", "p"]
+
+    PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+
+    # keep the intermediate stages of `full_significance_process_for_spssau_raw_data` under the temp dir for debugging
+    WRITE_TEMP_FILES = False
+
     @staticmethod
     def __generate_is_significant_column(
             data: pd.DataFrame,
             appointed_column: str,
             identifier: str,
     ) -> pd.DataFrame:
-        data = pd.concat([data, pd.DataFrame(columns=[
-            identifier,
-        ], dtype=str)])
-        for index, row in data.iterrows():
-            t_value = row[appointed_column]
-            if pd.isna(t_value):
-                data.loc[index, identifier] = ""
-                my_logger.hint(my_logger.LogLevel.WARNING, "Significance", False, f"Wrong with line: {index}  {row.tolist()}")
-                continue
-
-            symbol = row[appointed_column][0]
-            if (symbol == "+" or symbol == "-") and (float(row[appointed_column][1:]) < 0.05):
-                data.loc[index, identifier] = f"{symbol}{symbol}"
-            else:
-                data.loc[index, identifier] = ""
+        data = data.copy()
+        direction, p_value = data[appointed_column], data[f"{appointed_column}_P"]
+        for index in data.index[direction.isna()]:
+            my_logger.hint(my_logger.LogLevel.WARNING, "Significance", False, f"Wrong with line: {index}  {data.loc[index].tolist()}")
+
+        is_significant = p_value < Significance.SIGNIFICANCE_LEVEL
+        data[identifier] = pd.Series(np.select(
+            [direction.eq(1) & is_significant, direction.eq(-1) & is_significant],
+            ["++", "--"],
+            default=None,
+        ), index=data.index, dtype=object).replace({None: np.nan})
         return data
 
     @staticmethod
     def __generate_significance_column_from_raw_statistic_data(data: pd.DataFrame, identifier: str) -> pd.DataFrame:
-        data = pd.concat([data, pd.DataFrame(columns=[
-            identifier,
-        ], dtype=str)])
-        for index, row in data.iterrows():
-            tool1_avg = float(row["TOOL1"].split("±")[0])
-            tool2_avg = float(row["TOOL2"].split("±")[0])
-
-            if tool1_avg == tool2_avg:
-                data.loc[index, identifier] = "="
-            elif pd.isna(row["T"]):
-                if tool1_avg > tool2_avg:
-                    data.loc[index, identifier] = "+ 0.00"
-                elif tool1_avg < tool2_avg:
-                    data.loc[index, identifier] = "- 0.00"
-            elif row["T"] == 0:
-                if tool1_avg > tool2_avg:
-                    data.loc[index, identifier] = "+ 1.00"
-                elif tool1_avg < tool2_avg:
-                    data.loc[index, identifier] = "- 1.00"
-            else:
-                p_temp = str(row["P"])[:4]
-                if tool1_avg > tool2_avg:
-                    data.loc[index, identifier] = f"+ {p_temp}"
-                else:
-                    data.loc[index, identifier] = f"- {p_temp}"
+        """Add the direction of the difference to `identifier`, its p-value to `identifier`_P and the signed p-value
+        direction * (1 - p) to `identifier`_SIGNED_P.
+
+        The direction is 1 when the first tool is higher, -1 when it is lower and 0 when the means are equal, the p-value
+        is 0 when the t statistic is NaN and 1 when it is 0. Means are compared at 2 decimals and t at 3, and p is rounded
+        to 3 decimals and cut to 2, while the signed p-value keeps the unrounded p.
+        """
+        data = data.copy()
+        tool1_avg, tool2_avg = data["mean1"].round(2), data["mean2"].round(2)
+        t_value = data["t"].round(3)
+        p_value = (np.rint(data["p"] * 1000) // 10) / 100
+
+        greater, less = tool1_avg > tool2_avg, tool1_avg < tool2_avg
+        data[identifier] = np.select([tool1_avg == tool2_avg, greater, less], [0.0, 1.0, -1.0], default=np.nan)
+        data[f"{identifier}_P"] = np.select(
+            [tool1_avg == tool2_avg, ~(greater | less), t_value.isna(), t_value == 0],
+            [np.nan, np.nan, 0.0, 1.0],
+            default=p_value,
+        )
+        data[f"{identifier}_SIGNED_P"] = data[identifier] * np.select(
+            [data[identifier] == 0, t_value.isna(), t_value == 0],
+            [0.0, 1.0, 0.0],
+            default=1 - data["p"],
+        )
         return data
 
     @staticmethod
-    def __significance_analysis(file_to_read, file_to_write):
-        data = pd.read_excel(file_to_read, index_col=0)
+    def __format_significance(direction: pd.Series, p_value: pd.Series) -> pd.Series:
+        """"=" for equal means, otherwise the sign of the difference and the p-value, e.g. "+ 0.04"."""
+        res = direction.map({1.0: "+ ", -1.0: "- "}) + p_value.map("{:.2f}".format)
+        res[direction.eq(0)] = "="
+        return res
 
+    @staticmethod
+    def __significance_analysis(data: pd.DataFrame) -> pd.DataFrame:
         data = Significance.__generate_significance_column_from_raw_statistic_data(data, Significance.SIGNIFICANCE_IDENTIFIER)
         data = Significance.__generate_is_significant_column(data, Significance.SIGNIFICANCE_IDENTIFIER, Significance.IS_SIGNIFICANT_IDENTIFIER)
-
-        data.to_excel(file_to_write)
+        return data
 
     @staticmethod
-    def __split_raw_data_with_sig_to_sheets_by_types(file_to_read: str, file_to_write: str):
-        data = pd.read_excel(file_to_read, index_col=0)
-
-        res: Dict[str, pd.DataFrame] = {}
-        for index, row in data.iterrows():
-            app_name, domain = str(index).split("-")
-            if domain not in res:
-                res[domain] = pd.DataFrame(columns=data.columns)
-            res[domain].loc[app_name] = row
-
-        excel_writer = pd.ExcelWriter(file_to_write)
-        for key, value in res.items():
-            value.to_excel(excel_writer, sheet_name=key)
-        excel_writer.save()
+    def __split_raw_data_with_sig_to_sheets_by_types(data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        app_domains = [str(index).split("-") for index in data.index]
+        data = data.set_axis([app_name for app_name, _ in app_domains], axis=0)
+        return {domain: sheet for domain, sheet in data.groupby([domain for _, domain in app_domains], sort=False)}
 
     @staticmethod
-    def __combine_sig_data_and_get_counts(file_to_read: str, file_to_write: str, index_filter: Optional[List] = None):
-        data = pd.read_excel(file_to_read, sheet_name=None, index_col=0, dtype=str)
-
+    def __combine_sig_data_and_get_counts(
+            data: Dict[str, pd.DataFrame],
+            index_filter: Optional[List] = None,
+    ) -> Tuple[Dict[str, pd.DataFrame], pd.Series]:
         domain_count = len(data)
         domain_significant_count = math.ceil(domain_count * 2 / 3)
 
@@ -114,78 +117,53 @@ class Significance:
         app_sorted_order = CategoricalDtype(unified_testing_config.SORTED_APP_NAME_LIST_BY_ACTIVITY, ordered=True)
 
         res1 = pd.DataFrame(columns=data.keys())
+        res1_float = pd.DataFrame(columns=data.keys(), dtype=float)
         res2 = pd.DataFrame(columns=data.keys())
 
         # get significance value and significance signs
         for domain, sheet in data.items():
-            res1[domain] = sheet[Significance.SIGNIFICANCE_IDENTIFIER]
+            res1[domain] = Significance.__format_significance(
+                sheet[Significance.SIGNIFICANCE_IDENTIFIER], sheet[f"{Significance.SIGNIFICANCE_IDENTIFIER}_P"],
+            )
+            res1_float[domain] = sheet[f"{Significance.SIGNIFICANCE_IDENTIFIER}_SIGNED_P"]
             res2[domain] = sheet[Significance.IS_SIGNIFICANT_IDENTIFIER]
 
         # sort by the appointed order
         res1.index = res1.index.astype(app_sorted_order)
         res1.sort_index(axis=0, inplace=True)
+        res1_float.index = res1_float.index.astype(app_sorted_order)
+        res1_float.sort_index(axis=0, inplace=True)
         res2.index = res2.index.astype(app_sorted_order)
         res2.sort_index(axis=0, inplace=True)
 
-        excel_writer = pd.ExcelWriter(file_to_write)
-
-        res1.to_excel(excel_writer, sheet_name=Significance.SIGNIFICANCE_IDENTIFIER)
-
-        # count signs via columns
-        count_column = pd.DataFrame()
-        for column_name, column_data in res2.iteritems():
-            count_column = pd.concat([count_column, pd.DataFrame(res2[column_name].value_counts())], axis=1)
-        if "++" not in count_column.index:
-            count_column.loc["++"] = np.nan
-        if "--" not in count_column.index:
-            count_column.loc["--"] = np.nan
-        count_column = count_column.fillna(0)
-        count_column.sort_index(axis=0, inplace=True)
-
-        # count signs via lines
-        count_line = pd.DataFrame()
-        for index, row in res2.iterrows():
-            count_line = pd.concat([count_line, pd.DataFrame(res2.loc[index].value_counts()).T], axis=0)
-        if "++" not in count_line.columns:
-            count_line["++"] = np.nan
-        if "--" not in count_line.columns:
-            count_line["--"] = np.nan
-        count_line = count_line.fillna(0)
-        count_line.sort_index(axis=1, inplace=True)
+        sheets: Dict[str, pd.DataFrame] = {
+            Significance.SIGNIFICANCE_IDENTIFIER: res1,
+            Significance.SIGNED_P_IDENTIFIER: res1_float,
+        }
 
-        # add extra analysis
-        for index, row in count_line.iterrows():
-            pos_cnt = row["++"]
-            neg_cnt = row["--"]
-
-            if pos_cnt >= domain_significant_count:
-                count_line.loc[index, "R"] = '>>'
-            elif neg_cnt >= domain_significant_count:
-                count_line.loc[index, "R"] = '<<'
-            else:
-                count_line.loc[index, "R"] = np.nan
-
-            if pos_cnt == domain_count or neg_cnt == domain_count:
-                count_line.loc[index, "Same"] = '√'
-            else:
-                count_line.loc[index, "Same"] = np.nan
-
-            for domain in res2.columns:
-                if (not pd.isna(count_line.loc[index, "R"])) and (pd.isna(res2.loc[index, domain])):
-                    count_line.loc[index, f"NotSig-{domain}"] = '√'
-                else:
-                    count_line.loc[index, f"NotSig-{domain}"] = np.nan
+        # count signs via columns and via lines
+        sign_values = sorted(set(res2.stack().unique()) | {"++", "--"})
+        count_column = pd.DataFrame({value: res2.eq(value).sum(axis=0) for value in sign_values}).T
+        count_line = pd.DataFrame({value: res2.eq(value).sum(axis=1) for value in sign_values}, index=res2.index)
 
+        # add extra analysis
+        if len(count_line) > 0:
+            pos_cnt = count_line["++"]
+            neg_cnt = count_line["--"]
+            count_line["R"] = np.select(
+                [pos_cnt >= domain_significant_count, neg_cnt >= domain_significant_count],
+                [">>", "<<"],
+                default=None,
+            )
+            count_line["Same"] = np.where((pos_cnt == domain_count) | (neg_cnt == domain_count), "√", None)
+            has_result = count_line["R"].notna()
             for domain in res2.columns:
-                if not pd.isna(count_line.loc[index, "R"]):
-                    if count_line.loc[index, "R"] == ">>":
-                        target = "--"
-                    else:
-                        target = "++"
-                    if res2.loc[index, domain] == target:
-                        count_line.loc[index, f"Conflict-{domain}"] = '√'
-                    else:
-                        count_line.loc[index, f"Conflict-{domain}"] = np.nan
+                count_line[f"NotSig-{domain}"] = np.where(has_result & res2[domain].isna(), "√", None)
+            if has_result.any():
+                conflict_target = count_line["R"].map({">>": "--", "<<": "++"})
+                for domain in res2.columns:
+                    count_line[f"Conflict-{domain}"] = np.where(has_result & res2[domain].eq(conflict_target), "√", None)
+            count_line = count_line.replace({None: np.nan})
 
         # add these counted data
         res2 = pd.concat([res2, count_line], axis=1)
@@ -193,11 +171,9 @@ class Significance:
         res2 = pd.concat([res2, count_column], axis=0)
         res2.loc[Significance.TOTAL_COUNT_IDENTIFIER] = total
 
-        res2.to_excel(excel_writer, sheet_name=Significance.IS_SIGNIFICANT_IDENTIFIER)
+        sheets[Significance.IS_SIGNIFICANT_IDENTIFIER] = res2
 
-        excel_writer.save()
-
-        return total
+        return sheets, total
 
     @staticmethod
     def original_data_to_raw_significance_data(
@@ -206,62 +182,74 @@ class Significance:
             data_type: DataType,
             postfix: Optional[str] = None,
     ):
-        original_data = pd.read_excel(original_data_path, index_col=0, header=0)
-        tool_data_dict: Dict[str, Dict[str, np.ndarray]] = {
-            tool : StatisticDataUtil.full_data_to_tool_ndarrays(original_data, tool)
-            for tool in tools
-        }
-        for pair in itertools.combinations(tools, 2):
-            tool1, tool2 = pair
-            current_statistic_data = pd.DataFrame(
-                columns=[tool1, tool2, "t", "p"],
-                index=original_data.columns,
-            )
-            for column in original_data.columns:
-                current_statistic_data.loc[column, tool1] = StatisticDataUtil.get_average_with_std_str(tool_data_dict[tool1][column])
-                current_statistic_data.loc[column, tool2] = StatisticDataUtil.get_average_with_std_str(tool_data_dict[tool2][column])
-                t, p = StatisticDataUtil.get_t_test_res(tool_data_dict[tool1][column], tool_data_dict[tool2][column])
-                current_statistic_data.loc[column, "t"] = t
-                current_statistic_data.loc[column, "p"] = p
-
-            current_statistic_data = current_statistic_data[(~current_statistic_data[tool1].str.startswith('-'))&(~current_statistic_data[tool2].str.startswith('-'))]
-            current_statistic_data.to_excel(os.path.join(
+        original_data = StorageUtil.read(original_data_path, index_col=0, header=0)
+        pairs = list(itertools.combinations(tools, 2))
+        statistic_data = StatisticDataUtil.get_batched_t_test_res(original_data, pairs)
+        for pair, pair_data in statistic_data.groupby(["tool1", "tool2"], sort=False):
+            current_statistic_data = pair_data.set_index(pd.Index(pair_data["column"].to_numpy()))[Significance.RAW_STATISTIC_COLUMNS]
+            current_statistic_data = current_statistic_data[~(current_statistic_data["mean1"] < 0) & ~(current_statistic_data["mean2"] < 0)]
+            StorageUtil.write(os.path.join(
                 ExcelDirectoryPathGenerator.get_raw_statistic_data_dir(data_type),
                 f"{'-'.join(pair)}{'' if postfix is None else '_'+postfix}.xlsx"
-            ))
+            ), current_statistic_data)
+
+    @staticmethod
+    def __write_temp_files(raw_data_file_name: str, data_type: DataType, stages: List[Tuple[str, Dict[str, pd.DataFrame]]]):
+        # named after the raw data file, so that runs for different tool pairs do not overwrite each other
+        for stage_name, sheets in stages:
+            StorageUtil.write_sheets(os.path.join(
+                ExcelDirectoryPathGenerator.get_temp_dir(data_type),
+                f"{data_type.value}_{raw_data_file_name.split('.xlsx')[0]}_{stage_name}.xlsx"
+            ), sheets)
 
     @staticmethod
     def full_significance_process_for_spssau_raw_data(
             raw_data_file_name: str,
             data_type: DataType,
-            combine_to_one_target: pd.ExcelWriter = None,
+            combine_to_one_target: Optional[Dict[str, pd.DataFrame]] = None,
             index_filter: Optional[List] = None,
     ):
-        excel1 = os.path.join(ExcelDirectoryPathGenerator.get_temp_dir(data_type), f"{data_type.value}_t1_unified_raw_statistics.xlsx")
-        excel2 = os.path.join(ExcelDirectoryPathGenerator.get_temp_dir(data_type), f"{data_type.value}_t2_statistics_with_sig.xlsx")
-        excel3 = os.path.join(ExcelDirectoryPathGenerator.get_temp_dir(data_type), f"{data_type.value}_t3_statistics_with_sig_by_types.xlsx")
-        excel4 = os.path.join(ExcelDirectoryPathGenerator.get_temp_dir(data_type), f"{data_type.value}_t4_coverage_sig.xlsx")
-
-        raw_data = pd.read_excel(
+        raw_data = StorageUtil.read(
             os.path.join(ExcelDirectoryPathGenerator.get_raw_statistic_data_dir(data_type), raw_data_file_name),
-            index_col=0, header=None, dtype=str,skiprows=1,
+            index_col=0, header=0,
         )
-        raw_data.columns = ["TOOL1", "TOOL2", "T", "P"]
-        raw_data.to_excel(excel1)
 
-        Significance.__significance_analysis(file_to_read=excel1, file_to_write=excel2)
-        Significance.__split_raw_data_with_sig_to_sheets_by_types(file_to_read=excel2, file_to_write=excel3)
-        total_data = Significance.__combine_sig_data_and_get_counts(file_to_read=excel3, file_to_write=excel4, index_filter=index_filter)
+        data2 = Significance.__significance_analysis(raw_data)
+        data3 = Significance.__split_raw_data_with_sig_to_sheets_by_types(data2)
+        data4, total_data = Significance.__combine_sig_data_and_get_counts(data3, index_filter=index_filter)
+
+        if Significance.WRITE_TEMP_FILES:
+            Significance.__write_temp_files(raw_data_file_name, data_type, [
+                ("t1_unified_raw_statistics", {StorageUtil.DEFAULT_SHEET_NAME: raw_data}),
+                ("t2_statistics_with_sig", {StorageUtil.DEFAULT_SHEET_NAME: data2}),
+                ("t3_statistics_with_sig_by_types", data3),
+                ("t4_coverage_sig", data4),
+            ])
 
         if combine_to_one_target is None:
-            shutil.copy(excel4, os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), raw_data_file_name))
+            StorageUtil.write_sheets(os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), raw_data_file_name), data4)
         else:
-            temp = pd.read_excel(excel4, index_col=0, dtype=str, sheet_name=None)
-            for sheet_name, sheet_data in temp.items():
-                sheet_data.to_excel(combine_to_one_target, sheet_name=f"{raw_data_file_name.split('.xlsx')[0]}_{sheet_name}")
+            for sheet_name, sheet_data in data4.items():
+                combine_to_one_target[f"{raw_data_file_name.split('.xlsx')[0]}_{sheet_name}"] = sheet_data
 
         return total_data
 
+    @staticmethod
+    def process_one_tool_pair(
+            raw_data_file_name: str,
+            data_type: DataType,
+            index_filter: Optional[List] = None,
+    ) -> Tuple[Dict[str, pd.DataFrame], pd.Series]:
+        """A (pair, postfix) job of the all-tool-pairs process, returns its sheets instead of sharing a target dict."""
+        sheets: Dict[str, pd.DataFrame] = {}
+        total_data = Significance.full_significance_process_for_spssau_raw_data(
+            raw_data_file_name,
+            data_type=data_type,
+            combine_to_one_target=sheets,
+            index_filter=index_filter,
+        )
+        return sheets, total_data
+
     @staticmethod
     def full_significance_process_for_spssau_raw_data_all_tool_pairs(
             file_name_to_write: str,
@@ -270,23 +258,62 @@ class Significance:
             index_filter: Optional[List] = None,
             postfix: Optional[str] = None,
     ):
-        res_file = pd.ExcelWriter(os.path.join(
+        Significance.full_significance_process_for_all_tool_pairs_and_postfixes(
+            file_name_to_write=file_name_to_write,
+            tools=tools,
+            data_type=data_type,
+            postfix_list=[postfix],
+            index_filter=index_filter,
+        )
+
+    @staticmethod
+    def full_significance_process_for_all_tool_pairs_and_postfixes(
+            file_name_to_write: str,
+            tools: List[str],
+            data_type: DataType,
+            postfix_list: List[Optional[str]],
+            index_filter: Optional[List] = None,
+    ):
+        pair_list = ['-'.join(item) for item in itertools.combinations(tools, 2)]
+        param = [
+            (f"{pair}{'' if postfix is None else '_'+postfix}.xlsx", data_type, index_filter)
+            for postfix in postfix_list for pair in pair_list
+        ]
+        if Significance.PROCESS_COUNT > 1 and len(param) > 1:
+            with multiprocessing.Pool(min(Significance.PROCESS_COUNT, len(param))) as pool:
+                my_logger.hint(my_logger.LogLevel.INFO, "Significance", True, f"Start processing {len(param)} tool pair jobs with multiprocessing...")
+                res = pool.starmap(Significance.process_one_tool_pair, param)
+        else:
+            res = [Significance.process_one_tool_pair(*item) for item in param]
+
+        # merge in job order, which keeps the sheets of each postfix in the order of the tool pairs
+        for i, postfix in enumerate(postfix_list):
+            Significance.merge_tool_pair_results(
+                file_name_to_write, data_type, postfix, pair_list,
+                res[i * len(pair_list): (i + 1) * len(pair_list)],
+            )
+
+    @staticmethod
+    def merge_tool_pair_results(
+            file_name_to_write: str,
+            data_type: DataType,
+            postfix: Optional[str],
+            pair_list: List[str],
+            pair_res: List[Tuple[Dict[str, pd.DataFrame], pd.Series]],
+    ):
+        """Write the results of `process_one_tool_pair` for the pairs of one postfix and their total counts to one file."""
+        res_file_path = os.path.join(
             ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type),
             f"{file_name_to_write}{'' if postfix is None else '_'+postfix}.xlsx"
-        ))
+        )
+        res_sheets: Dict[str, pd.DataFrame] = {}
         total_sheet = None
-        for pair in ['-'.join(item) for item in itertools.combinations(tools, 2)]:
-            total_data = Significance.full_significance_process_for_spssau_raw_data(
-                f"{pair}{'' if postfix is None else '_'+postfix}.xlsx",
-                data_type=data_type,
-                combine_to_one_target=res_file,
-                index_filter=index_filter
-            )
+        for pair, (sheets, total_data) in zip(pair_list, pair_res):
+            res_sheets.update(sheets)
             if total_sheet is None:
                 total_sheet = pd.DataFrame(columns=total_data.index)
             total_sheet.loc[f"{pair}({Significance.TOTAL_COUNT_IDENTIFIER})"] = total_data
         total_sheet.drop(columns=["++", "--"], inplace=True)
         total_sheet.loc["SUM"] = total_sheet.sum(axis=0)
-        total_sheet.to_excel(res_file, sheet_name=Significance.TOTAL_COUNT_IDENTIFIER)
-        res_file.save()
-        res_file.close()
+        res_sheets[Significance.TOTAL_COUNT_IDENTIFIER] = total_sheet
+        StorageUtil.write_sheets(res_file_path, res_sheets, export_excel=True)
@@ -3,63 +3,120 @@
 # @Author: Yuanhong Lan
 # ----------------------
 import os
-from typing import Dict, List, Callable, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
-from evaluation.result_analyzer.utils.data_util import DataType, StatisticDataUtil
+from evaluation.result_analyzer.utils.data_util import DataType
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 
 
 class Variation:
+    @staticmethod
+    def __get_tool_arrays(original_data: pd.DataFrame, tools: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Stack the runs of all tools into a (tool × column × run) array padded with NaN, and the run count of each tool."""
+        tool_data_list = [original_data.loc[tool, :].to_numpy(dtype=float).T for tool in tools]
+        run_counts = np.array([item.shape[1] for item in tool_data_list])
+        tool_arrays = np.full((len(tools), len(original_data.columns), run_counts.max()), np.nan)
+        for i, item in enumerate(tool_data_list):
+            tool_arrays[i, :, :item.shape[1]] = item
+        return tool_arrays, run_counts
+
+    @staticmethod
+    def __get_prefix_statistic_data(
+            tool_arrays: np.ndarray,
+            run_counts: np.ndarray,
+            slicing: Optional[int] = None,
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """CV and variance (tool × column) of the first `slicing` runs, and where a tool has negative data."""
+        prefix_counts = run_counts if slicing is None else np.minimum(run_counts, slicing)
+        res = {"cv": np.empty(tool_arrays.shape[:2]), "var": np.empty(tool_arrays.shape[:2])}
+        is_negative = np.empty(tool_arrays.shape[:2], dtype=bool)
+        for count in np.unique(prefix_counts):
+            rows = prefix_counts == count
+            # reduce over the contiguous run axis, which sums in the same order as the 1-D calls of StatisticDataUtil
+            data = tool_arrays[rows, :, :count]
+            std = data.std(axis=-1, ddof=1)
+            mean = data.mean(axis=-1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                res["cv"][rows] = np.where(std == 0, 0, np.round(std / mean * 100, 2))
+            res["var"][rows] = data.var(axis=-1, ddof=1)
+            is_negative[rows] = np.any(data < 0, axis=-1)
+        for value in res.values():
+            value[is_negative] = -1
+        return res, is_negative
+
     @classmethod
     def __write_tool_statistic_data(
             cls,
-            excel_writer: pd.ExcelWriter,
+            sheets: Dict[str, pd.DataFrame],
             original_data: pd.DataFrame,
-            tool_data_dict: Dict[str, Dict[str, np.ndarray]],
+            statistic_data: np.ndarray,
+            is_negative: np.ndarray,
             tools: List[str],
             data_name: str,
-            data_func: Callable,
             print_avg_res: bool = False,
     ):
-        res_data = pd.DataFrame(columns=original_data.columns, index=tools)
-        type_recorder = {tool: {} for tool in tools}
-        for column in original_data.columns:
-            current_type = column.split('-')[1]
-            for tool in tools:
-                if np.any(tool_data_dict[tool][column] < 0):
-                    res_data.loc[tool, column] = -1
-                else:
-                    current_cv = data_func(tool_data_dict[tool][column])
-                    res_data.loc[tool, column] = current_cv
-                    if current_type not in type_recorder[tool]:
-                        type_recorder[tool][current_type] = []
-                    type_recorder[tool][current_type].append(current_cv)
-
-        column_temp = [item.split('-')[1] for item in original_data.columns]
-        column_temp = column_temp[:column_temp.index(column_temp[0], 1)]
+        res_data = pd.DataFrame(statistic_data, columns=original_data.columns, index=tools)
 
-        avg_data = pd.DataFrame(columns=column_temp, index=tools)
-        for tool in type_recorder.keys():
-            for current_type in type_recorder[tool].keys():
-                avg_data.loc[tool, current_type] = np.round(np.mean(type_recorder[tool][current_type]), 2)
+        column_types = np.array([item.split('-')[1] for item in original_data.columns])
+        all_types = list(dict.fromkeys(column_types))
+        column_temp = list(column_types[:list(column_types).index(column_types[0], 1)])
 
-        median_data = pd.DataFrame(columns=set([item.split('-')[1] for item in original_data.columns]), index=tools)
-        for tool in type_recorder.keys():
-            for current_type in type_recorder[tool].keys():
-                median_data.loc[tool, current_type] = np.median(type_recorder[tool][current_type])
+        avg_data = pd.DataFrame(np.nan, columns=column_temp + [item for item in all_types if item not in column_temp], index=tools)
+        median_data = pd.DataFrame(np.nan, columns=all_types, index=tools)
+        for current_type in all_types:
+            type_mask = column_types == current_type
+            for i, tool in enumerate(tools):
+                values = statistic_data[i, type_mask & ~is_negative[i]]
+                if len(values) > 0:
+                    avg_data.loc[tool, current_type] = np.round(np.mean(values), 2)
+                    median_data.loc[tool, current_type] = np.median(values)
 
         avg_data.loc["avg"] = np.round(avg_data.mean(axis=0), 2)
 
-        res_data.to_excel(excel_writer, sheet_name=f"{data_name}_raw")
-        avg_data.to_excel(excel_writer, sheet_name=f"{data_name}_avg")
-        median_data.to_excel(excel_writer, sheet_name=f"{data_name}_med")
+        sheets[f"{data_name}_raw"] = res_data
+        sheets[f"{data_name}_avg"] = avg_data
+        sheets[f"{data_name}_med"] = median_data
 
         if print_avg_res:
             print(avg_data)
 
+    @classmethod
+    def original_data_to_cv_data_of_slicings(
+            cls,
+            original_data_path: str,
+            tools: List[str],
+            data_type: DataType,
+            slicing_list: List[Optional[int]],
+            postfix_list: List[Optional[str]],
+    ) -> Dict[Optional[int], Dict[str, pd.DataFrame]]:
+        """Load the original data once and write the cv and var sheets of every slicing, which are also returned."""
+        original_data = StorageUtil.read(original_data_path, index_col=0, header=0)
+        tool_arrays, run_counts = cls.__get_tool_arrays(original_data, tools)
+
+        res: Dict[Optional[int], Dict[str, pd.DataFrame]] = {}
+        for slicing, postfix in zip(slicing_list, postfix_list):
+            statistic_data, is_negative = cls.__get_prefix_statistic_data(tool_arrays, run_counts, slicing)
+            sheets: Dict[str, pd.DataFrame] = {}
+            for data_name in ["cv", "var"]:
+                cls.__write_tool_statistic_data(
+                    sheets=sheets,
+                    original_data=original_data,
+                    statistic_data=statistic_data[data_name],
+                    is_negative=is_negative,
+                    tools=tools,
+                    data_name=data_name,
+                )
+            StorageUtil.write_sheets(os.path.join(
+                ExcelDirectoryPathGenerator.get_cv_data_dir(),
+                f"{data_type.value}{'' if postfix is None else '_' + postfix}.xlsx"
+            ), sheets)
+            res[slicing] = sheets
+        return res
+
     @classmethod
     def original_data_to_cv_data(
             cls,
@@ -69,47 +126,24 @@ class Variation:
             slicing: Optional[int] = None,
             postfix: Optional[str] = None,
     ):
-        original_data = pd.read_excel(original_data_path, index_col=0, header=0)
-        tool_data_dict: Dict[str, Dict[str, np.ndarray]] = {
-            tool: StatisticDataUtil.full_data_to_tool_ndarrays(original_data, tool, slicing)
-            for tool in tools
-        }
-        excel_writer = pd.ExcelWriter(os.path.join(
-            ExcelDirectoryPathGenerator.get_cv_data_dir(),
-            f"{data_type.value}{'' if postfix is None else '_' + postfix}.xlsx"
-        ))
-
-        cls.__write_tool_statistic_data(
-            excel_writer=excel_writer,
-            original_data=original_data,
-            tool_data_dict=tool_data_dict,
-            tools=tools,
-            data_name="cv",
-            data_func=StatisticDataUtil.get_coefficient_of_variation,
-        )
-        cls.__write_tool_statistic_data(
-            excel_writer=excel_writer,
-            original_data=original_data,
-            tool_data_dict=tool_data_dict,
-            tools=tools,
-            data_name="var",
-            data_func=lambda x: np.var(x, ddof=1),
-        )
-
-        excel_writer.save()
+        cls.original_data_to_cv_data_of_slicings(original_data_path, tools, data_type, [slicing], [postfix])
 
     @classmethod
     def combine_cv_avg_data(
             cls,
             file_prefix: str,
             slicing_list: List[int],
+            cv_data: Optional[Dict[int, Dict[str, pd.DataFrame]]] = None,
     ):
         res = {}
         for slicing in slicing_list:
-            data = pd.read_excel(
-                os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), f"{file_prefix}{slicing}.xlsx"),
-                sheet_name=None, index_col=0, dtype=str
-            )
+            if cv_data is not None:
+                data = cv_data[slicing]
+            else:
+                data = StorageUtil.read(
+                    os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), f"{file_prefix}{slicing}.xlsx"),
+                    sheet_name=None, index_col=0
+                )
             for sheet_name, sheet_data in data.items():
                 if sheet_name.endswith("_avg"):
                     for index, row in sheet_data.iterrows():
@@ -117,7 +151,4 @@ class Variation:
                         if new_sheet_name not in res:
                             res[new_sheet_name] = pd.DataFrame(columns=sheet_data.columns)
                         res[new_sheet_name].loc[slicing] = row
-        excel_writer = pd.ExcelWriter(os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), f"{file_prefix}all.xlsx"))
-        for sheet_name, sheet_data in res.items():
-            sheet_data.to_excel(excel_writer, sheet_name=sheet_name)
-        excel_writer.save()
+        StorageUtil.write_sheets(os.path.join(ExcelDirectoryPathGenerator.get_cv_data_dir(), f"{file_prefix}all.xlsx"), res, export_excel=True)
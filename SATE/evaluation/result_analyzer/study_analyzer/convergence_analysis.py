@@ -7,7 +7,6 @@ import os
 import pickle
 from typing import NamedTuple, List, Dict, Optional, Tuple
 
-import numpy as np
 import pandas as pd
 
 from constant import PlatformConstant
@@ -16,7 +15,9 @@ from evaluation.result_analyzer.utils.coverage_util import CoverageTimeUtil, Cov
 from evaluation.result_analyzer.utils.data_util import DataType
 from evaluation.result_analyzer.utils.fault_util import BugAnalyzer, AbstractItem, FaultDomain, LogcatUtil
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
-from evaluation.result_analyzer.utils.pattern_util import PatternUtil
+from evaluation.result_analyzer.utils.pattern_util import TagMatcher
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
 from runtime_collection.collector_util.util_coverage import CoverageItem
 from runtime_collection.unified_testing_config import Apps, get_app_by_package_name, get_app_name_by_package_name, \
     SORTED_APP_NAME_LIST_BY_INSTRUCTION, empirical_app_list_all_for_combodroid
@@ -121,17 +122,18 @@ class CoverageConvergenceTime:
     ) -> pd.DataFrame:
         res = pd.DataFrame()
 
-        for package in os.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
+        tag_matcher = TagMatcher([tag_pattern])
+        for package in ResultRoot.listdir(PlatformConstant.COVERAGE_DATA_ROOT_DIR):
             if get_app_by_package_name(package) not in target_apps:
                 continue
             package_dir = os.path.join(PlatformConstant.COVERAGE_DATA_ROOT_DIR, package)
-            for tag in os.listdir(package_dir):
-                if ((postfix is not None) and tag.endswith(postfix)) and (PatternUtil.is_match(tag_pattern, tag)):
+            for tag in ResultRoot.listdir(package_dir):
+                if ((postfix is not None) and tag.endswith(postfix)) and (tag_matcher.is_match(tag)):
                     tag_dir = os.path.join(package_dir, tag)
-                    for file in os.listdir(tag_dir):
+                    for file in ResultRoot.listdir(tag_dir):
                         if file.endswith(".npy"):
                             file_path = os.path.join(tag_dir, file)
-                            data: Dict[str, List[CoverageItem]] = np.load(file_path, allow_pickle=True).item()
+                            data: Dict[str, List[CoverageItem]] = ResultRoot.load_npy(file_path).item()
                             data = CoverageTimeUtil.normalize_time_for_data_dict(data, testing_time)
                             data = CoverageDataUtil.extend_coverage_data_dict_with_standard_time_series(data, testing_time, 10, False)
                             # current_result_dict = CoverageConvergenceTime.analyze_coverage_convergence_time_for_data_dict(data)
@@ -180,7 +182,7 @@ def add_statistical_data(data, target_data_type: type):
 def present_and_export_coverage_convergence_result(target_app_dict: Dict[str, List[Apps]], testing_time, postfix):
     result_dir_path = ExcelDirectoryPathGenerator.get_time_data_dir(DataType.Coverage)
 
-    excel_writer = pd.ExcelWriter(os.path.join(result_dir_path, "coverage_time_convergence_data.xlsx"))
+    sheets: Dict[str, pd.DataFrame] = {}
 
     for target, target_apps in target_app_dict.items():
         data = CoverageConvergenceTime.analyze_coverage_convergence_time_for_all_packages_with_tag_pattern(
@@ -188,10 +190,10 @@ def present_and_export_coverage_convergence_result(target_app_dict: Dict[str, Li
         )
         data = add_statistical_data(data, target_data_type=int)
 
-        data = data.apply(lambda x: x.apply(lambda y: "%.2f" % (y/3600)) if x.dtype == int else x)
-        data.to_excel(excel_writer, sheet_name=f"{target}_{postfix}")
+        data = data.apply(lambda x: x.apply(lambda y: round(float(y)/3600, 2)) if x.dtype == int else x)
+        sheets[f"{target}_{postfix}"] = data
 
-    excel_writer.save()
+    StorageUtil.write_sheets(os.path.join(result_dir_path, "coverage_time_convergence_data.xlsx"), sheets, export_excel=True)
 
 
 class FaultConvergenceTime:
@@ -285,7 +287,7 @@ class FaultConvergenceTime:
 def present_fault_convergence_result(postfix: str, target_apps):
     result_dir_path = ExcelDirectoryPathGenerator.get_time_data_dir(DataType.Bug)
 
-    excel_writer = pd.ExcelWriter(os.path.join(result_dir_path, "fault_time_convergence_data.xlsx"))
+    sheets: Dict[str, pd.DataFrame] = {}
 
     for pattern, res_name in Experiments.TAG_PATTERN_DICT.items():
         if "combodroid" in pattern:
@@ -315,10 +317,10 @@ def present_fault_convergence_result(postfix: str, target_apps):
         #     res = pd.concat([res, current_res], axis=0)
 
 
-        res = res.apply(lambda x: x.apply(lambda y: "%.2f" % y) if x.dtype == float else x)
+        res = res.apply(lambda x: x.apply(lambda y: round(float(y), 2)) if x.dtype == float else x)
         # for column in res.columns:
         #     if column.endswith('n'):
         #         res[column] = res[column].astype(int)
-        res.to_excel(excel_writer, sheet_name=f"{pattern}_{postfix}")
+        sheets[f"{pattern}_{postfix}"] = res
 
-    excel_writer.save()
+    StorageUtil.write_sheets(os.path.join(result_dir_path, "fault_time_convergence_data.xlsx"), sheets, export_excel=True)
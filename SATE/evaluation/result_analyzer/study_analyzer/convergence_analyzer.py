@@ -8,7 +8,7 @@ from evaluation.result_analyzer.utils.data_util import DataType
 from runtime_collection.unified_testing_config import empirical_app_list_all
 
 
-if __name__ == '__main__':
+def run():
     # convergence_analysis.present_and_export_coverage_convergence_result(
     #     target_app_dict=Experiments.EXPERIMENTAL_APP_DICT,
     #     testing_time=10800,
@@ -24,3 +24,7 @@ if __name__ == '__main__':
 
     Experiments.get_correlation_between_times(DataType.Coverage)
     Experiments.get_correlation_between_times(DataType.Bug)
+
+
+if __name__ == '__main__':
+    run()
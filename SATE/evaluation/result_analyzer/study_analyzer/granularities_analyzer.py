@@ -6,6 +6,10 @@ from evaluation.result_analyzer.study_analyzer.study_util import Experiments
 from evaluation.result_analyzer.utils.data_util import DataType
 
 
-if __name__ == '__main__':
+def run():
     Experiments.process_all_significance_data(DataType.Coverage)
     Experiments.process_all_significance_data(DataType.Bug)
+
+
+if __name__ == '__main__':
+    run()
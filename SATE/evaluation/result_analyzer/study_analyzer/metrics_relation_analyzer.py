@@ -4,5 +4,10 @@
 # ----------------------
 from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
 
+
+def run():
+    Correlation.get_correlation_between_coverage_and_bug("3.0h", "3.0h")
+
+
 if __name__ == '__main__':
-    Correlation.get_correlation_between_coverage_and_bug("3.0h", "3.0h")
\ No newline at end of file
+    run()
@@ -6,6 +6,12 @@ from evaluation.result_analyzer.study_analyzer.study_util import Experiments
 from evaluation.result_analyzer.utils.data_util import DataType
 
 
-if __name__ == '__main__':
+def run():
     Experiments.get_all_cv_data(DataType.Coverage)
     Experiments.get_all_cv_data(DataType.Bug)
+    Experiments.get_all_resampled_cv_data(DataType.Coverage)
+    Experiments.get_all_resampled_cv_data(DataType.Bug)
+
+
+if __name__ == '__main__':
+    run()
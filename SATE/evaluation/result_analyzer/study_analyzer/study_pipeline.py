@@ -0,0 +1,302 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import os
+import traceback
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from android_testing_utils.log import my_logger, my_tracer
+from evaluation.result_analyzer.study_analyzer.study_util import Experiments
+from evaluation.result_analyzer.utils.data_util import DataType
+from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
+from evaluation.result_analyzer.utils.storage_util import StorageUtil
+from runtime_collection import unified_testing_config
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable
+    kwargs: Dict
+    inputs: List[str]
+    outputs: List[str]
+
+
+def run_tool_pair_job(raw_data_file_name: str, data_type: DataType, index_filter: Optional[List], result_path: str):
+    from evaluation.result_analyzer.analysis.significance_analysis import Significance
+    pd.to_pickle(Significance.process_one_tool_pair(raw_data_file_name, data_type, index_filter), result_path)
+
+
+def merge_tool_pair_jobs(file_name_to_write: str, data_type: DataType, postfix: Optional[str], pair_list: List[str], result_path_list: List[str]):
+    from evaluation.result_analyzer.analysis.significance_analysis import Significance
+    Significance.merge_tool_pair_results(file_name_to_write, data_type, postfix, pair_list, [pd.read_pickle(item) for item in result_path_list])
+
+
+def run_significance_raw(**kwargs):
+    from evaluation.result_analyzer.analysis.significance_analysis import Significance
+    Significance.original_data_to_raw_significance_data(**kwargs)
+
+
+def run_correlation_between_metrics(**kwargs):
+    from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
+    Correlation.get_correlation_between_metrics(**kwargs)
+
+
+def run_correlation_between_coverage_and_bug(**kwargs):
+    from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
+    Correlation.get_correlation_between_coverage_and_bug(**kwargs)
+
+
+def run_fault_convergence(**kwargs):
+    from evaluation.result_analyzer.study_analyzer import convergence_analysis
+    convergence_analysis.present_fault_convergence_result(**kwargs)
+
+
+class StudyPipeline:
+    """The study stages as a DAG of artifacts.
+
+    Every stage declares the files it reads and writes, so the dependencies between stages follow from the artifacts.
+    A stage runs once all its producers are done, concurrently with the other ready stages, and is skipped when the
+    content hashes of its inputs and outputs are those recorded in the manifest after its last run. Stages are split
+    per data type, postfix and tool pair where the analyses allow it, so a change only recomputes the artifacts whose
+    inputs really changed.
+    """
+    PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
+    MANIFEST_FILE_NAME = "manifest.json"
+    HASH_CHUNK_SIZE = 1 << 20
+
+    @staticmethod
+    def get_significance_stages(data_type: DataType, tools: List[str]) -> List[Stage]:
+        stages = []
+        pair_list = ['-'.join(item) for item in itertools.combinations(tools, 2)]
+        file_name_to_write = f"{data_type.value}_ALL_TOOL_PAIRS"
+        for postfix in Experiments.get_significance_postfix_list(data_type):
+            full_data_path = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data_{postfix}.xlsx")
+            raw_data_file_names = [f"{pair}_{postfix}.xlsx" for pair in pair_list]
+            raw_data_paths = [os.path.join(ExcelDirectoryPathGenerator.get_raw_statistic_data_dir(data_type), item) for item in raw_data_file_names]
+            stages.append(Stage(
+                f"significance-raw:{data_type.value}:{postfix}", run_significance_raw,
+                dict(original_data_path=full_data_path, tools=tools, data_type=data_type, postfix=postfix),
+                [full_data_path], raw_data_paths,
+            ))
+
+            result_paths = []
+            for pair, raw_data_file_name, raw_data_path in zip(pair_list, raw_data_file_names, raw_data_paths):
+                result_path = os.path.join(ExcelDirectoryPathGenerator.get_pipeline_data_dir(), f"{data_type.value}_{pair}_{postfix}.pkl")
+                result_paths.append(result_path)
+                stages.append(Stage(
+                    f"significance-pair:{data_type.value}:{postfix}:{pair}", run_tool_pair_job,
+                    dict(raw_data_file_name=raw_data_file_name, data_type=data_type, index_filter=None, result_path=result_path),
+                    [raw_data_path], [result_path],
+                ))
+
+            processed_file_name = f"{file_name_to_write}_{postfix}.xlsx"
+            processed_path = os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), processed_file_name)
+            stages.append(Stage(
+                f"significance-merge:{data_type.value}:{postfix}", merge_tool_pair_jobs,
+                dict(file_name_to_write=file_name_to_write, data_type=data_type, postfix=postfix, pair_list=pair_list, result_path_list=result_paths),
+                result_paths, [processed_path],
+            ))
+            stages.append(Stage(
+                f"correlation-metrics:{data_type.value}:{postfix}", run_correlation_between_metrics,
+                dict(file_name_to_read=processed_file_name, data_type=data_type),
+                [processed_path], [processed_path.replace(".xlsx", "_CORR.xlsx")],
+            ))
+
+        app_postfix = Experiments.APP_TARGETS[0][1]
+        stages.append(Stage(
+            f"correlation-time:{data_type.value}", Experiments.get_correlation_between_times,
+            dict(data_type=data_type),
+            [
+                os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), f"{file_name_to_write}_{item[2]}{app_postfix}_CORR.xlsx")
+                for item in Experiments.TIME_TARGETS
+            ],
+            [os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), f"{data_type.value}_time_CORR{app_postfix}.xlsx")],
+        ))
+        return stages
+
+    @staticmethod
+    def get_cv_stages(data_type: DataType) -> List[Stage]:
+        postfix = Experiments.CV_POSTFIX
+        full_data_path = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data_{postfix}.xlsx")
+        cv_dir = ExcelDirectoryPathGenerator.get_cv_data_dir()
+        return [
+            Stage(
+                f"cv:{data_type.value}", Experiments.get_all_cv_data, dict(data_type=data_type), [full_data_path],
+                [os.path.join(cv_dir, f"{data_type.value}_{postfix}-{slicing}.xlsx") for slicing in Experiments.CV_SLICING_LIST]
+                + [os.path.join(cv_dir, f"{data_type.value}_{postfix}-all.xlsx")],
+            ),
+            Stage(
+                f"cv-resampled:{data_type.value}", Experiments.get_all_resampled_cv_data, dict(data_type=data_type), [full_data_path],
+                [os.path.join(cv_dir, f"{data_type.value}_{postfix}-resampled.xlsx")],
+            ),
+        ]
+
+    @classmethod
+    def get_stages(cls) -> List[Stage]:
+        tools = list(Experiments.TAG_PATTERN_DICT.values())
+        stages = []
+        for data_type in [DataType.Coverage, DataType.Bug]:
+            stages.extend(cls.get_significance_stages(data_type, tools))
+            stages.extend(cls.get_cv_stages(data_type))
+
+        stages.append(Stage(
+            "correlation-coverage-bug", run_correlation_between_coverage_and_bug,
+            dict(coverage_postfix="3.0h", bug_postfix="3.0h"),
+            [
+                os.path.join(ExcelDirectoryPathGenerator.get_processed_statistic_data_dir(data_type), f"{data_type.value}_ALL_TOOL_PAIRS_3.0h_CORR.xlsx")
+                for data_type in [DataType.Coverage, DataType.Bug]
+            ],
+            [os.path.join(ExcelDirectoryPathGenerator.get_correlation_data_dir(), "Coverage_Bug_CORR.xlsx")],
+        ))
+        stages.append(Stage(
+            "fault-convergence", run_fault_convergence,
+            dict(postfix="3.0h", target_apps=unified_testing_config.empirical_app_list_all[:5]),
+            [
+                os.path.join(ExcelDirectoryPathGenerator.get_pickle_data_dir(DataType.Bug, "3.0h"), f"{pattern}.pkl")
+                for pattern in Experiments.TAG_PATTERN_DICT.keys()
+            ],
+            [os.path.join(ExcelDirectoryPathGenerator.get_time_data_dir(DataType.Bug), "fault_time_convergence_data.xlsx")],
+        ))
+        return stages
+
+    @classmethod
+    def get_content_hash(cls, artifact_path: str) -> Optional[str]:
+        """Hash of the working-format file of an artifact, the `.xlsx` exports are not read by later stages."""
+        target_path = StorageUtil.get_path(artifact_path)
+        if not os.path.exists(target_path):
+            target_path = artifact_path
+        if not os.path.exists(target_path):
+            return None
+        file_hash = hashlib.sha256()
+        with open(target_path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    @classmethod
+    def get_manifest_path(cls) -> str:
+        return os.path.join(ExcelDirectoryPathGenerator.get_pipeline_data_dir(), cls.MANIFEST_FILE_NAME)
+
+    @classmethod
+    def __load_manifest(cls) -> Dict[str, Dict[str, Dict[str, Optional[str]]]]:
+        if not os.path.exists(cls.get_manifest_path()):
+            return {}
+        with open(cls.get_manifest_path()) as f:
+            return json.load(f)
+
+    @classmethod
+    def __save_manifest(cls, manifest):
+        temp_path = f"{cls.get_manifest_path()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(temp_path, cls.get_manifest_path())
+
+    @staticmethod
+    def select_stages(stages: List[Stage], targets: Optional[List[str]]) -> List[Stage]:
+        """The stages whose name starts with one of `targets`, and the stages producing their inputs."""
+        if targets is None:
+            return stages
+        producers = {output: stage for stage in stages for output in stage.outputs}
+        selected: Set[str] = set()
+        todo = [stage for stage in stages if any([stage.name.startswith(target) for target in targets])]
+        while len(todo) > 0:
+            stage = todo.pop()
+            if stage.name in selected:
+                continue
+            selected.add(stage.name)
+            todo.extend([producers[item] for item in stage.inputs if item in producers])
+        return [stage for stage in stages if stage.name in selected]
+
+    @staticmethod
+    def run_stage(stage: Stage):
+        with my_tracer.span(f"StudyPipeline.{stage.name}"):
+            stage.func(**stage.kwargs)
+
+    @classmethod
+    def run(cls, targets: Optional[List[str]] = None, force: bool = False) -> Dict[str, str]:
+        """Run the stages (all, or those needed by `targets`), returns the state of each stage.
+
+        The states are `run`, `skipped` (up to date), `failed`, `missing input` (an input neither exists nor is
+        produced by another stage) and `blocked` (a producer did not succeed).
+        """
+        stages = cls.select_stages(cls.get_stages(), targets)
+        producers = {output: stage.name for stage in stages for output in stage.outputs}
+        dependencies = {stage.name: {producers[item] for item in stage.inputs if item in producers} for stage in stages}
+        manifest = cls.__load_manifest()
+        # create the result directories before workers race to create them
+        for data_type in DataType:
+            for get_dir in [
+                ExcelDirectoryPathGenerator.get_original_data_dir, ExcelDirectoryPathGenerator.get_raw_statistic_data_dir,
+                ExcelDirectoryPathGenerator.get_processed_statistic_data_dir, ExcelDirectoryPathGenerator.get_time_data_dir,
+            ]:
+                get_dir(data_type)
+        ExcelDirectoryPathGenerator.get_correlation_data_dir()
+        ExcelDirectoryPathGenerator.get_cv_data_dir()
+
+        states: Dict[str, str] = {}
+        pending = {stage.name: stage for stage in stages}
+        running: Dict[concurrent.futures.Future, Tuple[Stage, Dict[str, Optional[str]]]] = {}
+        executor = concurrent.futures.ProcessPoolExecutor(cls.PROCESS_COUNT) if cls.PROCESS_COUNT > 1 else None
+
+        def finish(stage: Stage, input_hashes: Dict[str, Optional[str]], error: Optional[str]):
+            if error is not None:
+                states[stage.name] = "failed"
+                my_logger.hint(my_logger.LogLevel.ERROR, cls.__name__, True, f"Stage [{stage.name}] failed:\n{error}")
+                return
+            states[stage.name] = "run"
+            manifest[stage.name] = {"inputs": input_hashes, "outputs": {item: cls.get_content_hash(item) for item in stage.outputs}}
+            cls.__save_manifest(manifest)
+            my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Stage [{stage.name}] done")
+
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                ready = [stage for stage in pending.values() if all([item in states for item in dependencies[stage.name]])]
+                for stage in ready:
+                    del pending[stage.name]
+                    if any([states[item] not in ("run", "skipped") for item in dependencies[stage.name]]):
+                        states[stage.name] = "blocked"
+                        continue
+                    input_hashes = {item: cls.get_content_hash(item) for item in stage.inputs}
+                    if any([value is None for value in input_hashes.values()]):
+                        states[stage.name] = "missing input"
+                        my_logger.hint(my_logger.LogLevel.WARNING, cls.__name__, True, f"Stage [{stage.name}] has missing inputs")
+                        continue
+                    record = manifest.get(stage.name)
+                    if (not force) and (record is not None) and record["inputs"] == input_hashes \
+                            and all([cls.get_content_hash(item) == record["outputs"].get(item) for item in stage.outputs]):
+                        states[stage.name] = "skipped"
+                        continue
+                    if executor is None:
+                        try:
+                            cls.run_stage(stage)
+                            finish(stage, input_hashes, None)
+                        except Exception:
+                            finish(stage, input_hashes, traceback.format_exc())
+                    else:
+                        running[executor.submit(cls.run_stage, stage)] = (stage, input_hashes)
+
+                if len(running) > 0:
+                    done, _ = concurrent.futures.wait(list(running.keys()), return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        stage, input_hashes = running.pop(future)
+                        e = future.exception()
+                        error = None if e is None else "".join(traceback.format_exception(type(e), e, e.__traceback__))
+                        finish(stage, input_hashes, error)
+                elif len(ready) == 0 and len(pending) > 0:
+                    raise RuntimeError(f"Cyclic stage dependencies among {list(pending.keys())}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        counts = {}
+        for state in states.values():
+            counts[state] = counts.get(state, 0) + 1
+        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Pipeline finished: {counts}")
+        return states
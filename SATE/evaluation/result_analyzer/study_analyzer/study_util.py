@@ -5,15 +5,13 @@
 import os
 from typing import Optional, List
 
-from android_testing_utils.log import my_logger
-from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
-from evaluation.result_analyzer.analysis.significance_analysis import Significance
-from evaluation.result_analyzer.analysis.variation_analysis import Variation
+from android_testing_utils.log import my_logger, my_tracer
 from evaluation.result_analyzer.utils.data_util import DataType
 from evaluation.result_analyzer.utils.path_util import ExcelDirectoryPathGenerator
 from runtime_collection import unified_testing_config
 
 
+# The analysis modules are imported by the methods which use them, so that each study stage only loads its own stack.
 class Experiments:
     APP_TARGETS = [
         (unified_testing_config.empirical_app_list_all, ""),
@@ -60,33 +58,55 @@ class Experiments:
         "empirical-08162-qt~": unified_testing_config.empirical_app_list_all,
         "empirical-08162-dqt~": unified_testing_config.empirical_app_list_all,
     }
+    CV_POSTFIX = "3.0h"
+    CV_SLICING_LIST = list(range(3, 11))
 
     @classmethod
-    def process_all_significance_data(cls, data_type: DataType):
+    def get_significance_postfix_list(cls, data_type: DataType) -> List[str]:
+        postfix_list = []
         for time_targets, app_targets in cls.EXPERIMENTAL_TARGETS[data_type]:
             for app_list, app_postfix in app_targets:
                 for target_time, total_test_time, time_postfix in time_targets:
-                    postfix = f"{time_postfix}{app_postfix}"
-                    my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Processing {data_type.value} data with postfix [{postfix}]...")
-                    FullProcess.full_process_from_original_data_to_final_statistics_data(
-                        data_type=data_type,
-                        compare_tools=list(cls.TAG_PATTERN_DICT.values()),
-                        postfix=postfix,
-                    )
+                    postfix_list.append(f"{time_postfix}{app_postfix}")
+        return postfix_list
+
+    @classmethod
+    def process_all_significance_data(cls, data_type: DataType):
+        postfix_list = cls.get_significance_postfix_list(data_type)
+        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Processing {data_type.value} data with postfixes {postfix_list}...")
+        FullProcess.full_process_from_original_data_to_final_statistics_data_for_postfixes(
+            data_type=data_type,
+            compare_tools=list(cls.TAG_PATTERN_DICT.values()),
+            postfix_list=postfix_list,
+        )
 
     @classmethod
     def get_all_cv_data(cls, data_type: DataType):
-        postfix = "3.0h"
+        postfix = cls.CV_POSTFIX
         my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Processing {data_type.value} data with postfix [{postfix}]...")
         FullProcess.full_process_from_original_data_to_cv_data(
             data_type=data_type,
             compare_tools=list(cls.TAG_PATTERN_DICT.values()),
-            slicing_list=list(range(3, 11)),
+            slicing_list=cls.CV_SLICING_LIST,
             raw_postfix=postfix,
         )
 
+    @classmethod
+    def get_all_resampled_cv_data(cls, data_type: DataType):
+        from evaluation.result_analyzer.analysis.resampling_analysis import Resampling
+        postfix = cls.CV_POSTFIX
+        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Resampling {data_type.value} data with postfix [{postfix}]...")
+        Resampling.original_data_to_resampled_cv_data(
+            original_data_path=os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data_{postfix}.xlsx"),
+            tools=list(cls.TAG_PATTERN_DICT.values()),
+            data_type=data_type,
+            k_list=cls.CV_SLICING_LIST,
+            postfix=postfix,
+        )
+
     @classmethod
     def get_correlation_between_times(cls, data_type: DataType):
+        from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
         my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating correlation between times...")
         app_postfix = cls.APP_TARGETS[0][1]
         time_postfix_list = [item[2] for item in cls.TIME_TARGETS]
@@ -102,26 +122,42 @@ class FullProcess:
         compare_tools,
         postfix=None,
     ):
-        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating statistics data from raw data with {postfix}!")
+        cls.full_process_from_original_data_to_final_statistics_data_for_postfixes(data_type, compare_tools, [postfix])
+
+    @classmethod
+    def full_process_from_original_data_to_final_statistics_data_for_postfixes(
+        cls,
+        data_type: DataType,
+        compare_tools,
+        postfix_list: List[Optional[str]],
+    ):
+        from evaluation.result_analyzer.analysis.correlation_analysis import Correlation
+        from evaluation.result_analyzer.analysis.significance_analysis import Significance
+        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating statistics data from raw data with {postfix_list}!")
 
         my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, "Step 1: calculating raw statistics data ...")
-        Significance.original_data_to_raw_significance_data(
-            original_data_path=os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data{'' if postfix is None else '_' + postfix}.xlsx"),
-            tools=compare_tools,
-            data_type=data_type,
-            postfix=postfix,
-        )
+        with my_tracer.span("FullProcess.raw_statistics_data", data_type=data_type.value, postfix_count=len(postfix_list)):
+            for postfix in postfix_list:
+                Significance.original_data_to_raw_significance_data(
+                    original_data_path=os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data{'' if postfix is None else '_' + postfix}.xlsx"),
+                    tools=compare_tools,
+                    data_type=data_type,
+                    postfix=postfix,
+                )
 
-        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, "Step 2: processing statistics data ...")
-        Significance.full_significance_process_for_spssau_raw_data_all_tool_pairs(
-            file_name_to_write=f"{data_type.value}_ALL_TOOL_PAIRS",
-            tools=compare_tools,
-            data_type=data_type,
-            postfix=postfix,
-        )
+        my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, "Step 2: processing statistics data of all (tool pair, postfix) jobs ...")
+        with my_tracer.span("FullProcess.all_tool_pairs", data_type=data_type.value, postfix_count=len(postfix_list)):
+            Significance.full_significance_process_for_all_tool_pairs_and_postfixes(
+                file_name_to_write=f"{data_type.value}_ALL_TOOL_PAIRS",
+                tools=compare_tools,
+                data_type=data_type,
+                postfix_list=postfix_list,
+            )
 
         my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, "Step 3: calculating correlation between matrices ...")
-        Correlation.get_correlation_between_metrics(f"{data_type.value}_ALL_TOOL_PAIRS{'' if postfix is None else '_' + postfix}.xlsx", data_type)
+        with my_tracer.span("FullProcess.metrics_correlation", data_type=data_type.value, postfix_count=len(postfix_list)):
+            for postfix in postfix_list:
+                Correlation.get_correlation_between_metrics(f"{data_type.value}_ALL_TOOL_PAIRS{'' if postfix is None else '_' + postfix}.xlsx", data_type)
 
     @classmethod
     def full_process_from_original_data_to_cv_data(
@@ -131,29 +167,33 @@ class FullProcess:
             slicing_list: Optional[List[int]] = None,
             raw_postfix=None,
     ):
+        from evaluation.result_analyzer.analysis.variation_analysis import Variation
         raw_data_file_path = os.path.join(ExcelDirectoryPathGenerator.get_original_data_dir(data_type), f"{data_type.value}_full_data{'' if raw_postfix is None else '_' + raw_postfix}.xlsx")
         if slicing_list is not None:
-            for slicing in slicing_list:
-                new_postfix = f"{''if raw_postfix is None else raw_postfix + '-'}{slicing}"
-                my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating CV data from raw data with {raw_postfix} to {new_postfix}!")
-                Variation.original_data_to_cv_data(
+            postfix_list = [f"{''if raw_postfix is None else raw_postfix + '-'}{slicing}" for slicing in slicing_list]
+            my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating CV data from raw data with {raw_postfix} to {postfix_list}!")
+            with my_tracer.span("FullProcess.cv_data_of_slicings", data_type=data_type.value, slicing_count=len(slicing_list)):
+                cv_data = Variation.original_data_to_cv_data_of_slicings(
                     original_data_path=raw_data_file_path,
                     tools=compare_tools,
                     data_type=data_type,
-                    slicing=slicing,
-                    postfix=new_postfix,
+                    slicing_list=slicing_list,
+                    postfix_list=postfix_list,
                 )
 
             my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, "Start combining CV data ...")
-            Variation.combine_cv_avg_data(
-                file_prefix=f"{data_type.value}_{''if raw_postfix is None else raw_postfix + '-'}",
-                slicing_list=slicing_list,
-            )
+            with my_tracer.span("FullProcess.combine_cv_avg_data", data_type=data_type.value, slicing_count=len(slicing_list)):
+                Variation.combine_cv_avg_data(
+                    file_prefix=f"{data_type.value}_{''if raw_postfix is None else raw_postfix + '-'}",
+                    slicing_list=slicing_list,
+                    cv_data=cv_data,
+                )
         else:
             my_logger.hint(my_logger.LogLevel.INFO, cls.__name__, True, f"Start calculating CV data from raw data with {raw_postfix}!")
-            Variation.original_data_to_cv_data(
-                original_data_path=raw_data_file_path,
-                tools=compare_tools,
-                data_type=data_type,
-                postfix=raw_postfix,
-            )
+            with my_tracer.span("FullProcess.cv_data", data_type=data_type.value):
+                Variation.original_data_to_cv_data(
+                    original_data_path=raw_data_file_path,
+                    tools=compare_tools,
+                    data_type=data_type,
+                    postfix=raw_postfix,
+                )
@@ -2,15 +2,22 @@
 # @Time  : 2022 May
 # @Author: Yuanhong Lan
 # ----------------------
+import multiprocessing
 import os.path
 import re
 import traceback
 import pandas as pd
 
+from functools import lru_cache
 from typing import List, Union, Optional, Tuple, Dict
 from enum import Enum
 
 from constant.platform_constant import PlatformConstant
+from evaluation.data_manager.result_manifest import ResultManifest
+from evaluation.result_analyzer.utils.compression_util import CompressionUtil
+
+
+PROCESS_COUNT = max((os.cpu_count() or 1) - 4, 1)
 
 
 class AnalyzeType(Enum):
@@ -54,20 +61,152 @@ class AnalyzePattern:
             return round(sum(match_res) / len(match_res), 2)
 
 
-def analyze_one_file(file_path, pattern_list) -> List[str]:
-    f = open(file_path, 'r')
-    s = f.read()
-    res = []
-
-    for analyze_type, pattern in pattern_list:
+class MultiPatternAnalyzer:
+    """All the patterns of a pattern list compiled once and matched line by line in a single pass over a log file.
+
+    A pattern matches within a line, except that each line break (`\\n`) in it lets a match go on to the next line.
+    Lines are read in batches of whole lines, each scanned by every pattern at once, and the last lines of a batch are
+    carried over to the next one for the multi-line patterns.
+    """
+    BATCH_SIZE = 1 << 20
+
+    def __init__(self, pattern_list: List[Tuple[AnalyzeType, str]]):
+        self.pattern_list = pattern_list
+        self.compiled_list = []
+        self.keyword_indices = []
+        self.line_indices = []
+        self.multi_line_indices = []
+        self.carried_line_count = 0
+        for i, (analyze_type, pattern) in enumerate(pattern_list):
+            source = re.escape(pattern) if analyze_type == AnalyzeType.KEYWORD else pattern
+            self.compiled_list.append(re.compile(source))
+            line_break_count = source.count("\\n") + source.count("\n")
+            if line_break_count > 0:
+                self.multi_line_indices.append(i)
+                self.carried_line_count = max(self.carried_line_count, line_break_count)
+            elif analyze_type == AnalyzeType.KEYWORD:
+                self.keyword_indices.append(i)
+            else:
+                self.line_indices.append(i)
+
+    def __evaluate(self, index, items: List, file_path: str):
+        analyze_type, pattern = self.pattern_list[index]
+        if analyze_type == AnalyzeType.KEYWORD:
+            return len(items)
+        if analyze_type == AnalyzeType.PATTERN_ONE:
+            if len(items) > 1:
+                print(f"Exception happened at {file_path}, with {analyze_type} {pattern}: result should not more than one!")
+                return '_'
+            return None if len(items) == 0 else items[0]
         try:
-            res.append(AnalyzePattern.analyze_one(analyze_type, pattern, s))
+            match_res = [float(item) for item in items]
         except Exception:
-            print(traceback.print_exc())
+            print(traceback.format_exc())
             print(f"Exception happened at {file_path}, with {analyze_type} {pattern}")
-            res.append('_')
-            continue
-    return res
+            return '_'
+        return 0 if len(match_res) == 0 else round(sum(match_res) / len(match_res), 2)
+
+    def analyze_file(self, file_path: str) -> List:
+        items: List[List] = [[] for _ in self.pattern_list]
+        keyword_counts = [0 for _ in self.pattern_list]
+        # the last lines of the previous batch and their offset, and where the last match of each pattern ends
+        carried_lines: List[str] = []
+        carried_offset = 0
+        last_ends = [0 for _ in self.pattern_list]
+
+        with CompressionUtil.open_text(file_path) as f:
+            while True:
+                lines = f.readlines(MultiPatternAnalyzer.BATCH_SIZE)
+                text = "".join(lines)
+                for index in self.keyword_indices:
+                    keyword_counts[index] += text.count(self.pattern_list[index][1])
+                for index in self.line_indices:
+                    items[index].extend(self.compiled_list[index].findall(text))
+
+                if len(self.multi_line_indices) > 0:
+                    # a match starting in the last lines may go on in the next batch, so they are scanned with it
+                    scan_lines = carried_lines + lines
+                    carried_lines = scan_lines[-self.carried_line_count:] if len(lines) > 0 else []
+                    scan_text = "".join(scan_lines)
+                    boundary = len(scan_text) - sum([len(line) for line in carried_lines])
+                    for index in self.multi_line_indices:
+                        start = max(last_ends[index] - carried_offset, 0)
+                        for match in self.compiled_list[index].finditer(scan_text, start):
+                            if match.start() >= boundary:
+                                break
+                            last_ends[index] = carried_offset + match.end()
+                            groups = match.groups()
+                            items[index].append(
+                                match.group(0) if len(groups) == 0 else (groups[0] if len(groups) == 1 else groups))
+                    carried_offset += boundary
+
+                if len(lines) == 0:
+                    break
+
+        res = [self.__evaluate(i, items[i], file_path) for i in range(len(self.pattern_list))]
+        for index in self.keyword_indices:
+            res[index] = keyword_counts[index]
+        return res
+
+
+@lru_cache(maxsize=None)
+def get_multi_pattern_analyzer(pattern_tuple: Tuple[Tuple[AnalyzeType, str], ...]) -> MultiPatternAnalyzer:
+    return MultiPatternAnalyzer(list(pattern_tuple))
+
+
+def analyze_one_file(file_path, pattern_list) -> List[str]:
+    return get_multi_pattern_analyzer(tuple(pattern_list)).analyze_file(file_path)
+
+
+def analyze_files(file_path_list: List[str], pattern_list: List[Tuple[AnalyzeType, str]]) -> List[List[str]]:
+    param = [(file_path, pattern_list) for file_path in file_path_list]
+    if PROCESS_COUNT > 1 and len(param) > 1:
+        with multiprocessing.Pool(min(PROCESS_COUNT, len(param))) as pool:
+            return pool.starmap(analyze_one_file, param)
+    return [analyze_one_file(*item) for item in param]
+
+
+def find_tool_log_file(apk_name: str, tag: str) -> Optional[str]:
+    dir_path = os.path.join(PlatformConstant.TOOL_LOG_ROOT_DIR, tag)
+    for file in CompressionUtil.list_result_files(dir_path):
+        if (file.startswith(apk_name)) and ('_log' in file):
+            return os.path.join(dir_path, file)
+    return None
+
+
+def analyze_apps(
+        apk_name_list: List[str],
+        tag_list: List[str],
+        pattern_list: List[Tuple[AnalyzeType, str]],
+) -> Dict[str, Dict[str, List[str]]]:
+    """The results of each (app, tag) log file, with the files of all apps analyzed in parallel."""
+    tag_list = sorted(tag_list)
+    keys = []
+    file_path_list = []
+    for apk_name in apk_name_list:
+        for tag in tag_list:
+            file_path = find_tool_log_file(apk_name, tag)
+            if file_path is not None:
+                keys.append((apk_name, tag))
+                file_path_list.append(file_path)
+
+    # files not matching the active result manifest are left out, like missing ones
+    intact_file_paths = set(ResultManifest.filter_intact_files(file_path_list))
+    keys = [key for key, file_path in zip(keys, file_path_list) if file_path in intact_file_paths]
+    file_path_list = [file_path for file_path in file_path_list if file_path in intact_file_paths]
+
+    raw_data = {apk_name: {} for apk_name in apk_name_list}
+    for (apk_name, tag), value in zip(keys, analyze_files(file_path_list, pattern_list)):
+        raw_data[apk_name][tag] = value
+    return raw_data
+
+
+def print_app_result(raw_data: Dict[str, List[str]], pattern_list: List[Tuple[AnalyzeType, str]]):
+    df = pd.DataFrame(
+        data=raw_data,
+        index=[item[1] for item in pattern_list],
+    )
+    print(df)
 
 
 def analyze_one_app(
@@ -76,30 +215,13 @@ def analyze_one_app(
         pattern_list: List[Tuple[AnalyzeType, str]],
         print_result=False
 ) -> Dict[str, List[str]]:
-    tag_list = sorted(tag_list)
     if apk_name is None:
         apk_name = input("Enter prefix: ")
 
-    raw_data = {}
-
-    for tag in tag_list:
-        dir_path = os.path.join(PlatformConstant.TOOL_LOG_ROOT_DIR, tag)
-        file_name = None
-        for file in os.listdir(dir_path):
-            if (file.startswith(apk_name)) and ('_log' in file):
-                file_name = file
-                break
-        if file_name is None:
-            continue
-        file_path = os.path.join(dir_path, file_name)
-        raw_data[tag] = analyze_one_file(file_path, pattern_list)
+    raw_data = analyze_apps([apk_name], tag_list, pattern_list)[apk_name]
 
     if print_result:
-        df = pd.DataFrame(
-            data=raw_data,
-            index=[item[1] for item in pattern_list],
-        )
-        print(df)
+        print_app_result(raw_data, pattern_list)
 
     return raw_data
 
@@ -111,16 +233,15 @@ def analyze_all_apps(tag_list: List[str], only_coverage=False):
 
     if only_coverage:
         df = pd.DataFrame()
-        for app in app_list:
-            temp: Dict[str, List[str]] = analyze_one_app(app, tag_list, COVERAGE_ANALYZE_PATTERN, print_result=False)
+        for app, temp in analyze_apps(app_list, tag_list, COVERAGE_ANALYZE_PATTERN).items():
             for tag, value in temp.items():
                 df.loc[app, tag] = "%.2f" % (float(value[0]) * 100) if not pd.isna(value[0]) else value[0]
         print(df)
         df.to_excel("coverage.xlsx")
     else:
-        for app in app_list:
+        for app, temp in analyze_apps(app_list, tag_list, ANALYZE_LIST).items():
             print(f"---------- {app} ----------")
-            analyze_one_app(app, tag_list, ANALYZE_LIST, print_result=True)
+            print_app_result(temp, ANALYZE_LIST)
             print()
             print()
 
@@ -0,0 +1,111 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+import gzip
+import io
+import lzma
+import os
+import shutil
+from typing import IO, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+
+
+class CompressionUtil:
+    """Read result files stored as `<name>.gz`, `<name>.xz` or `<name>.zst` like the plain `<name>`, streaming."""
+    SUFFIXES = (".gz", ".xz", ".zst")
+    # the compressed file while it is written, see `compress_file`
+    TEMP_SUFFIX = ".part"
+
+    @staticmethod
+    def get_suffix(file_path: str) -> Optional[str]:
+        for suffix in CompressionUtil.SUFFIXES:
+            if file_path.endswith(suffix):
+                return suffix
+        return None
+
+    @staticmethod
+    def strip_suffix(file_path: str) -> str:
+        """The name of the plain file, e.g. `..._bug.txt` for `..._bug.txt.gz`."""
+        suffix = CompressionUtil.get_suffix(file_path)
+        return file_path if suffix is None else file_path[:-len(suffix)]
+
+    @staticmethod
+    def list_result_files(dir_path: str) -> List[str]:
+        """The names of the files in `dir_path`, one per result file.
+
+        The temp files of unfinished compressions are skipped. A file found both plain and compressed, as left by a
+        concurrent or interrupted compaction, is listed once by its compressed name, as that one is complete.
+        """
+        res = {}
+        for item in sorted(ResultRoot.listdir(dir_path)):
+            if item.endswith(CompressionUtil.TEMP_SUFFIX):
+                continue
+            plain_name = CompressionUtil.strip_suffix(item)
+            if plain_name not in res or CompressionUtil.get_suffix(item) is not None:
+                res[plain_name] = item
+        return list(res.values())
+
+    @staticmethod
+    def __check_zstandard():
+        if zstandard is None:
+            raise ImportError("Reading or writing .zst files needs the zstandard package, try `pip install zstandard`.")
+
+    @staticmethod
+    def open_text(file_path: str, errors: Optional[str] = None) -> IO[str]:
+        file_path = ResultRoot.resolve(file_path)
+        suffix = CompressionUtil.get_suffix(file_path)
+        if ResultRoot.is_archive_path(file_path):
+            return CompressionUtil.__open_archive_member_text(file_path, suffix, errors)
+        if suffix is None:
+            return open(file_path, 'r', errors=errors)
+        if suffix == ".gz":
+            return gzip.open(file_path, 'rt', errors=errors)
+        if suffix == ".xz":
+            return lzma.open(file_path, 'rt', errors=errors)
+        CompressionUtil.__check_zstandard()
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True), errors=errors)
+
+    @staticmethod
+    def __open_archive_member_text(file_path: str, suffix: Optional[str], errors: Optional[str]) -> IO[str]:
+        stream = ResultRoot.open_binary(file_path)
+        if suffix == ".gz":
+            stream = gzip.GzipFile(fileobj=stream)
+        elif suffix == ".xz":
+            stream = lzma.LZMAFile(stream)
+        elif suffix == ".zst":
+            CompressionUtil.__check_zstandard()
+            stream = zstandard.ZstdDecompressor().stream_reader(stream, closefd=True)
+        return io.TextIOWrapper(stream, errors=errors)
+
+    @staticmethod
+    def read_text(file_path: str, errors: Optional[str] = None) -> str:
+        with CompressionUtil.open_text(file_path, errors) as f:
+            return f.read()
+
+    @staticmethod
+    def compress_file(file_path: str, suffix: str = ".gz", level: Optional[int] = None) -> str:
+        """Compress a plain file next to it, replacing it only once the compressed file is complete."""
+        assert suffix in CompressionUtil.SUFFIXES, f"Unknown compression {suffix}!"
+        target_path = file_path + suffix
+        temp_path = target_path + CompressionUtil.TEMP_SUFFIX
+        with open(file_path, 'rb') as source:
+            if suffix == ".gz":
+                target = gzip.open(temp_path, 'wb', compresslevel=6 if level is None else level)
+            elif suffix == ".xz":
+                target = lzma.open(temp_path, 'wb', preset=level)
+            else:
+                CompressionUtil.__check_zstandard()
+                target = zstandard.ZstdCompressor(level=3 if level is None else level).stream_writer(open(temp_path, 'wb'), closefd=True)
+            with target:
+                shutil.copyfileobj(source, target, 1 << 20)
+        shutil.copystat(file_path, temp_path)
+        os.replace(temp_path, target_path)
+        os.remove(file_path)
+        return target_path
@@ -3,13 +3,11 @@
 # @Author: Yuanhong Lan
 # ----------------------
 from enum import Enum
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List
 
 import numpy as np
-import scipy.stats
 from numpy import ndarray
 from pandas import DataFrame
-from scipy import stats
 
 
 class DataType(Enum):
@@ -32,7 +30,8 @@ class StatisticDataUtil:
 
     @staticmethod
     def get_t_test_res(data1: ndarray, data2: ndarray) -> Tuple[str, str]:
-        res: scipy.stats.stats.Ttest_indResult = stats.ttest_ind(data1, data2)
+        from scipy import stats
+        res = stats.ttest_ind(data1, data2)
         t_statistic = res.statistic
         p_value = res.pvalue
         if np.isinf(t_statistic):
@@ -40,6 +39,53 @@ class StatisticDataUtil:
             p_value = np.nan
         return str(round(t_statistic, 3)), str(round(p_value, 3))
 
+    @staticmethod
+    def get_batched_t_test_res(
+            full_data: DataFrame,
+            pairs: List[Tuple[str, str]],
+    ) -> DataFrame:
+        """Means, stds, t statistics and p-values of every (tool pair, column) of `full_data` in a numeric table.
+
+        Tools with the same number of runs are stacked into (tool × run × column) arrays, so each group of pairs takes a
+        single `ttest_ind` call. As in `get_t_test_res`, an infinite t statistic gives NaN for both t and p.
+        """
+        from scipy import stats
+        tools = list(dict.fromkeys([tool for pair in pairs for tool in pair]))
+        tool_arrays = {tool: full_data.loc[tool, :].to_numpy() for tool in tools}
+        tool_means = {tool: array.mean(axis=0) for tool, array in tool_arrays.items()}
+        tool_stds = {tool: array.std(axis=0, ddof=1) for tool, array in tool_arrays.items()}
+
+        pair_groups: Dict[Tuple[int, int], List[Tuple[str, str]]] = {}
+        for tool1, tool2 in pairs:
+            pair_groups.setdefault((len(tool_arrays[tool1]), len(tool_arrays[tool2])), []).append((tool1, tool2))
+
+        t_res: Dict[Tuple[str, str], Tuple[ndarray, ndarray]] = {}
+        for group in pair_groups.values():
+            stacked1 = np.stack([tool_arrays[tool1] for tool1, _ in group])
+            stacked2 = np.stack([tool_arrays[tool2] for _, tool2 in group])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                res = stats.ttest_ind(stacked1, stacked2, axis=1)
+            t_statistic = np.array(res.statistic, dtype=float).reshape(len(group), -1)
+            p_value = np.array(res.pvalue, dtype=float).reshape(len(group), -1)
+            is_inf = np.isinf(t_statistic)
+            t_statistic[is_inf] = np.nan
+            p_value[is_inf] = np.nan
+            for i, pair in enumerate(group):
+                t_res[pair] = (t_statistic[i], p_value[i])
+
+        column_count = len(full_data.columns)
+        return DataFrame({
+            "tool1": np.repeat([tool1 for tool1, _ in pairs], column_count),
+            "tool2": np.repeat([tool2 for _, tool2 in pairs], column_count),
+            "column": np.tile(full_data.columns.to_numpy(), len(pairs)),
+            "mean1": np.concatenate([tool_means[tool1] for tool1, _ in pairs]),
+            "std1": np.concatenate([tool_stds[tool1] for tool1, _ in pairs]),
+            "mean2": np.concatenate([tool_means[tool2] for _, tool2 in pairs]),
+            "std2": np.concatenate([tool_stds[tool2] for _, tool2 in pairs]),
+            "t": np.concatenate([t_res[pair][0] for pair in pairs]),
+            "p": np.concatenate([t_res[pair][1] for pair in pairs]),
+        })
+
     @staticmethod
     def full_data_to_tool_ndarrays(full_data: DataFrame, tool_name: str, slicing: Optional[int] = None) -> Dict[str, ndarray]:
         res = {}
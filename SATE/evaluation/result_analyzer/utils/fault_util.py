@@ -13,10 +13,13 @@ from typing import List, Tuple, Optional, Dict, Iterable, Set, NamedTuple
 
 import pandas as pd
 
-from android_testing_utils.log import my_logger
+from android_testing_utils.log import my_logger, my_tracer
 from constant import PlatformConstant
+from evaluation.data_manager.result_manifest import ResultManifest
+from evaluation.result_analyzer.utils.compression_util import CompressionUtil
 from evaluation.result_analyzer.utils.path_util import PathUtil
-from evaluation.result_analyzer.utils.pattern_util import PatternUtil
+from evaluation.result_analyzer.utils.result_root import ResultRoot
+from evaluation.result_analyzer.utils.pattern_util import TagMatcher
 
 
 class AbstractItem(NamedTuple):
@@ -135,6 +138,8 @@ class LogcatUtil:
 
 
 class FaultResUtil:
+    RANDOM_SEED = 0
+
     @staticmethod
     def remove_duplicate_bugs(bug_abstract_dict: Dict[str, List]):
         raw_keys = list(bug_abstract_dict.keys())
@@ -161,12 +166,14 @@ class FaultResUtil:
         return res_group
 
     @classmethod
-    def get_combine_faults(cls, raw_group: List[Tuple[str, Set]], k: int) -> List[Tuple[str, Set]]:
+    def get_combine_faults(cls, raw_group: List[Tuple[str, Set]], k: int, seed: Optional[int] = None) -> List[Tuple[str, Set]]:
         n = len(raw_group)
+        # seeded by the group, so that the same tags always combine the same way
+        rng = random.Random(f"{cls.RANDOM_SEED if seed is None else seed}|{k}|{'|'.join(item[0] for item in raw_group)}")
         res_group = []
         for i in range(n):
             current_i_res: Set = set()
-            for j in random.choices(range(n), k=k):
+            for j in rng.choices(range(n), k=k):
                 current_i_res = current_i_res.union(raw_group[j][1])
             res_group.append((raw_group[i][0], current_i_res))
         return res_group
@@ -191,27 +198,28 @@ class BugAnalyzer:
                        f"########## Bug Analyze For App [{app_str}], Pattern [{pattern}] ##########")
 
         if tag_list is None:
-            tag_list = list(sorted(os.listdir(PlatformConstant.LOGCAT_BUG_ROOT_DIR)))
+            tag_list = list(sorted(ResultRoot.listdir(PlatformConstant.LOGCAT_BUG_ROOT_DIR)))
 
         if pattern is not None:
-            tag_list = [item for item in tag_list if PatternUtil.is_match(pattern, item)]
+            tag_list = [item for item, matched in zip(tag_list, TagMatcher([pattern]).classify(tag_list)) if not pd.isna(matched)]
 
         target_files = []
         for tag in tag_list:
             dir_path = os.path.join(PlatformConstant.LOGCAT_BUG_ROOT_DIR, tag)
-            temp_file_list = [item for item in os.listdir(dir_path) if "bug" in item]
+            temp_file_list = [item for item in CompressionUtil.list_result_files(dir_path) if "bug" in item]
             if app_str is not None:
                 temp_file_list = [item for item in temp_file_list if item.startswith(app_str)]
             for file in temp_file_list:
                 target_files.append(os.path.join(dir_path, file))
-        target_files = sorted(target_files)
+        target_files = ResultManifest.filter_intact_files(sorted(target_files))
 
         all_file_data = {}
 
         param = [(file_path, target_time) for file_path in target_files]
-        with multiprocessing.Pool(os.cpu_count()-4) as pool:
-            my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start analyzing bug data with multiprocessing...")
-            res = pool.starmap(BugUtil.bug_file_to_abstract_dict, param)
+        with my_tracer.span("BugAnalyzer.parse_files", app=app_str, pattern=pattern, file_count=len(target_files)):
+            with multiprocessing.Pool(max((os.cpu_count() or 1) - 4, 1)) as pool:
+                my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start analyzing bug data with multiprocessing...")
+                res = pool.starmap(BugUtil.bug_file_to_abstract_dict, param)
         for i in range(len(target_files)):
             all_file_data[target_files[i]] = res[i]
             if show_each:
@@ -225,8 +233,9 @@ class BugAnalyzer:
 
         my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", True, f"Start combining bug data ...")
         combined_result = {}
-        for item in all_file_data.values():
-            combined_result = BugUtil.combine_dict_of_lists(combined_result, item)
+        with my_tracer.span("BugAnalyzer.combine", app=app_str, pattern=pattern, file_count=len(target_files)):
+            for item in all_file_data.values():
+                combined_result = BugUtil.combine_dict_of_lists(combined_result, item)
 
         if show_final:
             my_logger.hint(my_logger.LogLevel.INFO, "BugUtil", False, f"##### ALL #####")
@@ -315,6 +324,7 @@ class BugUtil:
         print()
 
     @staticmethod
+    @my_tracer.traced()
     def bug_file_to_abstract_dict(absolute_file_path: str, target_time: int = None, print_error: bool = False) -> Dict[str, List[AbstractItem]]:
         res: Dict[str, List[AbstractItem]] = {}
 
@@ -323,16 +333,19 @@ class BugUtil:
         # print(f"{target_package} -> {code_package_identifier}")
         app_name = PathUtil.get_app_name_from_logcat_file_path(absolute_file_path)
 
-        start_time_str = absolute_file_path.split('/')[-1].split('_')[1]
+        start_time_str = PathUtil.get_start_time_str_from_logcat_file_path(absolute_file_path)
         start_time = datetime.datetime.strptime(start_time_str, "%Y-%m-%d-%H:%M:%S")
 
-        try:
-            logcat_info = open(absolute_file_path, 'r').read()
-        except UnicodeDecodeError as e:
-            if print_error:
-                traceback.print_exc()
-                print("UnicodeDecodeError:", absolute_file_path)
-            logcat_info = open(absolute_file_path, 'r', errors='ignore').read()
+        my_tracer.current_span().set(file=os.path.basename(absolute_file_path))
+        with my_tracer.span("BugUtil.read_logcat_file") as read_span:
+            try:
+                logcat_info = CompressionUtil.read_text(absolute_file_path)
+            except UnicodeDecodeError as e:
+                if print_error:
+                    traceback.print_exc()
+                    print("UnicodeDecodeError:", absolute_file_path)
+                logcat_info = CompressionUtil.read_text(absolute_file_path, errors='ignore')
+            read_span.set(chars=len(logcat_info))
 
         lines = logcat_info.split('\n')
 
@@ -472,12 +485,12 @@ class ANRAnalyzer:
     @staticmethod
     def search_for_non_empty_dirs():
         anr_root_path = PlatformConstant.ANR_BUG_ROOT_DIR
-        for tag in os.listdir(anr_root_path):
+        for tag in ResultRoot.listdir(anr_root_path):
             tag_path = os.path.join(anr_root_path, tag)
-            for app_package in os.listdir(tag_path):
+            for app_package in ResultRoot.listdir(tag_path):
                 package_path = os.path.join(tag_path, app_package)
                 anr_path = os.path.join(package_path, "anr")
-                anr_files = os.listdir(anr_path)
+                anr_files = ResultRoot.listdir(anr_path)
                 if len(anr_files) > 0:
                     if "dumptrace_dqyNui" in anr_files:
                         anr_files.remove("dumptrace_dqyNui")
@@ -3,39 +3,65 @@
 # @Author: Yuanhong Lan
 # ----------------------
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
+from evaluation.result_analyzer.utils.compression_util import CompressionUtil
 from evaluation.result_analyzer.utils.data_util import DataType
 from runtime_collection import unified_testing_config
 
 
+class ResultFilePathInfo(NamedTuple):
+    tag: str
+    app_name: str
+    start_time_str: Optional[str]
+    result_type: Optional[str]
+
+
 class PathUtil:
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def parse_result_file_path(result_file_absolute_full_path: str) -> ResultFilePathInfo:
+        # "/home/root_running_data/testing_results/logcat_bug/Stoat-0609-uni-1/Apps.APhotoManager_2023-06-09-23:37:44_Stoat-0609-uni-1_bug.txt"
+        # -> ("Stoat-0609-uni-1", "APhotoManager", "2023-06-09-23:37:44", "bug")
+        # a compressed variant, e.g. "..._bug.txt.gz", is parsed as the plain file
+        path_items = CompressionUtil.strip_suffix(result_file_absolute_full_path).split('/')
+        file_name_items = path_items[-1].split('_')
+        return ResultFilePathInfo(
+            tag=path_items[-2],
+            app_name=file_name_items[0].split('.')[1],
+            start_time_str=file_name_items[1] if len(file_name_items) > 1 else None,
+            result_type=file_name_items[-1].split('.')[0] if len(file_name_items) > 2 else None,
+        )
+
     @staticmethod
     def get_tag_name_from_logcat_file_path(logcat_file_absolute_full_path: str):
         # "/home/root_running_data/testing_results/logcat_bug/Stoat-0609-uni-1/Apps.APhotoManager_2023-06-09-23:37:44_Stoat-0609-uni-1_bug.txt"
         # -> "Stoat-0609-uni-1"
-        temp = logcat_file_absolute_full_path.split('/')[-2]
-        # if temp[-2] == 'p':
-        #     temp = temp[:-3]
-        return temp
+        return PathUtil.parse_result_file_path(logcat_file_absolute_full_path).tag
 
     @staticmethod
     def get_app_name_from_logcat_file_path(logcat_file_absolute_full_path: str):
         # "/home/root_running_data/testing_results/logcat_bug/Stoat-0609-uni-1/Apps.APhotoManager_2023-06-09-23:37:44_Stoat-0609-uni-1_bug.txt"
         # -> "APhotoManager"
-        return logcat_file_absolute_full_path.split('/')[-1].split('_')[0].split('.')[1]
+        return PathUtil.parse_result_file_path(logcat_file_absolute_full_path).app_name
+
+    @staticmethod
+    def get_start_time_str_from_logcat_file_path(logcat_file_absolute_full_path: str):
+        # "/home/root_running_data/testing_results/logcat_bug/Stoat-0609-uni-1/Apps.APhotoManager_2023-06-09-23:37:44_Stoat-0609-uni-1_bug.txt"
+        # -> "2023-06-09-23:37:44"
+        return PathUtil.parse_result_file_path(logcat_file_absolute_full_path).start_time_str
 
     @staticmethod
     def get_package_from_logcat_file_path(logcat_file_absolute_full_path: str):
         # "/home/root_running_data/testing_results/logcat_bug/Stoat-0609-uni-1/Apps.APhotoManager_2023-06-09-23:37:44_Stoat-0609-uni-1_bug.txt"
         # -> "de.k3b.android.androFotoFinder.debug"
-        return unified_testing_config.APK_SOURCE_CODE_ARGS_DICT[
-            unified_testing_config.Apps[PathUtil.get_app_name_from_logcat_file_path(logcat_file_absolute_full_path)]
-        ].apk_package
+        return unified_testing_config.get_package_name_by_app_name(PathUtil.get_app_name_from_logcat_file_path(logcat_file_absolute_full_path))
 
 
 class ExcelDirectoryPathGenerator:
-    EXCEL_ROOT_PATH = os.path.join(os.path.dirname(__file__), "../excel")
+    # SATE_EXCEL_ROOT moves all the analysis outputs, e.g. for a run on a generated result tree
+    EXCEL_ROOT_PATH = os.environ.get("SATE_EXCEL_ROOT", os.path.join(os.path.dirname(__file__), "../excel"))
 
     @classmethod
     def get_original_data_dir(cls, data_type: DataType):
@@ -95,6 +121,13 @@ class ExcelDirectoryPathGenerator:
             os.makedirs(target_dir)
         return target_dir
 
+    @classmethod
+    def get_pipeline_data_dir(cls):
+        target_dir = os.path.join(cls.EXCEL_ROOT_PATH, "pipeline")
+        if not os.path.exists(target_dir):
+            os.makedirs(target_dir)
+        return target_dir
+
     @classmethod
     def get_case_study_data_dir(cls):
         target_dir = os.path.join(cls.EXCEL_ROOT_PATH, "case_study")
@@ -3,49 +3,86 @@
 # @Author: Yuanhong Lan
 # ----------------------
 import re
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 import pandas as pd
 
 
-class PatternUtil:
-    @staticmethod
-    def is_pattern_valid(pattern):
-        assert (pattern.endswith('*')) or (pattern.endswith('~')) or (
-                '**' in pattern), f"Pattern [{pattern}] is not valid."
+class TagMatcher:
+    """Match tags against a list (or a dict to targets) of patterns with one compiled regex.
 
-    @staticmethod
-    def is_match(pattern, s):
-        PatternUtil.is_pattern_valid(pattern)
+    Each pattern becomes a named alternative with the semantics of `PatternUtil.is_match`, so the first pattern in
+    order that matches a tag is the one reported.
+    """
+    def __init__(self, patterns: Union[Iterable[str], Dict[str, str]]):
+        self.targets: Optional[Dict[str, str]] = dict(patterns) if isinstance(patterns, dict) else None
+        self.patterns: List[str] = list(patterns)
+        for pattern in self.patterns:
+            PatternUtil.is_pattern_valid(pattern)
+        self.regex = re.compile("^(?:" + "|".join(
+            f"(?P<p{i}>{TagMatcher.__pattern_to_regex(pattern)})" for i, pattern in enumerate(self.patterns)
+        ) + ")") if len(self.patterns) > 0 else None
 
-        if pattern == s:
-            return True
-        elif pattern.endswith('*'):
+    @staticmethod
+    def __pattern_to_regex(pattern: str) -> str:
+        if pattern.endswith('*'):
             # A* matches A-1, A-2, A-3, ...
             re_exp = f"{pattern[:-1]}-\\d+$"
-            return re.match(re_exp, s)
         elif pattern.endswith('~'):
             # A~ means start with A
-            return s.startswith(pattern[:-1])
-        elif '**' in pattern:
+            re_exp = re.escape(pattern[:-1])
+        else:
             # A**-B matches A-1-B, A-2-B, A-3-B, ...
             re_exp = pattern.replace('**', "-\\d+")
-            return re.match(re_exp, s)
-        return False
+        return f"{re.escape(pattern)}\\Z|{re_exp}"
+
+    def match(self, tag: str) -> Optional[str]:
+        """The first pattern that matches the tag, or None."""
+        if self.regex is None:
+            return None
+        res = self.regex.match(tag)
+        return None if res is None else self.patterns[int(res.lastgroup[1:])]
+
+    def is_match(self, tag: str) -> bool:
+        return self.match(tag) is not None
+
+    def get_target(self, tag: str) -> Optional[str]:
+        pattern = self.match(tag)
+        return None if pattern is None else self.targets[pattern]
+
+    def classify(self, tags: Iterable[str]) -> pd.Series:
+        """The first matching pattern of each tag (NaN if none) in one vectorized pass."""
+        tags = pd.Series(list(tags), dtype=object)
+        if self.regex is None or len(tags) == 0:
+            return pd.Series(None, index=tags.index, dtype=object)
+        groups = tags.str.extract(self.regex.pattern)[[f"p{i}" for i in range(len(self.patterns))]]
+        matched = groups.notna()
+        res = pd.Series(matched.to_numpy().argmax(axis=1), index=tags.index).map(dict(enumerate(self.patterns)))
+        return res.where(matched.any(axis=1))
+
+
+class PatternUtil:
+    @staticmethod
+    def is_pattern_valid(pattern):
+        assert (pattern.endswith('*')) or (pattern.endswith('~')) or (
+                '**' in pattern), f"Pattern [{pattern}] is not valid."
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_tag_matcher(patterns: Tuple[str, ...]) -> TagMatcher:
+        return TagMatcher(patterns)
+
+    @staticmethod
+    def is_match(pattern, s):
+        return PatternUtil.get_tag_matcher((pattern,)).is_match(s)
 
     @staticmethod
     def is_match_among_list(pattern_list, s):
-        for pattern in pattern_list:
-            if PatternUtil.is_match(pattern, s):
-                return True
-        return False
+        return PatternUtil.get_tag_matcher(tuple(pattern_list)).is_match(s)
 
     @classmethod
     def rename_dataframe_by_tag_pattern_dict(cls, df: pd.DataFrame, tag_pattern_dict: Dict[str, str]) -> None:
-        rename_dict = {}
-        for item in df.index:
-            for pattern, target in tag_pattern_dict.items():
-                if cls.is_match(pattern, item):
-                    rename_dict[item] = target
-                    break
+        targets = TagMatcher(tag_pattern_dict).classify(df.index).map(tag_pattern_dict)
+        rename_dict = {item: target for item, target in zip(df.index, targets) if not pd.isna(target)}
         df.rename(index=rename_dict, inplace=True)
@@ -0,0 +1,584 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Result roots which may live inside a `.tar`, `.tar.gz`, `.tar.xz`, `.tar.zst` or `.zip` archive, read in place.
+
+An archive is addressed like the directory it was made from, e.g. with
+
+    COVERAGE_DATA_ROOT_DIR: /DATA/archives/campaign.tar.zst/experimental_results/coverage_result
+
+in the config, `ResultRoot.listdir`, `ResultRoot.open_binary` and the other functions below read the members of the
+archive without extracting it, and fall back to the plain `os` functions for any other path. Each archive is indexed
+once per process (the index is inherited by forked workers). Members of `.tar` and `.zip` archives are read by random
+access; compressed tars are decompressed as a stream, so their members are cheapest read in archive order, e.g. sorted
+when the archive was made with `tar --sort=name`. Archives are read-only.
+
+Several result trees, e.g. `/DATA/experimental_results` holding the roots of the config and `/DATA/previous_results`,
+can also be read as one with `ResultOverlay.enable([...])` or `SATE_RESULT_OVERLAY=<tree>:<tree>`: the roots list the
+tags of all the trees, and each tag dir is read from one of them, by the policy in `SATE_RESULT_OVERLAY_POLICY`
+(`first` by default). The trees of an overlay may be archives too.
+"""
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from enum import Enum
+from typing import IO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+OVERLAY_ENV = "SATE_RESULT_OVERLAY"
+OVERLAY_POLICY_ENV = "SATE_RESULT_OVERLAY_POLICY"
+# the index of the tag in the paths relative to each root, like `TAG_POSITIONS` of the result manifests
+OVERLAY_TAG_POSITIONS = {
+    "TOOL_LOG_ROOT_DIR": 0,
+    "LOGCAT_BUG_ROOT_DIR": 0,
+    "ANR_BUG_ROOT_DIR": 0,
+    "COVERAGE_DATA_ROOT_DIR": 1,
+    "STATISTICS_DATA_ROOT_DIR": 0,
+}
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.xz", ".tar.zst", ".zip")
+# cheap test for the paths which cannot be inside an archive
+_ARCHIVE_MARKERS = (".tar", ".tgz", ".zip")
+
+
+class ArchiveMember(NamedTuple):
+    size: int
+    mtime_ns: int
+    # position of the data in the decompressed tar stream, unused for zip
+    offset: int
+
+
+class _MemberReader(io.RawIOBase):
+    """The `size` bytes of a member starting at the current position of a binary stream, read lazily."""
+    def __init__(self, stream: IO[bytes], size: int, on_close=None):
+        super().__init__()
+        self.__stream = stream
+        self.__remaining = size
+        self.__on_close = on_close
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.__remaining)
+        if count <= 0:
+            return 0
+        data = self.__stream.read(count)
+        buffer[:len(data)] = data
+        self.__remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            if self.__on_close is not None:
+                self.__on_close(self.__stream)
+            else:
+                self.__stream.close()
+        super().close()
+
+
+class ArchiveIndex:
+    """The files and dirs of an archive, listed once up front, with the members opened on demand."""
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        stat = os.stat(archive_path)
+        self.signature = (stat.st_size, stat.st_mtime_ns)
+        self.is_zip = archive_path.endswith(".zip")
+        self.files: Dict[str, ArchiveMember] = {}
+        self.dirs: Dict[str, Dict[str, None]] = {"": {}}
+
+        self.__pid = None
+        self.__zip_file: Optional[zipfile.ZipFile] = None
+        # the decompressed stream left after the last member read, reused when the next member comes after it
+        self.__cursor: Optional[IO[bytes]] = None
+
+        if self.is_zip:
+            with zipfile.ZipFile(archive_path) as zip_file:
+                for info in zip_file.infolist():
+                    if info.is_dir():
+                        self.__add_dir(info.filename.rstrip('/'))
+                    else:
+                        self.__add_file(info.filename, ArchiveMember(info.file_size, int(time.mktime(info.date_time + (0, 0, -1)) * 1e9), -1))
+        else:
+            # a plain tar is indexed by seeking over the data, the others by decompressing it once
+            with self.__open_tar_stream() as stream, tarfile.open(fileobj=stream, mode="r:" if archive_path.endswith(".tar") else "r|") as tar:
+                for info in tar:
+                    if info.isdir():
+                        self.__add_dir(info.name)
+                    elif info.isfile():
+                        self.__add_file(info.name, ArchiveMember(info.size, int(info.mtime * 1e9), info.offset_data))
+
+    @staticmethod
+    def __normalize(member: str) -> str:
+        return '/'.join([item for item in member.split('/') if item not in ("", ".")])
+
+    def __add_dir(self, member: str):
+        member = ArchiveIndex.__normalize(member)
+        while member not in self.dirs:
+            self.dirs[member] = {}
+            parent, _, name = member.rpartition('/')
+            self.dirs.setdefault(parent, {})[name] = None
+            member = parent
+
+    def __add_file(self, member: str, entry: ArchiveMember):
+        member = ArchiveIndex.__normalize(member)
+        parent, _, name = member.rpartition('/')
+        self.__add_dir(parent)
+        self.dirs[parent][name] = None
+        self.files[member] = entry
+
+    def __open_tar_stream(self) -> IO[bytes]:
+        if self.archive_path.endswith(".tar.zst"):
+            if zstandard is None:
+                raise ImportError("Reading .tar.zst archives needs the zstandard package, try `pip install zstandard`.")
+            return zstandard.ZstdDecompressor().stream_reader(open(self.archive_path, 'rb'), closefd=True)
+        if self.archive_path.endswith(".tar.xz"):
+            return lzma.open(self.archive_path, 'rb')
+        if self.archive_path.endswith((".tar.gz", ".tgz")):
+            return gzip.open(self.archive_path, 'rb')
+        return open(self.archive_path, 'rb')
+
+    def __check_process(self):
+        # handles inherited from the parent share its file offsets, so a forked worker opens its own
+        if self.__pid != os.getpid():
+            self.__pid = os.getpid()
+            self.__zip_file = None
+            self.__cursor = None
+
+    def __release_cursor(self, stream: IO[bytes]):
+        if self.__cursor is None:
+            self.__cursor = stream
+        else:
+            stream.close()
+
+    def listdir(self, member: str) -> List[str]:
+        return list(self.dirs[ArchiveIndex.__normalize(member)].keys())
+
+    def is_dir(self, member: str) -> bool:
+        return ArchiveIndex.__normalize(member) in self.dirs
+
+    def get_file(self, member: str) -> Optional[ArchiveMember]:
+        return self.files.get(ArchiveIndex.__normalize(member))
+
+    def open(self, member: str) -> IO[bytes]:
+        member = ArchiveIndex.__normalize(member)
+        entry = self.files.get(member)
+        if entry is None:
+            raise FileNotFoundError(f"No file {member} in {self.archive_path}")
+        self.__check_process()
+        if self.is_zip:
+            if self.__zip_file is None:
+                self.__zip_file = zipfile.ZipFile(self.archive_path)
+            return self.__zip_file.open(member)
+
+        stream, self.__cursor = self.__cursor, None
+        if stream is None or stream.tell() > entry.offset:
+            if stream is not None:
+                stream.close()
+            stream = self.__open_tar_stream()
+        # a forward seek of a decompressed stream skips the data in between
+        stream.seek(entry.offset)
+        return io.BufferedReader(_MemberReader(stream, entry.size, self.__release_cursor))
+
+
+class PhysicalRoot:
+    """`os`-like functions over the paths of one tree, which may point into archives, without the overlay."""
+    __indexes: Dict[str, ArchiveIndex] = {}
+
+    @staticmethod
+    def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+        """(archive path, member path) if the path is an archive or inside one, else None."""
+        if not any([item in path for item in _ARCHIVE_MARKERS]):
+            return None
+        parts = os.path.abspath(path).split(os.sep)
+        for i in range(2, len(parts) + 1):
+            if parts[i - 1].endswith(ARCHIVE_SUFFIXES):
+                archive_path = os.sep.join(parts[:i])
+                if os.path.isfile(archive_path):
+                    return archive_path, '/'.join(parts[i:])
+        return None
+
+    @staticmethod
+    def is_archive_path(path: str) -> bool:
+        return PhysicalRoot.split_archive_path(path) is not None
+
+    @staticmethod
+    def get_index(archive_path: str) -> ArchiveIndex:
+        index = PhysicalRoot.__indexes.get(archive_path)
+        stat = os.stat(archive_path)
+        if index is None or index.signature != (stat.st_size, stat.st_mtime_ns):
+            from android_testing_utils.log import my_logger
+            my_logger.hint(my_logger.LogLevel.INFO, "ResultRoot", True, f"Indexing archive {archive_path} ...")
+            index = ArchiveIndex(archive_path)
+            PhysicalRoot.__indexes[archive_path] = index
+            my_logger.hint(my_logger.LogLevel.INFO, "ResultRoot", True, f"Indexed [{len(index.files)}] files of {archive_path}")
+        return index
+
+    @staticmethod
+    def __resolve(path: str) -> Optional[Tuple[ArchiveIndex, str]]:
+        res = PhysicalRoot.split_archive_path(path)
+        if res is None:
+            return None
+        return PhysicalRoot.get_index(res[0]), res[1]
+
+    @staticmethod
+    def listdir(path: str) -> List[str]:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return os.listdir(path)
+        index, member = res
+        if not index.is_dir(member):
+            raise (NotADirectoryError if index.get_file(member) is not None else FileNotFoundError)(f"No dir {member} in {index.archive_path}")
+        return index.listdir(member)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return os.path.exists(path)
+        return res[0].is_dir(res[1]) or res[0].get_file(res[1]) is not None
+
+    @staticmethod
+    def isdir(path: str) -> bool:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return os.path.isdir(path)
+        return res[0].is_dir(res[1])
+
+    @staticmethod
+    def isfile(path: str) -> bool:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return os.path.isfile(path)
+        return res[0].get_file(res[1]) is not None
+
+    @staticmethod
+    def __get_member(path: str) -> Optional[ArchiveMember]:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return None
+        entry = res[0].get_file(res[1])
+        if entry is None:
+            raise FileNotFoundError(f"No file {res[1]} in {res[0].archive_path}")
+        return entry
+
+    @staticmethod
+    def getsize(path: str) -> int:
+        entry = PhysicalRoot.__get_member(path)
+        return os.path.getsize(path) if entry is None else entry.size
+
+    @staticmethod
+    def get_mtime_ns(path: str) -> int:
+        entry = PhysicalRoot.__get_member(path)
+        return os.stat(path).st_mtime_ns if entry is None else entry.mtime_ns
+
+    @staticmethod
+    def walk(top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Like `os.walk`, top-down."""
+        res = PhysicalRoot.__resolve(top)
+        if res is None:
+            yield from os.walk(top)
+            return
+        index, member = res
+        if not index.is_dir(member):
+            return
+        names = index.listdir(member)
+        prefix = member + '/' if member != "" else ""
+        dir_names = [item for item in names if index.is_dir(prefix + item)]
+        yield top, dir_names, [item for item in names if not index.is_dir(prefix + item)]
+        for dir_name in dir_names:
+            yield from PhysicalRoot.walk(os.path.join(top, dir_name))
+
+    @staticmethod
+    def open_binary(path: str) -> IO[bytes]:
+        res = PhysicalRoot.__resolve(path)
+        if res is None:
+            return open(path, 'rb')
+        return res[0].open(res[1])
+
+    @staticmethod
+    def load_npy(path: str):
+        """`np.load` of a pickled `.npy` file, e.g. coverage data."""
+        if not PhysicalRoot.is_archive_path(path):
+            return np.load(path, allow_pickle=True)
+        with PhysicalRoot.open_binary(path) as f:
+            return np.load(io.BytesIO(f.read()), allow_pickle=True)
+
+    @staticmethod
+    def copy(source_path: str, destination_path: str):
+        """Copy a file or dir, which may be inside an archive, to a plain path."""
+        if not PhysicalRoot.is_archive_path(source_path):
+            if os.path.isfile(source_path):
+                shutil.copy(source_path, destination_path)
+            else:
+                shutil.copytree(source_path, destination_path)
+            return
+        if PhysicalRoot.isfile(source_path):
+            with PhysicalRoot.open_binary(source_path) as source, open(destination_path, 'wb') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            mtime_ns = PhysicalRoot.get_mtime_ns(source_path)
+            os.utime(destination_path, ns=(mtime_ns, mtime_ns))
+            return
+        for current_dir, _, file_names in PhysicalRoot.walk(source_path):
+            target_dir = os.path.join(destination_path, os.path.relpath(current_dir, source_path))
+            os.makedirs(target_dir, exist_ok=True)
+            for file_name in file_names:
+                PhysicalRoot.copy(os.path.join(current_dir, file_name), os.path.join(target_dir, file_name))
+
+    @staticmethod
+    def check_writable(path: str):
+        res = PhysicalRoot.split_archive_path(path)
+        if res is not None:
+            raise PermissionError(f"Can not write {path}, as it is inside the read-only archive {res[0]}!")
+
+
+class OverlayPolicy(Enum):
+    """Which tree provides a tag dir present in several trees of the overlay."""
+    First = "first"
+    Last = "last"
+    Newest = "newest"
+    Error = "error"
+
+
+class ResultOverlay:
+    """An ordered union of result trees, read as the first one, whose roots are the roots of `PlatformConstant`.
+
+    Each path under the first tree also names the same relative path in the other trees. Dirs above the tag level, e.g.
+    a root or a package dir of the coverage root, list the union of the trees, while each tag dir, with all its files,
+    comes from the one tree chosen by the conflict policy. Paths outside the roots resolve to the first tree having them.
+    Writes still go to the paths of the first tree.
+    """
+    __layers: Optional[List[str]] = [os.path.abspath(item) for item in os.environ.get(OVERLAY_ENV, "").split(os.pathsep) if item != ""] or None
+    __policy: OverlayPolicy = OverlayPolicy(os.environ.get(OVERLAY_POLICY_ENV) or OverlayPolicy.First.value)
+    __roots: Tuple[tuple, List[Tuple[str, int]]] = ((), [])
+    __tag_dir_layers: Dict[str, int] = {}
+
+    @staticmethod
+    def enable(layers: List[str], policy: OverlayPolicy = OverlayPolicy.First):
+        """Overlay the trees, the first holding the roots of `PlatformConstant`, in this process and the ones it starts."""
+        assert len(layers) > 0, "No tree to overlay!"
+        ResultOverlay.__layers = [os.path.abspath(item) for item in layers]
+        ResultOverlay.__policy = policy
+        ResultOverlay.__tag_dir_layers = {}
+        os.environ[OVERLAY_ENV] = os.pathsep.join(ResultOverlay.__layers)
+        os.environ[OVERLAY_POLICY_ENV] = policy.value
+
+    @staticmethod
+    def disable():
+        ResultOverlay.__layers = None
+        ResultOverlay.__tag_dir_layers = {}
+        os.environ.pop(OVERLAY_ENV, None)
+        os.environ.pop(OVERLAY_POLICY_ENV, None)
+
+    @staticmethod
+    def get_layers() -> Optional[List[str]]:
+        return ResultOverlay.__layers
+
+    @staticmethod
+    def covers(path: str) -> Optional[str]:
+        """The absolute path if it is inside the first tree of an enabled overlay, else None."""
+        layers = ResultOverlay.__layers
+        if layers is None or len(layers) < 2:
+            return None
+        path = os.path.abspath(path)
+        if path == layers[0] or path.startswith(layers[0] + os.sep):
+            return path
+        return None
+
+    @staticmethod
+    def __map(path: str, layer: int) -> str:
+        return ResultOverlay.__layers[layer] + path[len(ResultOverlay.__layers[0]):]
+
+    @staticmethod
+    def __get_roots() -> List[Tuple[str, int]]:
+        from constant import PlatformConstant
+        values = tuple([getattr(PlatformConstant, key) for key in OVERLAY_TAG_POSITIONS.keys()])
+        if ResultOverlay.__roots[0] != values:
+            roots = [(os.path.abspath(value), position) for value, position in zip(values, OVERLAY_TAG_POSITIONS.values())]
+            # nested roots match before the roots holding them
+            ResultOverlay.__roots = (values, sorted(roots, key=lambda x: -len(x[0])))
+        return ResultOverlay.__roots[1]
+
+    @staticmethod
+    def get_tag_dir(path: str) -> Optional[str]:
+        """The tag dir holding an absolute path inside the first tree, None above the tag level or outside the roots."""
+        for root, position in ResultOverlay.__get_roots():
+            if path == root or path.startswith(root + os.sep):
+                parts = [] if path == root else path[len(root) + 1:].split(os.sep)
+                return os.path.join(root, *parts[:position + 1]) if len(parts) > position else None
+        return None
+
+    @staticmethod
+    def __get_newest_mtime_ns(path: str) -> int:
+        return max([
+            PhysicalRoot.get_mtime_ns(os.path.join(current_dir, item))
+            for current_dir, _, file_names in PhysicalRoot.walk(path) for item in file_names
+        ], default=0)
+
+    @staticmethod
+    def get_tag_dir_layer(tag_dir: str) -> int:
+        """The index of the tree providing a tag dir, by the conflict policy, cached."""
+        res = ResultOverlay.__tag_dir_layers.get(tag_dir)
+        if res is not None:
+            return res
+        layers = [i for i in range(len(ResultOverlay.__layers)) if PhysicalRoot.exists(ResultOverlay.__map(tag_dir, i))]
+        policy = ResultOverlay.__policy
+        if len(layers) <= 1:
+            res = layers[0] if len(layers) == 1 else 0
+        elif policy == OverlayPolicy.Error:
+            raise ValueError(f"Tag dir {tag_dir} is in the trees {[ResultOverlay.__layers[i] for i in layers]}, with the conflict policy {policy.value}!")
+        elif policy == OverlayPolicy.Newest:
+            res = max(layers, key=lambda x: ResultOverlay.__get_newest_mtime_ns(ResultOverlay.__map(tag_dir, x)))
+        else:
+            res = layers[0] if policy == OverlayPolicy.First else layers[-1]
+        if len(layers) > 1:
+            from android_testing_utils.log import my_logger
+            my_logger.hint(my_logger.LogLevel.INFO, "ResultRoot", False, "Tag dir %s is in [%d] trees, read from %s",
+                           tag_dir, len(layers), ResultOverlay.__layers[res])
+        ResultOverlay.__tag_dir_layers[tag_dir] = res
+        return res
+
+    @staticmethod
+    def resolve(path: str) -> str:
+        """The path in the tree which provides it."""
+        absolute_path = ResultOverlay.covers(path)
+        if absolute_path is None:
+            return path
+        tag_dir = ResultOverlay.get_tag_dir(absolute_path)
+        if tag_dir is not None:
+            return ResultOverlay.__map(absolute_path, ResultOverlay.get_tag_dir_layer(tag_dir))
+        for i in range(len(ResultOverlay.__layers)):
+            candidate = ResultOverlay.__map(absolute_path, i)
+            if PhysicalRoot.exists(candidate):
+                return candidate
+        return absolute_path
+
+    @staticmethod
+    def get_union_dirs(path: str) -> Optional[List[str]]:
+        """The dirs of all the trees merged for a dir above the tag level, None if the path is not merged."""
+        absolute_path = ResultOverlay.covers(path)
+        if absolute_path is None or ResultOverlay.get_tag_dir(absolute_path) is not None:
+            return None
+        candidates = [ResultOverlay.__map(absolute_path, i) for i in range(len(ResultOverlay.__layers))]
+        return [item for item in candidates if PhysicalRoot.isdir(item)]
+
+    @staticmethod
+    def get_conflicts() -> List[Tuple[str, List[str], Optional[str]]]:
+        """(tag dir, trees having it, tree read) of the tag dirs in several trees, the tree read is None on error."""
+        res = []
+        if ResultOverlay.__layers is None or len(ResultOverlay.__layers) < 2:
+            return res
+        for root, position in ResultOverlay.__get_roots():
+            if ResultOverlay.covers(root) is None:
+                continue
+            dirs = [root]
+            for _ in range(position + 1):
+                dirs = [os.path.join(item, name) for item in dirs if ResultRoot.isdir(item) for name in ResultRoot.listdir(item)]
+            for tag_dir in dirs:
+                layers = [item for i, item in enumerate(ResultOverlay.__layers) if PhysicalRoot.exists(ResultOverlay.__map(tag_dir, i))]
+                if len(layers) > 1:
+                    try:
+                        chosen = ResultOverlay.__layers[ResultOverlay.get_tag_dir_layer(tag_dir)]
+                    except ValueError:
+                        chosen = None
+                    res.append((tag_dir, layers, chosen))
+        return res
+
+
+class ResultRoot:
+    """`os`-like functions over result paths, through the result overlay if enabled, and into archives."""
+    @staticmethod
+    def resolve(path: str) -> str:
+        """The path in the tree of the overlay which provides it, the path itself without an overlay."""
+        return ResultOverlay.resolve(path)
+
+    @staticmethod
+    def split_archive_path(path: str) -> Optional[Tuple[str, str]]:
+        return PhysicalRoot.split_archive_path(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def is_archive_path(path: str) -> bool:
+        return PhysicalRoot.is_archive_path(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def listdir(path: str) -> List[str]:
+        dirs = ResultOverlay.get_union_dirs(path)
+        if dirs is None or len(dirs) == 0:
+            return PhysicalRoot.listdir(ResultOverlay.resolve(path))
+        return list(dict.fromkeys([name for item in dirs for name in PhysicalRoot.listdir(item)]))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return PhysicalRoot.exists(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def isdir(path: str) -> bool:
+        return PhysicalRoot.isdir(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def isfile(path: str) -> bool:
+        return PhysicalRoot.isfile(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def getsize(path: str) -> int:
+        return PhysicalRoot.getsize(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def get_mtime_ns(path: str) -> int:
+        return PhysicalRoot.get_mtime_ns(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def walk(top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Like `os.walk`, top-down."""
+        if ResultOverlay.covers(top) is None:
+            yield from PhysicalRoot.walk(top)
+            return
+        if not ResultRoot.isdir(top):
+            return
+        names = ResultRoot.listdir(top)
+        dir_names = [item for item in names if ResultRoot.isdir(os.path.join(top, item))]
+        yield top, dir_names, [item for item in names if item not in dir_names]
+        for dir_name in dir_names:
+            yield from ResultRoot.walk(os.path.join(top, dir_name))
+
+    @staticmethod
+    def open_binary(path: str) -> IO[bytes]:
+        return PhysicalRoot.open_binary(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def load_npy(path: str):
+        """`np.load` of a pickled `.npy` file, e.g. coverage data."""
+        return PhysicalRoot.load_npy(ResultOverlay.resolve(path))
+
+    @staticmethod
+    def copy(source_path: str, destination_path: str):
+        """Copy a file or dir, which may be inside an archive or merged by the overlay, to a plain path."""
+        if ResultOverlay.get_union_dirs(source_path) is None:
+            PhysicalRoot.copy(ResultOverlay.resolve(source_path), destination_path)
+            return
+        for current_dir, dir_names, file_names in ResultRoot.walk(source_path):
+            target_dir = os.path.join(destination_path, os.path.relpath(current_dir, source_path))
+            os.makedirs(target_dir, exist_ok=True)
+            for file_name in file_names:
+                PhysicalRoot.copy(ResultOverlay.resolve(os.path.join(current_dir, file_name)), os.path.join(target_dir, file_name))
+            for dir_name in list(dir_names):
+                if ResultOverlay.get_union_dirs(os.path.join(current_dir, dir_name)) is None:
+                    # a tag dir, copied from the one tree providing it
+                    dir_names.remove(dir_name)
+                    PhysicalRoot.copy(ResultOverlay.resolve(os.path.join(current_dir, dir_name)), os.path.join(target_dir, dir_name))
+
+    @staticmethod
+    def check_writable(path: str):
+        PhysicalRoot.check_writable(path)
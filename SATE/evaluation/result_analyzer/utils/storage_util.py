@@ -0,0 +1,118 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+import os
+from enum import Enum
+from typing import Dict, Optional, Set, Union
+
+import pandas as pd
+
+from android_testing_utils.log import my_logger
+
+
+class StorageFormat(Enum):
+    Excel = ".xlsx"
+    Pickle = ".pkl"
+
+
+class StorageUtil:
+    """Read and write the sheets passed between analysis stages in the working format.
+
+    File paths are given with the `.xlsx` names used by `ExcelDirectoryPathGenerator` consumers, and the extension
+    is swapped for the working format. Stages write typed frames, which a binary format keeps as they are.
+    """
+    WORKING_FORMAT = StorageFormat.Pickle
+    DEFAULT_SHEET_NAME = "Sheet1"
+    # variants already warned about by `resolve_path`
+    __WARNED_PATHS: Set[str] = set()
+
+    @classmethod
+    def get_path(cls, file_path: str, storage_format: Optional[StorageFormat] = None) -> str:
+        if storage_format is None:
+            storage_format = cls.WORKING_FORMAT
+        for item in StorageFormat:
+            if file_path.endswith(item.value):
+                file_path = file_path[:-len(item.value)]
+                break
+        return f"{file_path}{storage_format.value}"
+
+    @classmethod
+    def resolve_path(cls, file_path: str) -> str:
+        """The working format variant of the file if it exists, otherwise the first existing other variant.
+
+        `write_sheets` writes the working format last, so a variant newer than it was written or edited elsewhere. This
+        is warned about once per file, and the working format is still read.
+        """
+        working_path = cls.get_path(file_path, cls.WORKING_FORMAT)
+        other_paths = [cls.get_path(file_path, item) for item in StorageFormat if item != cls.WORKING_FORMAT]
+        other_paths = [item for item in other_paths if os.path.exists(item)]
+        if not os.path.exists(working_path):
+            return other_paths[0] if len(other_paths) > 0 else working_path
+
+        working_mtime = os.stat(working_path).st_mtime_ns
+        for other_path in other_paths:
+            if os.stat(other_path).st_mtime_ns > working_mtime and other_path not in cls.__WARNED_PATHS:
+                cls.__WARNED_PATHS.add(other_path)
+                my_logger.hint(my_logger.LogLevel.WARNING, "StorageUtil", False, f"{other_path} is newer than {working_path}, which is read instead")
+        return working_path
+
+    @classmethod
+    def exists(cls, file_path: str) -> bool:
+        return os.path.exists(cls.resolve_path(file_path))
+
+    @classmethod
+    def write_sheets(cls, file_path: str, sheets: Dict[str, pd.DataFrame], export_excel: bool = False):
+        """Write sheets in the working format, and also as `.xlsx` for final results when `export_excel` is set."""
+        storage_formats = [cls.WORKING_FORMAT]
+        if export_excel and cls.WORKING_FORMAT != StorageFormat.Excel:
+            storage_formats.append(StorageFormat.Excel)
+
+        # the working format goes last, see `resolve_path`
+        for storage_format in reversed(storage_formats):
+            target_path = cls.get_path(file_path, storage_format)
+            if storage_format == StorageFormat.Excel:
+                cls.__write_excel(target_path, sheets)
+            else:
+                pd.to_pickle(dict(sheets), target_path)
+
+    @staticmethod
+    def __write_excel(file_path: str, sheets: Dict[str, pd.DataFrame]):
+        with pd.ExcelWriter(file_path) as excel_writer:
+            for sheet_name, sheet_data in sheets.items():
+                sheet_data.to_excel(excel_writer, sheet_name=sheet_name)
+
+    @classmethod
+    def write(cls, file_path: str, data: pd.DataFrame, export_excel: bool = False):
+        cls.write_sheets(file_path, {cls.DEFAULT_SHEET_NAME: data}, export_excel)
+
+    @classmethod
+    def export_to_excel(cls, file_path: str):
+        """Convert an artifact stored in the working format to `.xlsx`."""
+        source_path = cls.resolve_path(file_path)
+        target_path = cls.get_path(file_path, StorageFormat.Excel)
+        cls.__write_excel(target_path, cls.read(source_path, sheet_name=None))
+        # not newer than the file it was exported from, see `resolve_path`
+        source_stat = os.stat(source_path)
+        os.utime(target_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+    @classmethod
+    def read(
+            cls,
+            file_path: str,
+            sheet_name: Union[str, int, None] = 0,
+            dtype=None,
+            **excel_kwargs,
+    ) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """Like `pd.read_excel`, but a pickle gives back the frames as they were written, so `dtype` and `excel_kwargs`
+        (e.g. `index_col`, `header`) only apply to `.xlsx` files."""
+        target_path = cls.resolve_path(file_path)
+        if target_path.endswith(StorageFormat.Excel.value):
+            return pd.read_excel(target_path, sheet_name=sheet_name, dtype=dtype, **excel_kwargs)
+
+        sheets: Dict[str, pd.DataFrame] = pd.read_pickle(target_path)
+        if sheet_name is None:
+            return sheets
+        if isinstance(sheet_name, int):
+            sheet_name = list(sheets.keys())[sheet_name]
+        return sheets[sheet_name]
@@ -50,7 +50,7 @@ class ApkBriefInfo(NamedTuple):
 class ApkSourceCodeArgs:
     def __init__(self, apk_package: str, apk_root_relative_path: str, build_relative_path: str, java_version: JavaVersion):
         self._apk_package: str = apk_package
-        self._root_path: str = os.path.join(PlatformConstant.INSTRUMENTED_CODE_ROOT, apk_root_relative_path)
+        self._root_relative_path: str = apk_root_relative_path
         self._build_relative_path: str = build_relative_path
         self._java_version: JavaVersion = java_version
 
@@ -58,9 +58,13 @@ class ApkSourceCodeArgs:
     def apk_package(self) -> str:
         return self._apk_package
 
+    @property
+    def root_relative_path(self) -> str:
+        return self._root_relative_path
+
     @property
     def root_path(self) -> str:
-        return self._root_path
+        return os.path.join(PlatformConstant.INSTRUMENTED_CODE_ROOT, self._root_relative_path)
 
     @property
     def build_relative_path(self) -> str:
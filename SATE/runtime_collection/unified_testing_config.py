@@ -5,7 +5,7 @@
 import os
 
 from enum import Enum
-from typing import List
+from typing import Dict, List
 
 from runtime_collection.collector_util.util_coverage import ApkBriefInfo, ApkSourceCodeArgs
 from runtime_collection.collector_util.util_coverage import JavaVersion
@@ -115,7 +115,7 @@ SORTED_APP_NAME_LIST_BY_INSTRUCTION = [item.value for item in SORTED_APP_LIST_BY
 SORTED_APP_LIST_BY_ACTIVITY = sorted(ALL_APPS, key=lambda x: (-APK_BRIEF_INFO_DICT[x].activity_count, -APK_BRIEF_INFO_DICT[x].instruction_count))
 SORTED_APP_NAME_LIST_BY_ACTIVITY = [item.value for item in SORTED_APP_LIST_BY_ACTIVITY]
 
-APK_ABSOLUTE_PATH_DICT = {key: os.path.join(PlatformConstant.APK_DIR, value.apk_file_name) for key, value in APK_BRIEF_INFO_DICT.items()}
+# APK_ABSOLUTE_PATH_DICT is joined with PlatformConstant.APK_DIR on first access, see __getattr__ below
 
 
 
@@ -172,21 +172,40 @@ for app in list(Apps):
 for key, value in APK_BRIEF_INFO_DICT.items():
     assert key.value in value.apk_file_name
 for key, value in APK_SOURCE_CODE_ARGS_DICT.items():
-    assert key.value in value.root_path
+    assert key.value in value.root_relative_path
 assert set(Apps) == set(APK_BRIEF_INFO_DICT.keys()) == set(APK_SOURCE_CODE_ARGS_DICT.keys())
 
 
+# lookup indexes between packages, apps, app names and apk info, built once at import
+PACKAGE_TO_APP_DICT: Dict[str, Apps] = {value.apk_package: key for key, value in APK_SOURCE_CODE_ARGS_DICT.items()}
+APP_NAME_TO_APP_DICT: Dict[str, Apps] = {item.name: item for item in Apps}
+APP_TO_PACKAGE_DICT: Dict[Apps, str] = {key: value.apk_package for key, value in APK_SOURCE_CODE_ARGS_DICT.items()}
+assert len(PACKAGE_TO_APP_DICT) == len(APK_SOURCE_CODE_ARGS_DICT)
+
+
+def __getattr__(name):
+    if name == "APK_ABSOLUTE_PATH_DICT":
+        value = {key: os.path.join(PlatformConstant.APK_DIR, value.apk_file_name) for key, value in APK_BRIEF_INFO_DICT.items()}
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_app_name_by_package_name(package_name: str) -> str:
-    for app_key, app_value in APK_SOURCE_CODE_ARGS_DICT.items():
-        if app_value.apk_package == package_name:
-            return str(app_key.value)
-    assert False
+    return str(get_app_by_package_name(package_name).value)
 
 def get_app_by_package_name(package_name: str) -> Apps:
-    for app_key, app_value in APK_SOURCE_CODE_ARGS_DICT.items():
-        if app_value.apk_package == package_name:
-            return app_key
-    assert False
+    assert package_name in PACKAGE_TO_APP_DICT, f"Unknown package [{package_name}]"
+    return PACKAGE_TO_APP_DICT[package_name]
+
+def get_app_by_app_name(app_name: str) -> Apps:
+    return APP_NAME_TO_APP_DICT[app_name]
+
+def get_package_name_by_app_name(app_name: str) -> str:
+    return APP_TO_PACKAGE_DICT[APP_NAME_TO_APP_DICT[app_name]]
+
+def get_apk_brief_info_by_package_name(package_name: str) -> ApkBriefInfo:
+    return APK_BRIEF_INFO_DICT[get_app_by_package_name(package_name)]
 
 
 empirical_app_list_all = [
@@ -0,0 +1,148 @@
+# ----------------------
+# @Time  : 2024 Jun
+# @Author: Yuanhong Lan
+# ----------------------
+"""Single entry point of the study analyzers.
+
+    python sate.py [--profile-import] [--trace DIR [--memory {rss,tracemalloc}]] {granularities,metrics-relation,randomness,convergence,all,pipeline} ...
+
+Each stage imports its own analysis modules when it runs, so the stages given in one call share the startup cost of a
+single interpreter. A failing stage is logged without stopping the next ones, and makes the exit code 1. With
+`--trace`, the spans of the stages and their workers are written to `DIR/trace.json` (open it in ui.perfetto.dev) and
+summarized per span name. `--memory` adds the peak memory of the spans and of each worker, and with `tracemalloc`,
+the call sites retaining the most memory after each stage.
+"""
+import argparse
+import builtins
+import contextlib
+import importlib
+import os
+import sys
+import time
+import traceback
+from typing import Callable, Dict, List
+
+
+def run_analyzer(module_name: str) -> Callable[[], None]:
+    """The `run` of a study analyzer script, imported when the stage runs."""
+    def run():
+        importlib.import_module(f"evaluation.result_analyzer.study_analyzer.{module_name}").run()
+    return run
+
+
+def run_pipeline():
+    from evaluation.result_analyzer.study_analyzer.study_pipeline import StudyPipeline
+    states = StudyPipeline.run()
+    not_done = sorted([name for name, state in states.items() if state not in ["run", "skipped"]])
+    if len(not_done) > 0:
+        raise RuntimeError(f"{len(not_done)} pipeline stages are not done, e.g. {not_done[0]} is {states[not_done[0]]}")
+
+
+STAGES: Dict[str, Callable[[], None]] = {
+    "granularities": run_analyzer("granularities_analyzer"),
+    "metrics-relation": run_analyzer("metrics_relation_analyzer"),
+    "randomness": run_analyzer("randomness_analyzer"),
+    "convergence": run_analyzer("convergence_analyzer"),
+    # the four stages above as a DAG, skipping the artifacts which are up to date
+    "pipeline": run_pipeline,
+}
+
+
+class ImportProfiler:
+    """Records the time spent importing each module while active, like `python -X importtime`, as a tree."""
+    def __init__(self):
+        self.root = ["", 0.0, []]
+        self.__stack = [self.root]
+        self.__original_import = builtins.__import__
+
+    def __import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name in sys.modules:
+            return self.__original_import(name, globals, locals, fromlist, level)
+        node = [name, 0.0, []]
+        self.__stack[-1][2].append(node)
+        self.__stack.append(node)
+        start_time = time.perf_counter()
+        try:
+            return self.__original_import(name, globals, locals, fromlist, level)
+        finally:
+            node[1] = time.perf_counter() - start_time
+            self.__stack.pop()
+
+    def __enter__(self):
+        builtins.__import__ = self.__import
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        builtins.__import__ = self.__original_import
+
+    def get_report(self, threshold: float = 0.001) -> str:
+        """Self and cumulative times in ms of the imports taking at least `threshold` seconds."""
+        lines = ["import time: self [ms] | cumulative [ms] | imported module"]
+
+        def visit(node, depth):
+            for child in sorted(node[2], key=lambda x: -x[1]):
+                if child[1] < threshold:
+                    continue
+                self_time = child[1] - sum([item[1] for item in child[2]])
+                lines.append(f"import time: {self_time * 1000:>9.1f} | {child[1] * 1000:>15.1f} | {'  ' * depth}{child[0]}")
+                visit(child, depth + 1)
+
+        visit(self.root, 0)
+        lines.append(f"import time: total {sum([item[1] for item in self.root[2]]) * 1000:.1f} ms")
+        return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="sate", description="Run the SATE study analyzers in one interpreter.")
+    parser.add_argument("stages", nargs="+", choices=list(STAGES.keys()) + ["all"], help="the study stages to run, in order")
+    parser.add_argument("--profile-import", action="store_true", help="print the import time of each module loaded by the stages")
+    parser.add_argument("--trace", metavar="DIR", default=None, help="record spans of the stages into DIR/trace.json")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc"], default=None, help="also record memory in the spans, needs --trace")
+    parser.add_argument("--overlay", metavar="TREE", nargs="+", default=None,
+                        help="read these result trees as one, the first holding the result roots of the config")
+    parser.add_argument("--overlay-policy", choices=["first", "last", "newest", "error"], default="first",
+                        help="the tree to read a tag dir present in several trees from (default: first)")
+    args = parser.parse_args(argv)
+    if args.memory is not None and args.trace is None:
+        parser.error("--memory needs --trace")
+
+    from android_testing_utils.log import my_logger, my_memory, my_tracer
+    if args.trace is not None:
+        my_tracer.enable(args.trace, memory=args.memory)
+    if args.overlay is not None:
+        from evaluation.result_analyzer.utils.result_root import OverlayPolicy, ResultOverlay
+        ResultOverlay.enable(args.overlay, OverlayPolicy(args.overlay_policy))
+        conflicts = ResultOverlay.get_conflicts()
+        if args.overlay_policy == "error" and len(conflicts) > 0:
+            parser.error(f"{len(conflicts)} tag dirs are in several trees, e.g. {conflicts[0][0]} in {conflicts[0][1]}")
+        my_logger.hint(my_logger.LogLevel.INFO, "SATE", False, f"Reading [{len(args.overlay)}] result trees as one, [{len(conflicts)}] tag dirs are in several of them")
+
+    stage_names = ["granularities", "metrics-relation", "randomness", "convergence"] if "all" in args.stages else args.stages
+    # the pipeline stages and the pools of the stages log through this process
+    failed_stages = []
+    with ImportProfiler() if args.profile_import else contextlib.nullcontext() as profiler, my_logger.queue_sink():
+        for stage_name in stage_names:
+            start_time = time.perf_counter()
+            try:
+                with my_tracer.span(f"stage.{stage_name}") as stage_span, my_memory.allocation_snapshot(stage_span):
+                    STAGES[stage_name]()
+            except Exception:
+                failed_stages.append(stage_name)
+                my_logger.hint(my_logger.LogLevel.ERROR, "SATE", True, f"Stage [{stage_name}] failed after {time.perf_counter() - start_time:.2f}s:\n{traceback.format_exc()}")
+                continue
+            my_logger.hint(my_logger.LogLevel.INFO, "SATE", True, f"Stage [{stage_name}] done in {time.perf_counter() - start_time:.2f}s")
+    if profiler is not None:
+        print(profiler.get_report(), file=sys.stderr)
+    if args.trace is not None:
+        events = my_tracer.export(os.path.join(args.trace, "trace.json"))
+        print(my_tracer.format_summary(my_tracer.get_summary(events)), file=sys.stderr)
+        if args.memory is not None:
+            print(my_memory.get_report(events), file=sys.stderr)
+    if len(failed_stages) > 0:
+        my_logger.hint(my_logger.LogLevel.ERROR, "SATE", False, f"[{len(failed_stages)}] of [{len(stage_names)}] stages failed: {', '.join(failed_stages)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())